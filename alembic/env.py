@@ -0,0 +1,65 @@
+from logging.config import fileConfig
+
+from sqlalchemy import engine_from_config, pool
+from sqlmodel import SQLModel
+
+from alembic import context
+from core.config import settings
+import model  # noqa: F401  registra las tablas en SQLModel.metadata
+
+config = context.config
+
+if config.config_file_name is not None:
+    fileConfig(config.config_file_name)
+
+# configparser interpreta "%", que puede aparecer en contraseñas codificadas
+config.set_main_option(
+    "sqlalchemy.url", str(settings.SQLALCHEMY_DATABASE_URI).replace("%", "%%")
+)
+
+target_metadata = SQLModel.metadata
+
+
+def include_object(object, name, type_, reflected, compare_to) -> bool:
+    # Los índices trigram de la búsqueda (0005) son sobre f_unaccent(), que
+    # no existe en una base creada con create_all, y no se declaran en model.py
+    if type_ == "index" and reflected and compare_to is None and name.endswith("_trgm"):
+        return False
+    return True
+
+
+def run_migrations_offline() -> None:
+    """Genera el SQL de las migraciones sin conectarse a la base de datos."""
+    context.configure(
+        url=config.get_main_option("sqlalchemy.url"),
+        target_metadata=target_metadata,
+        literal_binds=True,
+        include_object=include_object,
+        dialect_opts={"paramstyle": "named"},
+    )
+
+    with context.begin_transaction():
+        context.run_migrations()
+
+
+def run_migrations_online() -> None:
+    """Aplica las migraciones sobre la base de datos configurada."""
+    connectable = engine_from_config(
+        config.get_section(config.config_ini_section, {}),
+        prefix="sqlalchemy.",
+        poolclass=pool.NullPool,
+    )
+
+    with connectable.connect() as connection:
+        context.configure(
+            connection=connection, target_metadata=target_metadata, include_object=include_object
+        )
+
+        with context.begin_transaction():
+            context.run_migrations()
+
+
+if context.is_offline_mode():
+    run_migrations_offline()
+else:
+    run_migrations_online()
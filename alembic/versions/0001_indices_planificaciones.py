@@ -0,0 +1,68 @@
+"""Índices para las consultas de planificaciones y dashboard
+
+Las tablas ya existen en producción (se crearon fuera de Alembic), así que
+esta revisión solo agrega los índices de claves foráneas y los compuestos
+que usan los listados y el dashboard. Se crean con CONCURRENTLY para no
+bloquear las escrituras mientras se construyen, y con IF NOT EXISTS para
+que sea segura en bases creadas con `SQLModel.metadata.create_all`.
+
+Revision ID: 0001
+Revises:
+Create Date: 2026-10-18 10:00:00
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+
+# revision identifiers, used by Alembic.
+revision: str = "0001"
+down_revision: Union[str, None] = None
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+# (nombre, tabla, columnas); deben coincidir con los __table_args__ de model.py
+INDICES = [
+    # Filtro principal del dashboard y de los listados: periodo y docente
+    ("ix_planificaciones_periodo_profesor", "planificaciones", ["periodo_id", "profesor_id"]),
+    # Planificaciones de un periodo por fecha límite (atrasos, recordatorios)
+    ("ix_planificaciones_periodo_fecha_subida", "planificaciones", ["periodo_id", "fecha_subida"]),
+    ("ix_planificaciones_asignaturas_id", "planificaciones", ["asignaturas_id"]),
+    # Unión planificaciones -> planificacion_profesor filtrando por estado
+    ("ix_planificacion_profesor_planificacion_estado", "planificacion_profesor", ["planificacion_id", "estado"]),
+    # Tarea periódica que actualiza los estados pendientes
+    ("ix_planificacion_profesor_estado", "planificacion_profesor", ["estado"]),
+    ("ix_planificacion_profesor_revisor", "planificacion_profesor", ["profesor_revisor_id"]),
+    ("ix_planificacion_profesor_aprobador", "planificacion_profesor", ["profesor_aprobador_id"]),
+    ("ix_asignaturas_area_id", "asignaturas", ["area_id"]),
+    ("ix_areas_profesor_profesor_id", "areas_profesor", ["profesor_id"]),
+    ("ix_areas_profesor_area_id", "areas_profesor", ["area_id"]),
+    ("ix_comentarios_planificacion_profesor_id", "comentarios", ["planificacion_profesor_id"]),
+    ("ix_informe_profesor_periodo_profesor", "informe_profesor", ["periodo_id", "profesor_id"]),
+    ("ix_comentarios_informe_informe_profesor_id", "comentarios_informe", ["informe_profesor_id"]),
+    ("ix_accesstoken_profesor_id", "accesstoken", ["profesor_id"]),
+]
+
+
+def upgrade() -> None:
+    # CREATE INDEX CONCURRENTLY no puede ejecutarse dentro de una transacción
+    with op.get_context().autocommit_block():
+        for nombre, tabla, columnas in INDICES:
+            op.create_index(
+                nombre, tabla, columnas,
+                postgresql_concurrently=True,
+                if_not_exists=True,
+            )
+        # Estadísticas frescas para que el planificador use los índices nuevos
+        for tabla in sorted({tabla for _, tabla, _ in INDICES}):
+            op.execute(f"ANALYZE {tabla}")
+
+
+def downgrade() -> None:
+    with op.get_context().autocommit_block():
+        for nombre, tabla, _ in reversed(INDICES):
+            op.drop_index(
+                nombre, table_name=tabla,
+                postgresql_concurrently=True,
+                if_exists=True,
+            )
@@ -0,0 +1,46 @@
+"""Tabla email_outbox para la cola de correos
+
+Revision ID: 0002
+Revises: 0001
+Create Date: 2026-10-18 12:00:00
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+# revision identifiers, used by Alembic.
+revision: str = "0002"
+down_revision: Union[str, None] = "0001"
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    op.create_table(
+        "email_outbox",
+        sa.Column("id", sa.Integer(), primary_key=True),
+        sa.Column("destinatario", sa.String(length=320), nullable=False),
+        sa.Column("asunto", sa.String(), nullable=False),
+        sa.Column("html", sa.String(), nullable=True),
+        sa.Column("texto", sa.String(), nullable=True),
+        sa.Column("estado", sa.String(length=20), nullable=False),
+        sa.Column("intentos", sa.Integer(), nullable=False),
+        sa.Column("ultimo_error", sa.String(), nullable=True),
+        sa.Column("proximo_intento", sa.DateTime(timezone=True), nullable=False),
+        sa.Column("creado_en", sa.DateTime(timezone=True), nullable=False),
+        sa.Column("enviado_en", sa.DateTime(timezone=True), nullable=True),
+    )
+    # El worker solo busca filas pendientes, así que el índice es parcial
+    op.create_index(
+        "ix_email_outbox_pendientes", "email_outbox", ["proximo_intento"],
+        postgresql_where=sa.text("estado = 'pendiente'"),
+    )
+    op.create_index("ix_email_outbox_enviado_en", "email_outbox", ["enviado_en"])
+
+
+def downgrade() -> None:
+    op.drop_index("ix_email_outbox_enviado_en", table_name="email_outbox")
+    op.drop_index("ix_email_outbox_pendientes", table_name="email_outbox")
+    op.drop_table("email_outbox")
@@ -0,0 +1,48 @@
+"""Registro de recordatorios de fecha límite
+
+Revision ID: 0003
+Revises: 0002
+Create Date: 2026-10-18 14:00:00
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+# revision identifiers, used by Alembic.
+revision: str = "0003"
+down_revision: Union[str, None] = "0002"
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    op.create_table(
+        "recordatorio_planificacion",
+        sa.Column("id", sa.Integer(), primary_key=True),
+        sa.Column(
+            "planificacion_profesor_id", sa.Integer(),
+            sa.ForeignKey("planificacion_profesor.id"), nullable=False,
+        ),
+        sa.Column("horas", sa.Integer(), nullable=False),
+        sa.Column("enviado_en", sa.DateTime(timezone=True), nullable=False),
+        sa.UniqueConstraint("planificacion_profesor_id", "horas", name="uq_recordatorio_planificacion_horas"),
+    )
+    # Rango de fecha_subida de la tarea de recordatorios, sin filtrar por periodo
+    with op.get_context().autocommit_block():
+        op.create_index(
+            "ix_planificaciones_fecha_subida", "planificaciones", ["fecha_subida"],
+            postgresql_concurrently=True,
+            if_not_exists=True,
+        )
+
+
+def downgrade() -> None:
+    with op.get_context().autocommit_block():
+        op.drop_index(
+            "ix_planificaciones_fecha_subida", table_name="planificaciones",
+            postgresql_concurrently=True,
+            if_exists=True,
+        )
+    op.drop_table("recordatorio_planificacion")
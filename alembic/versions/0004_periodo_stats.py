@@ -0,0 +1,44 @@
+"""Tabla periodo_stats con los conteos del dashboard
+
+Revision ID: 0004
+Revises: 0003
+Create Date: 2026-10-18 16:00:00
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+# revision identifiers, used by Alembic.
+revision: str = "0004"
+down_revision: Union[str, None] = "0003"
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    op.create_table(
+        "periodo_stats",
+        sa.Column("periodo_id", sa.Integer(), primary_key=True),
+        sa.Column("area_id", sa.Integer(), primary_key=True),
+        sa.Column("profesor_id", sa.Integer(), primary_key=True),
+        sa.Column("estado", sa.String(), primary_key=True),
+        sa.Column("total", sa.Integer(), nullable=False),
+    )
+    # Carga inicial, igual que scripts/reconstruir_periodo_stats.py
+    op.execute(
+        """
+        INSERT INTO periodo_stats (periodo_id, area_id, profesor_id, estado, total)
+        SELECT coalesce(p.periodo_id, 0), coalesce(a.area_id, 0),
+               coalesce(p.profesor_id, 0), coalesce(pp.estado, ''), count(*)
+        FROM planificacion_profesor pp
+        JOIN planificaciones p ON p.id = pp.planificacion_id
+        LEFT JOIN asignaturas a ON a.id = p.asignaturas_id
+        GROUP BY 1, 2, 3, 4
+        """
+    )
+
+
+def downgrade() -> None:
+    op.drop_table("periodo_stats")
@@ -0,0 +1,54 @@
+"""Búsqueda por trigramas sin acentos
+
+Revision ID: 0005
+Revises: 0004
+Create Date: 2026-10-18 17:00:00
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+
+# revision identifiers, used by Alembic.
+revision: str = "0005"
+down_revision: Union[str, None] = "0004"
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+# (índice, tabla, columna) de las búsquedas del autocompletado
+INDICES = [
+    ("ix_profesores_nombre_trgm", "profesores", "nombre"),
+    ("ix_profesores_cedula_trgm", "profesores", "cedula"),
+    ("ix_asignaturas_nombre_trgm", "asignaturas", "nombre"),
+    ("ix_asignaturas_codigo_trgm", "asignaturas", "codigo"),
+    ("ix_areas_nombre_trgm", "areas", "nombre"),
+    ("ix_areas_codigo_trgm", "areas", "codigo"),
+    ("ix_periodo_nombre_trgm", "periodo", "nombre"),
+]
+
+
+def upgrade() -> None:
+    op.execute("CREATE EXTENSION IF NOT EXISTS pg_trgm")
+    op.execute("CREATE EXTENSION IF NOT EXISTS unaccent")
+    # unaccent() es STABLE porque depende del diccionario configurado y no se
+    # puede indexar; con el diccionario explícito el resultado es fijo
+    op.execute(
+        """
+        CREATE OR REPLACE FUNCTION f_unaccent(text) RETURNS text
+        LANGUAGE sql IMMUTABLE PARALLEL SAFE STRICT
+        AS $$ SELECT public.unaccent('public.unaccent'::regdictionary, $1) $$
+        """
+    )
+    with op.get_context().autocommit_block():
+        for nombre, tabla, columna in INDICES:
+            op.execute(
+                f"CREATE INDEX CONCURRENTLY IF NOT EXISTS {nombre} "
+                f"ON {tabla} USING gin (f_unaccent({columna}) gin_trgm_ops)"
+            )
+
+
+def downgrade() -> None:
+    with op.get_context().autocommit_block():
+        for nombre, _, _ in INDICES:
+            op.execute(f"DROP INDEX CONCURRENTLY IF EXISTS {nombre}")
+    op.execute("DROP FUNCTION IF EXISTS f_unaccent(text)")
@@ -0,0 +1,73 @@
+"""Un token de acceso por profesor
+
+Revision ID: 0006
+Revises: 0005
+Create Date: 2026-10-18 19:00:00
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+# revision identifiers, used by Alembic.
+revision: str = "0006"
+down_revision: Union[str, None] = "0005"
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    # Dos inicios de sesión simultáneos podían dejar dos tokens del mismo
+    # profesor; se conserva el creado más recientemente (created_at)
+    op.execute(
+        """
+        DELETE FROM accesstoken a
+        USING accesstoken b
+        WHERE a.profesor_id = b.profesor_id
+          AND (a.created_at, a.token) < (b.created_at, b.token)
+        """
+    )
+    with op.get_context().autocommit_block():
+        # Si la versión anterior de la API insertó un token duplicado entre el
+        # DELETE y el CREATE INDEX CONCURRENTLY, la construcción falla y deja
+        # el índice marcado como inválido. Al repetir la migración ese índice
+        # se borra y se vuelve a construir; con if_not_exists se conservaría
+        # y ON CONFLICT (profesor_id) fallaría en cada inicio de sesión.
+        invalido = op.get_bind().execute(
+            sa.text(
+                "SELECT NOT indisvalid FROM pg_index "
+                "WHERE indexrelid = to_regclass('uq_accesstoken_profesor_id')"
+            )
+        ).scalar()
+        if invalido:
+            op.drop_index(
+                "uq_accesstoken_profesor_id", table_name="accesstoken",
+                postgresql_concurrently=True,
+            )
+        op.create_index(
+            "uq_accesstoken_profesor_id", "accesstoken", ["profesor_id"],
+            unique=True,
+            postgresql_concurrently=True,
+            if_not_exists=True,
+        )
+        # El índice único reemplaza al de 0001
+        op.drop_index(
+            "ix_accesstoken_profesor_id", table_name="accesstoken",
+            postgresql_concurrently=True,
+            if_exists=True,
+        )
+
+
+def downgrade() -> None:
+    with op.get_context().autocommit_block():
+        op.create_index(
+            "ix_accesstoken_profesor_id", "accesstoken", ["profesor_id"],
+            postgresql_concurrently=True,
+            if_not_exists=True,
+        )
+        op.drop_index(
+            "uq_accesstoken_profesor_id", table_name="accesstoken",
+            postgresql_concurrently=True,
+            if_exists=True,
+        )
@@ -0,0 +1,43 @@
+"""Correos reservados ('enviando') en el índice de pendientes
+
+Revision ID: 0007
+Revises: 0006
+Create Date: 2026-10-18 20:00:00
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+# revision identifiers, used by Alembic.
+revision: str = "0007"
+down_revision: Union[str, None] = "0006"
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def _recrear_indice(predicado: str) -> None:
+    with op.get_context().autocommit_block():
+        op.drop_index(
+            "ix_email_outbox_pendientes", table_name="email_outbox",
+            postgresql_concurrently=True,
+            if_exists=True,
+        )
+        op.create_index(
+            "ix_email_outbox_pendientes", "email_outbox", ["proximo_intento"],
+            postgresql_where=sa.text(predicado),
+            postgresql_concurrently=True,
+        )
+
+
+def upgrade() -> None:
+    # El worker también vuelve a tomar los correos 'enviando' cuya reserva
+    # venció, así que deben seguir en el índice parcial
+    _recrear_indice("estado IN ('pendiente', 'enviando')")
+
+
+def downgrade() -> None:
+    # Los correos reservados vuelven a la cola
+    op.execute("UPDATE email_outbox SET estado = 'pendiente' WHERE estado = 'enviando'")
+    _recrear_indice("estado = 'pendiente'")
@@ -0,0 +1,31 @@
+from sqlalchemy import String, func, literal, or_
+from sqlalchemy.sql.elements import ColumnElement
+
+# f_unaccent es un envoltorio IMMUTABLE de unaccent (migración 0005); los
+# índices trigram de las columnas de búsqueda están definidos sobre esta
+# misma expresión y solo se usan si la consulta la repite tal cual
+def sin_acentos(valor) -> ColumnElement[str]:
+    return func.f_unaccent(valor, type_=String)
+
+
+def coincide(query: str, *columnas) -> ColumnElement[bool]:
+    """
+    Condición de búsqueda para el autocompletado: alguna de `columnas`
+    contiene `query`, sin distinguir mayúsculas ni acentos ("matematicas"
+    encuentra "Matemáticas").
+
+    Equivale al `ilike('%query%')` de antes, pero como compara
+    `f_unaccent(columna)` puede usar los índices GIN de pg_trgm.
+    """
+    patron = literal("%", String) + sin_acentos(query) + literal("%", String)
+    return or_(*(sin_acentos(columna).ilike(patron) for columna in columnas))
+
+
+def relevancia(query: str, *columnas) -> ColumnElement[float]:
+    """
+    Similitud trigram entre `query` y la palabra más parecida de las
+    `columnas`, para ordenar los resultados de más a menos relevante.
+    """
+    termino = sin_acentos(query)
+    similitudes = [func.word_similarity(termino, sin_acentos(columna)) for columna in columnas]
+    return similitudes[0] if len(similitudes) == 1 else func.greatest(*similitudes)
@@ -0,0 +1,105 @@
+from typing import AsyncIterator
+
+from sqlalchemy.orm import aliased
+from sqlmodel import select
+from sqlmodel.ext.asyncio.session import AsyncSession
+from sqlmodel.sql.expression import Select
+
+from api.paginacion import Paginacion
+from core.config import settings
+from model import (
+    Areas, Asignaturas, Periodo, Planificacion_Listado_Dto, Planificacion_Profesor,
+    Planificaciones, Profesores, areas_profesor,
+)
+
+ProfesorAprobador = aliased(Profesores, name="profesor_aprobador")
+ProfesorRevisor = aliased(Profesores, name="profesor_revisor")
+
+
+def consulta_planificaciones() -> Select:
+    """
+    Consulta base de los listados de planificaciones.
+
+    Resuelve en una sola consulta los nombres del docente, la asignatura, el
+    periodo, el área y los profesores aprobador y revisor (este último a
+    través de areas_profesor). Cada columna lleva el nombre del campo
+    correspondiente de Planificacion_Listado_Dto; las rutas solo agregan sus
+    filtros con `.where(...)`.
+    """
+    return (
+        select(
+            Planificaciones.titulo,
+            Planificaciones.descripcion,
+            Planificaciones.fecha_subida,
+            Planificaciones.profesor_id,
+            Planificaciones.asignaturas_id,
+            Planificaciones.periodo_id,
+            Planificacion_Profesor.id,
+            Planificacion_Profesor.planificacion_id.label("id_planificacion"),
+            Profesores.nombre.label("profesor_nombre"),
+            Periodo.nombre.label("periodo_nombre"),
+            Asignaturas.nombre.label("asignatura_nombre"),
+            Asignaturas.curso.label("curso_nombre"),
+            Asignaturas.paralelo,
+            Areas.id.label("area_id"),
+            Areas.nombre.label("area_nombre"),
+            Areas.codigo.label("area_codigo"),
+            Planificacion_Profesor.profesor_aprobador_id,
+            ProfesorAprobador.nombre.label("profesor_aprobador_nombre"),
+            Planificacion_Profesor.profesor_revisor_id,
+            ProfesorRevisor.nombre.label("profesor_revisor_nombre"),
+            Planificacion_Profesor.fecha_de_actualizacion,
+            Planificacion_Profesor.estado,
+            Planificacion_Profesor.archivo,
+        )
+        .select_from(Planificaciones)
+        .join(Profesores, Planificaciones.profesor_id == Profesores.id)
+        .join(Asignaturas, Planificaciones.asignaturas_id == Asignaturas.id)
+        .join(Periodo, Planificaciones.periodo_id == Periodo.id)
+        .join(Areas, Asignaturas.area_id == Areas.id)
+        .join(Planificacion_Profesor, Planificaciones.id == Planificacion_Profesor.planificacion_id)
+        .join(
+            ProfesorAprobador,
+            Planificacion_Profesor.profesor_aprobador_id == ProfesorAprobador.id,
+            isouter=True
+        )
+        .join(
+            areas_profesor,
+            Planificacion_Profesor.profesor_revisor_id == areas_profesor.id,
+            isouter=True
+        )
+        .join(ProfesorRevisor, areas_profesor.profesor_id == ProfesorRevisor.id, isouter=True)
+    )
+
+
+async def listar_planificaciones(session: AsyncSession, consulta: Select) -> list[Planificacion_Listado_Dto]:
+    """Ejecuta una consulta de `consulta_planificaciones` y devuelve filas tipadas."""
+    filas = (await session.exec(consulta)).all()
+    # Los datos vienen de la base de datos, no hace falta validarlos de nuevo
+    return [Planificacion_Listado_Dto.model_construct(**fila._mapping) for fila in filas]
+
+
+async def listar_pagina(
+    session: AsyncSession, consulta: Select, pagina: Paginacion
+) -> list[Planificacion_Listado_Dto]:
+    """
+    Como `listar_planificaciones`, pero devuelve una página ordenada por
+    fecha de subida e id de planificacion_profesor.
+    """
+    if pagina.total:
+        pagina.registrar_total((await session.exec(pagina.contar(consulta))).one())
+    consulta = pagina.ordenar(consulta, Planificaciones.fecha_subida, Planificacion_Profesor.id)
+    return pagina.recortar(await listar_planificaciones(session, consulta))
+
+
+async def iterar_planificaciones(
+    session: AsyncSession, consulta: Select, lote: int = settings.EXPORTACION_LOTE
+) -> AsyncIterator[list[Planificacion_Listado_Dto]]:
+    """
+    Recorre una consulta de `consulta_planificaciones` con un cursor del
+    servidor y entrega las filas en listas de a lo sumo `lote`, de modo que
+    en memoria nunca está el resultado completo.
+    """
+    resultado = await session.stream(consulta.execution_options(yield_per=lote))
+    async for filas in resultado.partitions():
+        yield [Planificacion_Listado_Dto.model_construct(**fila._mapping) for fila in filas]
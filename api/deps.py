@@ -1,19 +1,22 @@
-from collections.abc import Generator
+from collections.abc import AsyncGenerator, Generator
 import ftplib
 from typing import Annotated, Optional
 
 # import jwt
-from fastapi import Depends, HTTPException, status
+from fastapi import Depends, HTTPException, Request, status
 from fastapi.security import OAuth2PasswordBearer
 # from jwt.exceptions import InvalidTokenError
 from pydantic import ValidationError
 from sqlmodel import Session
+from sqlmodel.ext.asyncio.session import AsyncSession
 
 # from app.core import security
+from api.paginacion import Paginacion
+from core.cache import CachePDF
 from core.config import settings
-from core.db import engine
-import smtplib 
-from email.message import EmailMessage 
+from core.db import async_engine, engine
+from core.ftp import FTPPool
+from core.storage import FTPStorage, LocalStorage, Storage
 #from app.models import TokenPayload, User
 
 # reusable_oauth2 = OAuth2PasswordBearer(
@@ -27,53 +30,26 @@ def get_db() -> Generator[Session, None, None]:
 
 
 SessionDep = Annotated[Session, Depends(get_db)]
-#TokenDep = Annotated[str, Depends(reusable_oauth2)]
-
-def sender_email(to: str, subject: str, text: str) -> True:
-
-    try:
-        sender_email_address = settings.EMAILS_FROM_EMAIL
-        email_smtp = settings.SMTP_HOST
-        email_password = settings.SMTP_PASSWORD
-
-        # Create an email message object 
-        message = EmailMessage() 
-
-        # Configure email headers 
-        message['Subject'] = subject 
-        message['From'] = sender_email_address 
-        message['To'] = to 
-
-        # Set email body text 
-        message.set_content(text) 
 
-        # Set smtp server and port 
-        server = smtplib.SMTP(email_smtp, '587') 
 
-        # Identify this client to the SMTP server 
-        server.ehlo() 
-
-        # Secure the SMTP connection 
-        server.starttls() 
+async def get_async_db() -> AsyncGenerator[AsyncSession, None]:
+    # expire_on_commit=False: tras un commit los objetos siguen legibles sin
+    # volver a consultar, algo que en modo asíncrono no puede hacerse en
+    # forma implícita
+    async with AsyncSession(async_engine, expire_on_commit=False) as session:
+        yield session
 
-        # Login to email account 
-        server.login(sender_email_address, email_password) 
 
-        # Send email 
-        server.send_message(message) 
+AsyncSessionDep = Annotated[AsyncSession, Depends(get_async_db)]
 
-        # Close connection to server 
-        server.quit()
-        return True
-    except Exception as e:
-        print(f"Error al enviar el correo: {e}")
-        return False
-    
+PaginacionDep = Annotated[Paginacion, Depends()]
+#TokenDep = Annotated[str, Depends(reusable_oauth2)]
 
 def conexion_ftp(
     host: str = settings.FTP_SERVER, 
     user: str = settings.FTP_USER, 
     passwd: str = settings.FTP_PASSWORD,
+    port: int = settings.FTP_PORT,
 
 ) -> Optional[ftplib.FTP]:
     """
@@ -83,7 +59,7 @@ def conexion_ftp(
         host (str): Dirección del servidor FTP
         user (str): Nombre de usuario para la autenticación
         passwd (str): Contraseña de acceso
-        timeout (int): Tiempo máximo de espera para la conexión
+        port (int): Puerto del servidor FTP
     
     Returns:
         ftplib.FTP: Objeto de conexión FTP o None si falla
@@ -97,7 +73,7 @@ def conexion_ftp(
         ftp.set_pasv(True)
         
         # Conectar al servidor con información detallada de logging
-        ftp.connect(host=host)
+        ftp.connect(host=host, port=port)
         
         # Autenticar con credenciales
         ftp.login(user=user, passwd=passwd)
@@ -122,13 +98,48 @@ def cerrar_conexion_ftp(ftp: Optional[ftplib.FTP]) -> None:
         except ftplib.all_errors as e:
             ftp.close()
 
-def reconectar_ftp(ftp: Optional[ftplib.FTP]) -> ftplib.FTP:
+
+def crear_pool_ftp() -> FTPPool:
+    """
+    Crea el pool de conexiones FTP con la configuración de la aplicación.
+    Las conexiones se abren bajo demanda, no al crear el pool.
+    """
+    return FTPPool(
+        factory=conexion_ftp,
+        max_size=settings.FTP_POOL_MAX_SIZE,
+        idle_timeout=settings.FTP_POOL_IDLE_TIMEOUT,
+        checkout_timeout=settings.FTP_POOL_CHECKOUT_TIMEOUT,
+    )
+
+
+def crear_storage(ftp_pool: FTPPool) -> Storage:
+    """
+    Crea el almacenamiento de archivos según STORAGE_BACKEND.
+    """
+    if settings.STORAGE_BACKEND == "local":
+        return LocalStorage(settings.LOCAL_STORAGE_DIR)
+    return FTPStorage(ftp_pool)
+
+
+def get_storage(request: Request) -> Storage:
+    return request.app.storage
+
+
+StorageDep = Annotated[Storage, Depends(get_storage)]
+
+
+def crear_cache_pdf() -> CachePDF:
     """
-    Reconectar automáticamente si la conexión FTP está cerrada.
+    Crea la caché local de PDF con la configuración de la aplicación.
     """
-    if not ftp or ftp.sock is None:  # Verifica si la conexión está cerrada
-        ftp = conexion_ftp()  # Reestablece la conexión
-    return ftp
+    return CachePDF(settings.PDF_CACHE_DIR, settings.PDF_CACHE_MAX_BYTES)
+
+
+def get_cache_pdf(request: Request) -> CachePDF:
+    return request.app.pdf_cache
+
+
+CachePDFDep = Annotated[CachePDF, Depends(get_cache_pdf)]
 
 
 # def get_current_user(session: SessionDep, token: TokenDep) -> User:
@@ -0,0 +1,147 @@
+import posixpath
+from typing import Optional
+from urllib.parse import quote
+
+from fastapi import HTTPException, Response, status
+from fastapi.responses import StreamingResponse
+
+from core.cache import CachePDF
+from core.storage import Storage
+
+
+def parsear_rango(rango: Optional[str], tamano: int) -> Optional[tuple[int, int]]:
+    """
+    Interpreta la cabecera Range de una petición.
+
+    Solo se admite un rango de bytes (`bytes=inicio-fin`, `bytes=inicio-` o
+    `bytes=-sufijo`). Si no hay cabecera, no es de bytes, pide varios rangos
+    o no es sintácticamente válida (por ejemplo `bytes=10-5`, con el final
+    antes del inicio) se devuelve None y se responde el archivo completo,
+    como indica el RFC 9110 (sección 14.1.1).
+
+    Returns:
+        (inicio, fin) con ambos extremos incluidos, o None
+
+    Raises:
+        HTTPException: 416 si el rango es válido pero no se puede satisfacer:
+            empieza después del final del archivo o es un sufijo de 0 bytes
+    """
+    if not rango:
+        return None
+
+    unidad, _, especificacion = rango.partition("=")
+    if unidad.strip().lower() != "bytes" or "," in especificacion:
+        return None
+
+    inicio_str, separador, fin_str = especificacion.strip().partition("-")
+    if not separador or not (inicio_str or fin_str):
+        return None
+    if (inicio_str and not inicio_str.isdigit()) or (fin_str and not fin_str.isdigit()):
+        return None
+
+    if inicio_str == "":
+        # Últimos N bytes; un sufijo de 0 bytes no selecciona nada
+        sufijo = int(fin_str)
+        if sufijo == 0 or tamano == 0:
+            _rango_no_satisfacible(tamano)
+        return max(tamano - sufijo, 0), tamano - 1
+
+    inicio = int(inicio_str)
+    fin = int(fin_str) if fin_str else None
+    if fin is not None and fin < inicio:
+        return None
+    if inicio >= tamano:
+        _rango_no_satisfacible(tamano)
+    return inicio, tamano - 1 if fin is None else min(fin, tamano - 1)
+
+
+def _rango_no_satisfacible(tamano: int) -> None:
+    raise HTTPException(
+        status_code=status.HTTP_416_REQUESTED_RANGE_NOT_SATISFIABLE,
+        detail="Rango solicitado no válido.",
+        headers={"Content-Range": f"bytes */{tamano}"},
+    )
+
+
+def coincide_etag(if_none_match: Optional[str], etag: str) -> bool:
+    """Indica si la cabecera If-None-Match incluye `etag` (comparación débil)."""
+    if not if_none_match:
+        return False
+    candidatos = [valor.strip() for valor in if_none_match.split(",")]
+    return "*" in candidatos or any(c.removeprefix("W/") == etag for c in candidatos)
+
+
+def _respuesta_parcial(
+    storage: Storage,
+    ruta: str,
+    tamano: int,
+    headers: dict[str, str],
+    rango: Optional[str],
+    media_type: str,
+) -> StreamingResponse:
+    seleccion = parsear_rango(rango, tamano)
+    if seleccion is None:
+        headers["Content-Length"] = str(tamano)
+        return StreamingResponse(
+            storage.stream(ruta),
+            media_type=media_type,
+            headers=headers,
+        )
+
+    inicio, fin = seleccion
+    longitud = fin - inicio + 1
+    headers["Content-Length"] = str(longitud)
+    headers["Content-Range"] = f"bytes {inicio}-{fin}/{tamano}"
+    return StreamingResponse(
+        storage.stream(ruta, offset=inicio, length=longitud),
+        status_code=status.HTTP_206_PARTIAL_CONTENT,
+        media_type=media_type,
+        headers=headers,
+    )
+
+
+async def respuesta_archivo(
+    storage: Storage,
+    ruta: str,
+    rango: Optional[str] = None,
+    media_type: str = "application/pdf",
+    cache: Optional[CachePDF] = None,
+    if_none_match: Optional[str] = None,
+) -> Response:
+    """
+    Devuelve el archivo como StreamingResponse leyendo directamente del
+    almacenamiento, sin copiarlo a un archivo temporal. Los bloques se leen
+    a medida que el cliente los consume, de modo que una descarga lenta no
+    acumula el archivo en memoria. Soporta peticiones Range para que los
+    visores de PDF puedan pedir el documento por partes.
+
+    Con `cache` el archivo se sirve desde el disco local tras la primera
+    descarga, con un ETag basado en su contenido; si el cliente ya tiene esa
+    versión (If-None-Match) se responde 304 sin cuerpo.
+
+    Raises:
+        FileNotFoundError: Si el archivo no existe en el almacenamiento
+        HTTPException: 416 si el rango no se puede satisfacer
+    """
+    nombre = posixpath.basename(ruta)
+    headers = {
+        "Accept-Ranges": "bytes",
+        "Content-Disposition": f"attachment; filename*=UTF-8''{quote(nombre)}",
+    }
+
+    if cache is not None and cache.habilitada:
+        entrada = await cache.obtener_o_cargar(storage, ruta)
+        if entrada is not None:
+            etag = f'"{entrada.etag}"'
+            # El navegador puede guardar el archivo pero debe revalidarlo
+            cabeceras_cache = {"ETag": etag, "Cache-Control": "private, no-cache"}
+            if coincide_etag(if_none_match, etag):
+                return Response(status_code=status.HTTP_304_NOT_MODIFIED, headers=cabeceras_cache)
+
+            headers.update(cabeceras_cache)
+            return _respuesta_parcial(
+                cache.archivos, cache.nombre_archivo(ruta), entrada.tamano, headers, rango, media_type
+            )
+
+    tamano = await storage.size(ruta)
+    return _respuesta_parcial(storage, ruta, tamano, headers, rango, media_type)
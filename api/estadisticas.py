@@ -0,0 +1,125 @@
+from collections import Counter
+from typing import Iterable, Optional
+
+from sqlalchemy import delete, insert, text
+from sqlalchemy.dialects.postgresql import insert as pg_insert
+from sqlalchemy.sql.elements import ColumnElement
+from sqlmodel import Session, func, select
+
+from model import Asignaturas, Periodo_Stats, Planificacion_Profesor, Planificaciones
+
+# Clave de periodo_stats: (periodo_id, area_id, profesor_id, estado)
+Clave = tuple[int, int, int, str]
+
+# Las columnas de la clave primaria no admiten NULL; una planificación sin
+# periodo, área o profesor se cuenta con 0 y una sin estado con ""
+SIN_ID = 0
+SIN_ESTADO = ""
+
+_COLUMNAS_CLAVE = (
+    func.coalesce(Planificaciones.periodo_id, SIN_ID),
+    func.coalesce(Asignaturas.area_id, SIN_ID),
+    func.coalesce(Planificaciones.profesor_id, SIN_ID),
+    func.coalesce(Planificacion_Profesor.estado, SIN_ESTADO),
+)
+
+
+def clave(
+    periodo_id: Optional[int], area_id: Optional[int], profesor_id: Optional[int], estado: Optional[str]
+) -> Clave:
+    return (
+        periodo_id if periodo_id is not None else SIN_ID,
+        area_id if area_id is not None else SIN_ID,
+        profesor_id if profesor_id is not None else SIN_ID,
+        estado if estado is not None else SIN_ESTADO,
+    )
+
+
+def estado_publico(estado: str) -> Optional[str]:
+    """Estado como lo devolvían las rutas que agregaban sobre las tablas."""
+    return None if estado == SIN_ESTADO else estado
+
+
+def _consulta_planificaciones():
+    return (
+        select(*_COLUMNAS_CLAVE, func.count())
+        .select_from(Planificacion_Profesor)
+        .join(Planificaciones, Planificaciones.id == Planificacion_Profesor.planificacion_id)
+        .join(Asignaturas, Asignaturas.id == Planificaciones.asignaturas_id, isouter=True)
+        .group_by(*_COLUMNAS_CLAVE)
+    )
+
+
+def conteos(session: Session, *condiciones: ColumnElement[bool]) -> Counter:
+    """
+    Cantidad de planificaciones por clave de periodo_stats entre las que
+    cumplen `condiciones`.
+
+    Se usa antes y después de modificar planificaciones para calcular lo que
+    hay que sumar o restar con `registrar_cambios`.
+    """
+    filas = session.exec(_consulta_planificaciones().where(*condiciones)).all()
+    return Counter({tuple(fila[:4]): fila[4] for fila in filas})
+
+
+def registrar_cambios(session: Session, antes: Counter, despues: Counter) -> None:
+    """
+    Aplica a periodo_stats la diferencia entre dos conteos en la transacción
+    de `session`, con un solo INSERT ... ON CONFLICT DO UPDATE.
+
+    Debe llamarse antes del commit que guarda las planificaciones, así el
+    cambio y las estadísticas se confirman o revierten juntos.
+    """
+    cambios = Counter(despues)
+    cambios.subtract(antes)
+    filas = [
+        {"periodo_id": c[0], "area_id": c[1], "profesor_id": c[2], "estado": c[3], "total": total}
+        for c, total in cambios.items() if total
+    ]
+    if not filas:
+        return
+    statement = pg_insert(Periodo_Stats).values(filas)
+    statement = statement.on_conflict_do_update(
+        index_elements=["periodo_id", "area_id", "profesor_id", "estado"],
+        set_={"total": Periodo_Stats.total + statement.excluded.total},
+    )
+    session.exec(statement)
+
+
+def cambios_de_estado(filas: Iterable[tuple], estado_anterior: str, estado_nuevo: str) -> tuple[Counter, Counter]:
+    """
+    Conteos antes y después para planificaciones que pasaron de
+    `estado_anterior` a `estado_nuevo`.
+
+    Args:
+        filas: (periodo_id, area_id, profesor_id) de cada planificación
+    """
+    antes, despues = Counter(), Counter()
+    for periodo_id, area_id, profesor_id in filas:
+        antes[clave(periodo_id, area_id, profesor_id, estado_anterior)] += 1
+        despues[clave(periodo_id, area_id, profesor_id, estado_nuevo)] += 1
+    return antes, despues
+
+
+def reconstruir_periodo_stats(session: Session) -> int:
+    """
+    Vuelve a calcular periodo_stats desde las planificaciones.
+
+    La tabla se bloquea en modo EXCLUSIVE mientras tanto: las escrituras que
+    registran cambios esperan a que termine y se aplican sobre el resultado
+    nuevo, y las lecturas del dashboard siguen funcionando.
+
+    Returns:
+        int: Cantidad de filas de periodo_stats
+    """
+    session.exec(text(f"LOCK TABLE {Periodo_Stats.__tablename__} IN EXCLUSIVE MODE"))
+    session.exec(delete(Periodo_Stats))
+    session.exec(
+        insert(Periodo_Stats).from_select(
+            ["periodo_id", "area_id", "profesor_id", "estado", "total"],
+            _consulta_planificaciones(),
+        )
+    )
+    total = session.exec(select(func.count()).select_from(Periodo_Stats)).one()
+    session.commit()
+    return total
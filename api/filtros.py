@@ -0,0 +1,99 @@
+from datetime import date, datetime, timedelta
+from typing import Optional
+
+from fastapi import HTTPException, status
+from sqlalchemy import extract
+from sqlalchemy.sql.elements import ColumnElement
+
+# El fin del rango de un año es el 1 de enero del siguiente, que para 9999
+# ya no entra en datetime
+YEAR_MINIMO = 1900
+YEAR_MAXIMO = 9998
+
+
+def _entero(valor: Optional[str], nombre: str, minimo: int, maximo: int) -> Optional[int]:
+    # El frontend envía "" cuando no hay filtro, igual que antes con ilike
+    if valor is None or not valor.strip():
+        return None
+    try:
+        numero = int(valor)
+    except ValueError:
+        numero = None
+    if numero is None or not minimo <= numero <= maximo:
+        raise HTTPException(
+            status_code=status.HTTP_422_UNPROCESSABLE_ENTITY,
+            detail=f"El parámetro '{nombre}' debe ser un número entre {minimo} y {maximo}."
+        )
+    return numero
+
+
+def rango_fechas(
+    mes: Optional[str] = None,
+    year: Optional[str] = None,
+    desde: Optional[date] = None,
+    hasta: Optional[date] = None,
+) -> tuple[Optional[datetime], Optional[datetime]]:
+    """
+    Convierte los filtros de búsqueda en un rango semiabierto [inicio, fin).
+
+    `year` con `mes` es ese mes completo, `year` solo es el año completo y
+    `desde`/`hasta` son días incluidos. Si se combinan se usa la
+    intersección. `mes` sin `year` no define un rango y lo resuelve
+    `filtro_fecha_subida`.
+
+    Raises:
+        HTTPException: 422 si `mes` o `year` no son válidos
+    """
+    numero_mes = _entero(mes, "mes", 1, 12)
+    numero_year = _entero(year, "year", YEAR_MINIMO, YEAR_MAXIMO)
+
+    inicio: Optional[datetime] = None
+    fin: Optional[datetime] = None
+    if numero_year is not None:
+        if numero_mes is not None:
+            inicio = datetime(numero_year, numero_mes, 1)
+            fin = datetime(numero_year + numero_mes // 12, numero_mes % 12 + 1, 1)
+        else:
+            inicio = datetime(numero_year, 1, 1)
+            fin = datetime(numero_year + 1, 1, 1)
+
+    if desde is not None:
+        desde_dt = datetime.combine(desde, datetime.min.time())
+        inicio = desde_dt if inicio is None else max(inicio, desde_dt)
+    # Con hasta = date.max no hay día siguiente y el rango no tiene fin
+    if hasta is not None and hasta < date.max:
+        hasta_dt = datetime.combine(hasta + timedelta(days=1), datetime.min.time())
+        fin = hasta_dt if fin is None else min(fin, hasta_dt)
+
+    return inicio, fin
+
+
+def filtro_fecha_subida(
+    columna,
+    mes: Optional[str] = None,
+    year: Optional[str] = None,
+    desde: Optional[date] = None,
+    hasta: Optional[date] = None,
+) -> list[ColumnElement[bool]]:
+    """
+    Condiciones para filtrar `columna` por mes, año y rango de fechas.
+
+    Se generan comparaciones `columna >= inicio AND columna < fin` sobre la
+    columna sin transformar, de modo que el índice sobre `fecha_subida` se
+    puede usar. Solo cuando se pide un mes sin año se compara el mes
+    extraído, ya que ese caso abarca varios rangos.
+
+    Raises:
+        HTTPException: 422 si `mes` o `year` no son válidos
+    """
+    inicio, fin = rango_fechas(mes, year, desde, hasta)
+    condiciones = []
+    if inicio is not None:
+        condiciones.append(columna >= inicio)
+    if fin is not None:
+        condiciones.append(columna < fin)
+    if _entero(year, "year", YEAR_MINIMO, YEAR_MAXIMO) is None:
+        numero_mes = _entero(mes, "mes", 1, 12)
+        if numero_mes is not None:
+            condiciones.append(extract("month", columna) == numero_mes)
+    return condiciones
@@ -1,6 +1,6 @@
 from fastapi import APIRouter, Depends
 
-from api.routes import areas, asignaturas, auth, informe, periodos, planificaciones, profesores, dashboard
+from api.routes import areas, asignaturas, auth, informe, periodos, planificaciones, profesores, dashboard, metricas, sistema
 
 api_router = APIRouter()
 api_router.include_router(auth.router, prefix="/auth", tags=["auth"])
@@ -13,3 +13,6 @@ api_router.include_router(periodos.router, prefix="/periodo", tags=["periodo"],
 api_router.include_router(planificaciones.router, prefix="/planificacion", tags=["planificacion"],  dependencies=[Depends(auth.get_current_active_user)])
 api_router.include_router(dashboard.router, prefix="/dashboard", tags=["dashboard"], dependencies=[Depends(auth.get_current_active_user)])
 api_router.include_router(informe.router, prefix="/informe", tags=["informe"], dependencies=[Depends(auth.get_current_active_user)])
+api_router.include_router(sistema.router, prefix="/sistema", tags=["sistema"], dependencies=[Depends(auth.get_current_active_user)])
+# Lo lee Prometheus, que no tiene un usuario de la API (ver METRICAS_TOKEN)
+api_router.include_router(metricas.router, tags=["sistema"])
@@ -0,0 +1,166 @@
+import base64
+import binascii
+import json
+from datetime import date, datetime
+from typing import Any, Callable, Optional, Sequence
+
+from fastapi import HTTPException, Query, Response, status
+from sqlalchemy import func, literal, tuple_
+from sqlalchemy.sql.elements import ColumnElement
+from sqlmodel import select
+from sqlmodel.sql.expression import Select
+
+from core.config import settings
+
+
+def _a_json(valor: Any) -> Any:
+    # Las fechas se marcan para reconstruir el tipo original al decodificar;
+    # asyncpg no compara un timestamp con un texto
+    if isinstance(valor, datetime):
+        return {"dt": valor.isoformat()}
+    if isinstance(valor, date):
+        return {"d": valor.isoformat()}
+    return valor
+
+
+def _desde_json(valor: Any) -> Any:
+    if isinstance(valor, dict):
+        texto = valor.get("dt", valor.get("d"))
+        if not isinstance(texto, str):
+            raise ValueError("Valor de cursor desconocido")
+        return datetime.fromisoformat(texto) if "dt" in valor else date.fromisoformat(texto)
+    if isinstance(valor, list):
+        raise ValueError("Valor de cursor desconocido")
+    return valor
+
+
+def codificar_cursor(valores: Sequence[Any]) -> str:
+    """Convierte los valores de la clave de orden en un cursor opaco."""
+    datos = json.dumps([_a_json(valor) for valor in valores], separators=(",", ":"))
+    return base64.urlsafe_b64encode(datos.encode()).rstrip(b"=").decode()
+
+
+def decodificar_cursor(cursor: str) -> tuple:
+    """
+    Raises:
+        ValueError: Si el cursor no es válido
+    """
+    try:
+        datos = base64.urlsafe_b64decode(cursor + "=" * (-len(cursor) % 4))
+        valores = json.loads(datos)
+    except (binascii.Error, UnicodeDecodeError, json.JSONDecodeError) as e:
+        raise ValueError("Cursor no válido") from e
+    if not isinstance(valores, list) or not valores:
+        raise ValueError("Cursor no válido")
+    return tuple(_desde_json(valor) for valor in valores)
+
+
+class Paginacion:
+    """
+    Paginación por clave (keyset) para los listados.
+
+    En lugar de OFFSET se ordena por una clave única y se piden las filas
+    posteriores a la última entregada, así el costo de cada página no crece
+    con el número de páginas anteriores. La respuesta sigue siendo la lista
+    de filas; el cursor de la página siguiente se envía en la cabecera
+    `X-Next-Cursor` (ausente en la última página) y, si se pide con
+    `total=true`, el total de filas en `X-Total-Count`.
+
+    La paginación es opcional: sin `limit` ni `cursor` se devuelven todas
+    las filas, como antes de paginar, para no cortar a los clientes que no
+    la conocen. Con `cursor` y sin `limit` se usa PAGINACION_LIMITE.
+
+    Uso en una ruta:
+        consulta = pagina.ordenar(consulta, Tabla.fecha, Tabla.id)
+        filas = pagina.recortar(session.exec(consulta).all())
+    """
+
+    def __init__(
+        self,
+        response: Response,
+        cursor: Optional[str] = Query(None, description="Cursor devuelto en X-Next-Cursor"),
+        limit: Optional[int] = Query(
+            None, ge=1, le=settings.PAGINACION_LIMITE_MAX,
+            description="Cantidad máxima de filas; sin limit ni cursor se devuelven todas",
+        ),
+        total: bool = Query(False, description="Incluir el total de filas en X-Total-Count"),
+    ) -> None:
+        self.response = response
+        # None: sin paginar
+        self.limit: Optional[int] = limit
+        if limit is None and cursor:
+            self.limit = settings.PAGINACION_LIMITE
+        self.total = total
+        self._columnas: tuple[ColumnElement, ...] = ()
+        self._valores: Optional[tuple] = None
+        if cursor:
+            try:
+                self._valores = decodificar_cursor(cursor)
+            except ValueError:
+                self._cursor_invalido()
+
+    @staticmethod
+    def _cursor_invalido() -> None:
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail="El cursor de paginación no es válido."
+        )
+
+    def contar(self, consulta: Select) -> Select:
+        """Consulta que cuenta las filas de `consulta` sin paginar."""
+        return select(func.count()).select_from(consulta.order_by(None).subquery())
+
+    def registrar_total(self, total: int) -> None:
+        self.response.headers["X-Total-Count"] = str(total)
+
+    def ordenar(self, consulta: Select, *columnas: ColumnElement, descendente: bool = False) -> Select:
+        """
+        Ordena `consulta` por `columnas`, que en conjunto deben ser únicas
+        (la última suele ser el id), y aplica el cursor y el límite.
+
+        Raises:
+            HTTPException: 400 si el cursor no corresponde a estas columnas
+        """
+        self._columnas = columnas
+        if self._valores is not None:
+            if len(self._valores) != len(columnas):
+                self._cursor_invalido()
+            valores = [literal(valor, columna.type) for valor, columna in zip(self._valores, columnas)]
+            if len(columnas) == 1:
+                clave, cursor = columnas[0], valores[0]
+            else:
+                clave, cursor = tuple_(*columnas), tuple_(*valores)
+            # La comparación de la primera columna es redundante con la de la
+            # tupla, pero permite que un índice sobre esa columna acote el rango
+            if descendente:
+                consulta = consulta.where(columnas[0] <= valores[0], clave < cursor)
+            else:
+                consulta = consulta.where(columnas[0] >= valores[0], clave > cursor)
+
+        orden = [columna.desc() if descendente else columna.asc() for columna in columnas]
+        consulta = consulta.order_by(*orden)
+        if self.limit is None:
+            return consulta
+        # Una fila extra indica si hay otra página sin necesidad de contar
+        return consulta.limit(self.limit + 1)
+
+    def recortar(self, filas: Sequence[Any], clave: Optional[Callable[[Any], Sequence[Any]]] = None) -> list:
+        """
+        Quita la fila extra pedida por `ordenar` y, si existía, publica el
+        cursor de la página siguiente.
+
+        `clave` obtiene los valores de orden de una fila; por defecto se leen
+        los atributos con el nombre de cada columna de `ordenar`.
+        """
+        filas = list(filas)
+        if self.limit is None or len(filas) <= self.limit:
+            return filas
+
+        filas = filas[:self.limit]
+        ultima = filas[-1]
+        if clave is None:
+            valores = [getattr(ultima, columna.key) for columna in self._columnas]
+        else:
+            valores = clave(ultima)
+        self.response.headers["X-Next-Cursor"] = codificar_cursor(valores)
+        return filas
@@ -0,0 +1,47 @@
+from functools import lru_cache
+from typing import Any, Optional, Sequence
+
+from fastapi import Response
+from fastapi.responses import ORJSONResponse
+from pydantic import BaseModel, TypeAdapter
+
+
+def _con_cabeceras(respuesta: Response, origen: Optional[Response]) -> Response:
+    # Cuando la ruta devuelve su propia respuesta FastAPI descarta las
+    # cabeceras del Response inyectado (X-Next-Cursor, X-Total-Count)
+    if origen is not None:
+        respuesta.headers.raw.extend(origen.headers.raw)
+    return respuesta
+
+
+def respuesta_json(contenido: Any, origen: Optional[Response] = None) -> Response:
+    """
+    Serializa `contenido` directamente con orjson, sin validarlo contra el
+    response_model ni recorrerlo con jsonable_encoder.
+
+    Para listados armados con dicts a partir de filas de la base de datos:
+    solo debe contener tipos que orjson conoce (dict, list, str, números,
+    None, fechas). `origen` es el Response de la ruta o de la paginación,
+    cuyas cabeceras se copian a la respuesta.
+    """
+    return _con_cabeceras(ORJSONResponse(contenido), origen)
+
+
+@lru_cache
+def _adaptador_lista(modelo: type[BaseModel]) -> TypeAdapter:
+    return TypeAdapter(list[modelo])
+
+
+def respuesta_modelos(
+    modelos: Sequence[BaseModel], modelo: type[BaseModel], origen: Optional[Response] = None
+) -> Response:
+    """
+    Serializa una lista de instancias de `modelo` a JSON en pydantic-core,
+    sin la validación del response_model ni el paso intermedio por dicts.
+
+    Las instancias ya tienen el tipo del modelo (filas de la base de datos o
+    `model_construct`), así que el resultado es el mismo que con
+    `response_model=List[modelo]`.
+    """
+    contenido = _adaptador_lista(modelo).dump_json(list(modelos))
+    return _con_cabeceras(Response(contenido, media_type="application/json"), origen)
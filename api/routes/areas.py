@@ -4,7 +4,9 @@ from typing import Any, List
 from sqlalchemy.exc import IntegrityError, SQLAlchemyError
 
 from sqlmodel import select, func
-from api.deps import SessionDep
+from api.deps import PaginacionDep, SessionDep
+from api.busqueda import coincide, relevancia
+from api.respuestas import respuesta_modelos
 from model import  Areas, areas_profesor, Profesores
 
 router = APIRouter()
@@ -44,10 +46,13 @@ async def create_area(area: Areas, session: SessionDep) -> Any:
 
 # Obtener todas las áreas
 @router.get("/", response_description="Listar todas las áreas", response_model=List[Areas])
-async def get_areas(session: SessionDep) -> Any:
+async def get_areas(session: SessionDep, pagina: PaginacionDep) -> Any:
     statement = select(Areas)
-    result = session.exec(statement).all()
-    return result
+    if pagina.total:
+        pagina.registrar_total(session.exec(pagina.contar(statement)).one())
+    statement = pagina.ordenar(statement, Areas.id)
+    result = pagina.recortar(session.exec(statement).all())
+    return respuesta_modelos(result, Areas, pagina.response)
 
 # Obtener un área específica por ID
 @router.get("/{area_id}", response_description="Obtener un área por ID")
@@ -147,8 +152,8 @@ async def get_total_areas(session: SessionDep) -> Any:
 async def search_area(query: str, session: SessionDep) -> Any:
     try:
         statement = select(Areas).where(
-            (Areas.nombre.ilike(f"%{query}%")) | (Areas.codigo.ilike(f"%{query}%"))
-        ).limit(7)
+            coincide(query, Areas.nombre, Areas.codigo)
+        ).order_by(relevancia(query, Areas.nombre, Areas.codigo).desc(), Areas.nombre).limit(7)
 
         result = session.exec(statement).all()
 
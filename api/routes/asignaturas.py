@@ -4,8 +4,11 @@ from typing import Any, List
 from sqlalchemy.exc import IntegrityError, SQLAlchemyError
 
 from sqlmodel import select , func
-from model import Areas, Asignaturas
-from api.deps import SessionDep
+from model import Areas, Asignaturas, Planificaciones
+from api.deps import PaginacionDep, SessionDep
+from api.estadisticas import conteos, registrar_cambios
+from api.busqueda import coincide, relevancia
+from api.respuestas import respuesta_json
 
 router = APIRouter()
 
@@ -52,7 +55,7 @@ async def create_asignatura(asignatura: Asignaturas, session: SessionDep) -> Any
 #     result = session.exec(statement).all()
 #     return result
 @router.get("/", response_description="Listar todas las asignaturas con su área", response_model=List[Any])
-async def get_asignaturas(session: SessionDep) -> Any:
+async def get_asignaturas(session: SessionDep, pagina: PaginacionDep) -> Any:
     try:
         # Consulta para obtener asignaturas junto con el id_area y el nombre del área
         statement = (
@@ -69,9 +72,12 @@ async def get_asignaturas(session: SessionDep) -> Any:
             )
             .join(Areas, Asignaturas.area_id == Areas.id)
         )
+        if pagina.total:
+            pagina.registrar_total(session.exec(pagina.contar(statement)).one())
 
         # Ejecutar la consulta
-        asignaturas = session.exec(statement).all()
+        statement = pagina.ordenar(statement, Asignaturas.id)
+        asignaturas = pagina.recortar(session.exec(statement).all())
 
 
         # Formatear los resultados a partir de las tuplas
@@ -90,8 +96,10 @@ async def get_asignaturas(session: SessionDep) -> Any:
             for id, nombre, area_id, area_nombre, curso, fecha_creacion, descripcion, codigo in asignaturas
         ]
 
-        return result
+        return respuesta_json(result, pagina.response)
 
+    except HTTPException:
+        raise
     except Exception as e:
         # Manejo de errores
         print(f"Error: {e}")
@@ -123,11 +131,20 @@ async def update_asignatura(asignatura_id: int, asignatura: Asignaturas, session
         raise HTTPException(status_code=404, detail="Asignatura no encontrada")
 
     updated_asignatura_data = jsonable_encoder(asignatura)
+    # Al cambiar de área se mueven sus planificaciones en periodo_stats
+    cambia_area = updated_asignatura_data.get("area_id") not in (None, existing_asignatura.area_id)
+    if cambia_area:
+        session.refresh(existing_asignatura, with_for_update=True)
+        conteo_anterior = conteos(session, Planificaciones.asignaturas_id == asignatura_id)
+
     for key, value in updated_asignatura_data.items():
             if value is not None:  # No actualizamos si el valor es None
                 setattr(existing_asignatura, key, value)
     
     session.add(existing_asignatura)
+    if cambia_area:
+        session.flush()
+        registrar_cambios(session, conteo_anterior, conteos(session, Planificaciones.asignaturas_id == asignatura_id))
     session.commit()
     session.refresh(existing_asignatura)
     return existing_asignatura
@@ -174,7 +191,9 @@ async def search_subject(
     try:
         # Construir la consulta para buscar por nombre o código
         statement = select(Asignaturas).where(
-            (Asignaturas.nombre.ilike(f"%{query}%")) | (Asignaturas.codigo.ilike(f"%{query}%"))
+            coincide(query, Asignaturas.nombre, Asignaturas.codigo)
+        ).order_by(
+            relevancia(query, Asignaturas.nombre, Asignaturas.codigo).desc(), Asignaturas.nombre
         ).limit(7)  # Limitar resultados para no saturar la respuesta
         
         # Ejecutar la consulta
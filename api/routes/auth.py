@@ -1,21 +1,27 @@
 from datetime import datetime, timedelta, timezone
 from email.message import Message
+import threading
+import time
 from typing import Annotated, Optional
+from cachetools import TTLCache
 from fastapi import APIRouter, Depends, Form, HTTPException, status
 from fastapi.responses import HTMLResponse
 from fastapi.security import OAuth2PasswordBearer, OAuth2PasswordRequestForm
 from jwt.exceptions import InvalidTokenError
-from passlib.context import CryptContext
 from pydantic import BaseModel
 import pytz
+from sqlalchemy import case
+from sqlalchemy.dialects.postgresql import insert
 from sqlmodel import select
 from pytz import timezone as tz
 import jwt
 
 from model import AccessToken, Profesores
 from api.deps import SessionDep
-from utils import generate_password_reset_token, send_email, generate_reset_password_email, verify_password_reset_token
+from utils import generate_password_reset_token, generate_reset_password_email, verify_password_reset_token
 from core.config import settings
+from core.correo import encolar_email
+from core.security import get_password_hash, verify_and_update_password
 
 # Constants
 SECURITY_CONFIG = {
@@ -55,14 +61,32 @@ class NewPassword(BaseModel):
     token: str
     new_password: str 
 # Security setup
-pwd_context = CryptContext(schemes=["bcrypt"], deprecated="auto")
 oauth2_scheme = OAuth2PasswordBearer(tokenUrl="auth/token")
 router = APIRouter()
 
-# Authentication utilities
+# Tokens ya validados: token -> (usuario, expiración del token). Evita
+# decodificar el JWT y consultar al profesor en cada petición.
+_usuarios_por_token: TTLCache = TTLCache(
+    maxsize=settings.AUTH_CACHE_MAX_SIZE,
+    ttl=settings.AUTH_CACHE_TTL
+)
+_usuarios_lock = threading.Lock()
+
 
-def get_password_hash(password: str) -> str:
-    return pwd_context.hash(password)
+def invalidar_usuario(id: Optional[int] = None, email: Optional[str] = None) -> None:
+    """
+    Quita de la caché los tokens de un usuario tras modificarlo o eliminarlo,
+    para que la siguiente petición vuelva a leerlo de la base de datos.
+    """
+    with _usuarios_lock:
+        tokens = [
+            token for token, (user, _) in list(_usuarios_por_token.items())
+            if (id is not None and user.id == id) or (email is not None and user.email == email)
+        ]
+        for token in tokens:
+            _usuarios_por_token.pop(token, None)
+
+# Authentication utilities
 
 def get_user(session: SessionDep, email: str) -> Optional[UserInDB]:
     """Fetch user from database by email."""
@@ -83,21 +107,26 @@ def get_user(session: SessionDep, email: str) -> Optional[UserInDB]:
         hashed_password=result.password
     )
 
-def verify_password(plain_password: str, hashed_password: str) -> bool:
-
-    return pwd_context.verify(plain_password, hashed_password)
-
-def authenticate_user(session: SessionDep, username: str, password: str) -> Optional[UserInDB]:
+async def authenticate_user(session: SessionDep, username: str, password: str) -> Optional[UserInDB]:
     """Authenticate user credentials."""
     user = session.exec(select(Profesores).where(Profesores.email == username)).first()
-    
-    if not user or not verify_password(password, user.password):
+    if not user:
         return None
 
-    user.is_verified = True
-    user.estado = True
-    session.add(user)
-    session.commit()
+    valida, nuevo_hash = await verify_and_update_password(password, user.password)
+    if not valida:
+        return None
+    # En la mayoría de los inicios de sesión no cambia nada y no hace falta
+    # otro commit además del que guarda el token
+    if nuevo_hash or not user.is_verified or not user.estado:
+        if nuevo_hash:
+            # El hash usaba otro costo de bcrypt; se reemplaza por uno con BCRYPT_ROUNDS
+            user.password = nuevo_hash
+        user.is_verified = True
+        user.estado = True
+        session.add(user)
+        session.commit()
+        invalidar_usuario(id=user.id)
 
     return user
 
@@ -116,28 +145,31 @@ def save_token_to_db(
     token: str,
     created_at: datetime
 ) -> str:
-    """Save or update access token in database."""
-    now = datetime.now(LOCAL_TIMEZONE)
-    existing_token = session.query(AccessToken).filter(
-        AccessToken.profesor_id == profesor_id
-    ).first()
-
-    if existing_token and now < existing_token.created_at:
-        return existing_token.token
+    """
+    Save or update access token in database.
 
-    if existing_token:
-        session.delete(existing_token)
-        session.commit()
+    Cada profesor tiene un solo token (índice único sobre profesor_id). Si el
+    guardado todavía no expiró (`created_at` es su expiración) se conserva y
+    se devuelve ese; si no, se reemplaza por `token`. Todo ocurre en un solo
+    INSERT ... ON CONFLICT, así dos inicios de sesión simultáneos no pueden
+    dejar dos tokens ni borrar el del otro.
 
-    new_token = AccessToken(
-        profesor_id=profesor_id,
-        token=token,
-        created_at=created_at
-    )
-    session.add(new_token)
+    Returns:
+        str: El token vigente del profesor
+    """
+    now = datetime.now(LOCAL_TIMEZONE)
+    statement = insert(AccessToken).values(profesor_id=profesor_id, token=token, created_at=created_at)
+    vigente = AccessToken.created_at > now
+    statement = statement.on_conflict_do_update(
+        index_elements=[AccessToken.profesor_id],
+        set_={
+            "token": case((vigente, AccessToken.token), else_=statement.excluded.token),
+            "created_at": case((vigente, AccessToken.created_at), else_=statement.excluded.created_at),
+        },
+    ).returning(AccessToken.token)
+    token_vigente = session.exec(statement).scalar_one()
     session.commit()
-    session.refresh(new_token)
-    return new_token.token
+    return token_vigente
 
 def create_access_token(
     session: SessionDep,
@@ -160,6 +192,13 @@ async def get_current_user(
     token: Annotated[str, Depends(oauth2_scheme)]
 ) -> UserInDB:
     """Validate JWT token and return current user."""
+    with _usuarios_lock:
+        cacheado = _usuarios_por_token.get(token)
+    if cacheado is not None:
+        user, expira = cacheado
+        if time.time() < expira:
+            return user
+
     credentials_exception = HTTPException(
         status_code=status.HTTP_401_UNAUTHORIZED,
         detail="Could not validate credentials",
@@ -193,11 +232,14 @@ async def get_current_user(
                     result.estado = False
                     session.add(result)
                     session.commit()
+                    invalidar_usuario(id=result.id)
         except Exception:
             pass
         raise credentials_exception
 
     if user := get_user(session, email):
+        with _usuarios_lock:
+            _usuarios_por_token[token] = (user, payload["exp"])
         return user
     raise credentials_exception
 
@@ -223,7 +265,7 @@ async def login_for_access_token(
     form_data: Annotated[OAuth2PasswordRequestForm, Depends()]
 ) -> Token:
     """Login endpoint to obtain access token."""
-    if not (user := authenticate_user(session, form_data.username, form_data.password)):
+    if not (user := await authenticate_user(session, form_data.username, form_data.password)):
         raise HTTPException(
             status_code=status.HTTP_401_UNAUTHORIZED,
             detail="Incorrect username or password",
@@ -319,11 +361,8 @@ def recover_password(session: SessionDep, email: str = Form(...)):
     email_data = generate_reset_password_email(
         email_to=user.email, email=email, token=password_reset_token
     )
-    send_email(
-        email_to=user.email,
-        subject=email_data.subject,
-        html_content=email_data.html_content,
-    )
+    encolar_email(session, user.email, email_data.subject, email_data.html_content)
+    session.commit()
 
     # Devolver un HTML indicando que el correo fue enviado con estilos
     html_content = """
@@ -756,6 +795,7 @@ def reset_password(
     user.password = hashed_password
     session.add(user)
     session.commit()
+    invalidar_usuario(id=user.id)
     
     return HTMLResponse(
         content="""
@@ -1,27 +1,37 @@
+import csv
 from datetime import date, datetime
 import ftplib
 import io
 import os
+import tempfile
 from fastapi import APIRouter, Body, Depends, File, Form, Request, Response, HTTPException, UploadFile, status
 from fastapi.encoders import jsonable_encoder
-from typing import Any, List, Optional
+from typing import Any, AsyncIterator, Iterator, List, Optional
 from fastapi.responses import FileResponse
 import pytz
-from sqlalchemy import String, alias, cast, extract, text
+from sqlalchemy import String, alias, cast, extract, text, tuple_
 from sqlalchemy.exc import IntegrityError, SQLAlchemyError
 from zoneinfo import ZoneInfo
 from sqlmodel import SQLModel, and_, select , func
-from model import Areas, Comentarios, Comentarios_Dto, areas_profesor, Asignaturas, Periodo, Planificacion_Profesor, Planificaciones, Profesores
-from api.deps import SessionDep, sender_email
+from model import Areas, Comentarios, Comentarios_Dto, areas_profesor, Asignaturas, Periodo, Periodo_Stats, Planificacion_Listado_Dto, Planificacion_Profesor, Planificaciones, Profesores
+from api.consultas import consulta_planificaciones, iterar_planificaciones, listar_planificaciones
+from api.deps import AsyncSessionDep
+from api.estadisticas import estado_publico
+from api.respuestas import respuesta_json
+from core.config import settings
+from core.db import async_engine
+from sqlmodel.ext.asyncio.session import AsyncSession
 from sqlalchemy.orm import aliased
 from ftplib import FTP
 import io
 from typing import Optional
 from pytz import timezone as tz
-from utils import render_email_template_info, send_email
+from utils import render_email_template_info
 from openpyxl import Workbook
+from openpyxl.cell import WriteOnlyCell
 from openpyxl.styles import PatternFill
 from fastapi import HTTPException, status
+from fastapi.concurrency import run_in_threadpool
 from fastapi.responses import StreamingResponse
 import io  # Importar io para trabajar con archivos en memoria
 
@@ -34,10 +44,10 @@ class Total_profesores(SQLModel):
 
 
 @router.get("/areas/count", response_description="Obtener el total de áreas")
-async def get_total_areas(session: SessionDep) -> Any:
+async def get_total_areas(session: AsyncSessionDep) -> Any:
     try:
         statement = select(func.count(Areas.id).label("total_areas"))
-        result = session.exec(statement).one()
+        result = (await session.exec(statement)).one()
         return {"total_areas": result}
     except Exception as e:
         raise HTTPException(
@@ -47,18 +57,18 @@ async def get_total_areas(session: SessionDep) -> Any:
 
 
 @router.get("/profesores/count", response_description="Obtener el total de profesores", response_model=Total_profesores)
-async def get_total_professors(session: SessionDep) -> Any:
+async def get_total_professors(session: AsyncSessionDep) -> Any:
     statement = select(func.count().label("total")).select_from(Profesores)
-    result = session.exec(statement).one()
+    result = (await session.exec(statement)).one()
     return  {"total": result}
 
 
 @router.get("/asignaturas/count", response_description="Obtener el total de asignaturas")
-async def get_total_asignaturas(session: SessionDep) -> Any:
+async def get_total_asignaturas(session: AsyncSessionDep) -> Any:
     try:
         # Consulta para contar la cantidad total de asignaturas
         statement = select(func.count(Asignaturas.id).label("total_asignaturas"))
-        result = session.exec(statement).one()
+        result = (await session.exec(statement)).one()
         print(result)
         
         return {"total_asignaturas": result}
@@ -73,20 +83,20 @@ async def get_total_asignaturas(session: SessionDep) -> Any:
 @router.get("/planificaciones/count-by-estado", response_description="Obtener la cantidad de planificaciones por estado")
 async def get_planificaciones_count_by_estado(
     periodo_id: int,  # Nuevo parámetro para filtrar por período
-    session: SessionDep
+    session: AsyncSessionDep
 ) :
     try:
         # Consulta para contar planificaciones agrupadas por estado y filtrar por período
         statement = (
-            select(Planificacion_Profesor.estado, func.count(Planificacion_Profesor.id).label("total"))
-            .join(Planificaciones, Planificaciones.id == Planificacion_Profesor.planificacion_id)  # Unir con Planificaciones
-            .where(Planificaciones.periodo_id == periodo_id)  # Filtrar por período
-            .group_by(Planificacion_Profesor.estado)
+            select(Periodo_Stats.estado, func.sum(Periodo_Stats.total).label("total"))
+            .where(Periodo_Stats.periodo_id == periodo_id)  # Filtrar por período
+            .group_by(Periodo_Stats.estado)
+            .having(func.sum(Periodo_Stats.total) > 0)
         )
-        results = session.exec(statement).all()
+        results = (await session.exec(statement)).all()
 
         # Formatear los resultados como un diccionario
-        estado_counts = {result.estado: result.total for result in results}
+        estado_counts = {estado_publico(result.estado): result.total for result in results}
 
         return estado_counts
     except Exception as e:
@@ -95,45 +105,48 @@ async def get_planificaciones_count_by_estado(
             detail="Error al obtener las planificaciones por estado"
         ) from e
 
-@router.get("/docentes/atrasados", response_description="Obtener lista de docentes con planificaciones atrasadas")
-async def get_docentes_atrasados(session: SessionDep, periodo_id: int) -> Any:
-    try:
-        # Consulta para obtener docentes con planificaciones atrasadas
-        statement = (
-            select(
-                Profesores.id,
-                Profesores.nombre,
-                Planificaciones.titulo,
-                Planificaciones.fecha_subida,
-                Areas.nombre.label("area_nombre"),
-                Asignaturas.nombre.label("asignatura_nombre"),
-            )
-            .join(Planificaciones, Planificaciones.profesor_id == Profesores.id)  # Unir Profesores con Planificaciones
-            .join(Planificacion_Profesor, Planificacion_Profesor.planificacion_id == Planificaciones.id)  # Unir Planificaciones con Planificacion_Profesor
-            .join(Asignaturas, Asignaturas.id == Planificaciones.asignaturas_id)  # Unir Planificaciones con Asignaturas
-            .join(Areas, Areas.id == Asignaturas.area_id)  # Unir Asignaturas con Areas
-            .where(
-                Planificacion_Profesor.estado == "no_entregado",  # Filtrar por estado "no_entregado"
-                Planificaciones.periodo_id == periodo_id  # Filtrar por periodo_id
-            )
+async def _docentes_atrasados(session: AsyncSession, periodo_id: int) -> list[dict]:
+    """Planificaciones no entregadas del periodo con su docente, área y asignatura."""
+    # Consulta para obtener docentes con planificaciones atrasadas
+    statement = (
+        select(
+            Profesores.id,
+            Profesores.nombre,
+            Planificaciones.titulo,
+            Planificaciones.fecha_subida,
+            Areas.nombre.label("area_nombre"),
+            Asignaturas.nombre.label("asignatura_nombre"),
         )
+        .join(Planificaciones, Planificaciones.profesor_id == Profesores.id)  # Unir Profesores con Planificaciones
+        .join(Planificacion_Profesor, Planificacion_Profesor.planificacion_id == Planificaciones.id)  # Unir Planificaciones con Planificacion_Profesor
+        .join(Asignaturas, Asignaturas.id == Planificaciones.asignaturas_id)  # Unir Planificaciones con Asignaturas
+        .join(Areas, Areas.id == Asignaturas.area_id)  # Unir Asignaturas con Areas
+        .where(
+            Planificacion_Profesor.estado == "no_entregado",  # Filtrar por estado "no_entregado"
+            Planificaciones.periodo_id == periodo_id  # Filtrar por periodo_id
+        )
+    )
 
-        results = session.exec(statement).all()
+    results = (await session.exec(statement)).all()
+
+    # Formatear los resultados
+    return [
+        {
+            "id_profesor": result.id,
+            "nombre_profesor": result.nombre,
+            "titulo_planificacion": result.titulo,
+            "fecha_subida": result.fecha_subida,
+            "area_nombre": result.area_nombre,
+            "asignatura_nombre": result.asignatura_nombre,
+        }
+        for result in results
+    ]
 
-        # Formatear los resultados
-        docentes_atrasados = [
-            {
-                "id_profesor": result.id,
-                "nombre_profesor": result.nombre,
-                "titulo_planificacion": result.titulo,
-                "fecha_subida": result.fecha_subida,
-                "area_nombre": result.area_nombre,
-                "asignatura_nombre": result.asignatura_nombre,
-            }
-            for result in results
-        ]
 
-        return docentes_atrasados
+@router.get("/docentes/atrasados", response_description="Obtener lista de docentes con planificaciones atrasadas")
+async def get_docentes_atrasados(session: AsyncSessionDep, periodo_id: int) -> Any:
+    try:
+        return respuesta_json(await _docentes_atrasados(session, periodo_id))
     except Exception as e:
         print("Error en la consulta:", str(e))  # Imprimir el error para depuración
         raise HTTPException(
@@ -142,7 +155,7 @@ async def get_docentes_atrasados(session: SessionDep, periodo_id: int) -> Any:
         ) from e
 
 @router.get("/docentes/por-estado", response_description="Obtener lista de docentes según el estado de la planificación")
-async def get_docentes_por_estado(session: SessionDep, estado: Optional[str] = None) -> Any:
+async def get_docentes_por_estado(session: AsyncSessionDep, estado: Optional[str] = None) -> Any:
     """
     Endpoint para obtener la lista de docentes según el estado de sus planificaciones.
 
@@ -177,7 +190,7 @@ async def get_docentes_por_estado(session: SessionDep, estado: Optional[str] = N
             statement = statement.where(planificaciones_profesor_alias.estado == estado)
 
         # Ejecutar la consulta
-        results = session.exec(statement).all()
+        results = (await session.exec(statement)).all()
 
         # Formatear los resultados
         docentes = [
@@ -191,7 +204,7 @@ async def get_docentes_por_estado(session: SessionDep, estado: Optional[str] = N
             for result in results
         ]
 
-        return {"estado": estado if estado else "todos", "docentes": docentes}
+        return respuesta_json({"estado": estado if estado else "todos", "docentes": docentes})
     except Exception as e:
         raise HTTPException(
             status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
@@ -201,7 +214,7 @@ async def get_docentes_por_estado(session: SessionDep, estado: Optional[str] = N
 
 
 @router.get("/docentes/estado", response_description="Obtener lista de docentes por estado")
-async def get_usuarios_por_estado(session: SessionDep, estado: Optional[str] = None) -> Any:
+async def get_usuarios_por_estado(session: AsyncSessionDep, estado: Optional[str] = None) -> Any:
     """
     Endpoint para obtener la lista de usuarios según su estado.
 
@@ -228,7 +241,7 @@ async def get_usuarios_por_estado(session: SessionDep, estado: Optional[str] = N
                 )
 
         # Ejecutar la consulta
-        results = session.exec(statement).all()
+        results = (await session.exec(statement)).all()
 
         # Formatear los resultados
         usuarios = [
@@ -241,7 +254,7 @@ async def get_usuarios_por_estado(session: SessionDep, estado: Optional[str] = N
             for result in results
         ]
 
-        return {"estado": estado or "todos", "usuarios": usuarios}
+        return respuesta_json({"estado": estado or "todos", "usuarios": usuarios})
 
     except Exception as e:
         raise HTTPException(
@@ -252,11 +265,11 @@ async def get_usuarios_por_estado(session: SessionDep, estado: Optional[str] = N
 
 #
 @router.get("/metricas/total-planificaciones-asignadas", response_description="Obtener el total de planificaciones asignadas")
-async def get_total_planificaciones_asignadas(session: SessionDep, periodo_id: int) -> Any:
+async def get_total_planificaciones_asignadas(session: AsyncSessionDep, periodo_id: int) -> Any:
     try:
-        statement = select(func.count()).select_from(Planificacion_Profesor).join(Planificaciones, Planificaciones.id == Planificacion_Profesor.planificacion_id).where(Planificaciones.periodo_id == periodo_id)
+        statement = select(func.coalesce(func.sum(Periodo_Stats.total), 0)).where(Periodo_Stats.periodo_id == periodo_id)
         
-        total = session.exec(statement).one()
+        total = (await session.exec(statement)).one()
         return {"total_planificaciones_asignadas": total}
     except Exception as e:
         raise HTTPException(
@@ -266,20 +279,19 @@ async def get_total_planificaciones_asignadas(session: SessionDep, periodo_id: i
   #      
 
 @router.get("/metricas/planificaciones-por-area", response_description="Obtener planificaciones por área")
-async def get_planificaciones_por_area(session: SessionDep, periodo_id: int) -> Any:
+async def get_planificaciones_por_area(session: AsyncSessionDep, periodo_id: int) -> Any:
     try:
         statement = (
-            select(Areas.nombre, func.count().label("total_planificaciones"))
-            .join(Asignaturas, Areas.id == Asignaturas.area_id)
-            .join(Planificaciones, Asignaturas.id == Planificaciones.asignaturas_id)
-            .join(Periodo, Periodo.id == Planificaciones.periodo_id)
+            select(Areas.nombre, func.sum(Periodo_Stats.total).label("total_planificaciones"))
+            .join(Periodo_Stats, Areas.id == Periodo_Stats.area_id)
 
             .group_by(Areas.nombre)
-            .where(Planificaciones.periodo_id == periodo_id)
+            .where(Periodo_Stats.periodo_id == periodo_id)
+            .having(func.sum(Periodo_Stats.total) > 0)
 
             
         )
-        results = session.exec(statement).all()
+        results = (await session.exec(statement)).all()
 
         # Convertir las filas a una lista de diccionarios
         planificaciones = [{"nombre": row[0], "total_planificaciones": row[1]} for row in results]
@@ -294,14 +306,15 @@ async def get_planificaciones_por_area(session: SessionDep, periodo_id: int) ->
 
         
 @router.get("/metricas/planificaciones-aprobadas-vs-pendientes", response_description="Obtener planificaciones aprobadas vs pendientes")
-async def get_planificaciones_aprobadas_vs_pendientes(session: SessionDep) -> Any:
+async def get_planificaciones_aprobadas_vs_pendientes(session: AsyncSessionDep) -> Any:
     try:
         statement = (
-            select(Planificacion_Profesor.estado, func.count().label("total"))
-            .where(Planificacion_Profesor.estado.in_(["aprobado", "pendiente"]))
-            .group_by(Planificacion_Profesor.estado)
+            select(Periodo_Stats.estado, func.sum(Periodo_Stats.total).label("total"))
+            .where(Periodo_Stats.estado.in_(["aprobado", "pendiente"]))
+            .group_by(Periodo_Stats.estado)
+            .having(func.sum(Periodo_Stats.total) > 0)
         )
-        results = session.exec(statement).all()
+        results = (await session.exec(statement)).all()
         
         if  len(results) == 0:
             return  {"aprobado": 0, "pendiente": 0}
@@ -314,20 +327,19 @@ async def get_planificaciones_aprobadas_vs_pendientes(session: SessionDep) -> An
         ) from e
         
 @router.get("/metricas/profesores-con-mas-planificaciones-atrasadas", response_description="Obtener profesores con más planificaciones atrasadas")
-async def get_profesores_con_mas_planificaciones_atrasadas(session: SessionDep, periodo_id: int):
+async def get_profesores_con_mas_planificaciones_atrasadas(session: AsyncSessionDep, periodo_id: int):
     try:
         statement = (
-            select(Profesores.nombre, func.count().label("total_atrasadas"))
-            .join(Planificaciones, Profesores.id == Planificaciones.profesor_id)
-            .join(Periodo, Planificaciones.periodo_id == Periodo.id)
-            .join(Planificacion_Profesor, Planificaciones.id == Planificacion_Profesor.planificacion_id)  # Asegura la relación
-            .where(Planificacion_Profesor.estado == "no_entregado", Planificaciones.periodo_id == periodo_id)
+            select(Profesores.nombre, func.sum(Periodo_Stats.total).label("total_atrasadas"))
+            .join(Periodo_Stats, Profesores.id == Periodo_Stats.profesor_id)
+            .where(Periodo_Stats.estado == "no_entregado", Periodo_Stats.periodo_id == periodo_id)
             
             .group_by(Profesores.nombre)
-            .order_by(func.count().desc())
+            .having(func.sum(Periodo_Stats.total) > 0)
+            .order_by(func.sum(Periodo_Stats.total).desc())
             
         )
-        results = session.exec(statement).all()
+        results = (await session.exec(statement)).all()
         
        
 
@@ -342,14 +354,15 @@ async def get_profesores_con_mas_planificaciones_atrasadas(session: SessionDep,
         ) from e
 
 @router.get("/metricas/planificaciones-por-periodo", response_description="Obtener planificaciones por periodo")
-async def get_planificaciones_por_periodo(session: SessionDep) -> Any:
+async def get_planificaciones_por_periodo(session: AsyncSessionDep) -> Any:
     try:
         statement = (
-            select(Periodo.nombre, func.count().label("total_planificaciones"))
-            .join(Planificaciones, Periodo.id == Planificaciones.periodo_id)
+            select(Periodo.nombre, func.sum(Periodo_Stats.total).label("total_planificaciones"))
+            .join(Periodo_Stats, Periodo.id == Periodo_Stats.periodo_id)
             .group_by(Periodo.nombre)
+            .having(func.sum(Periodo_Stats.total) > 0)
         )
-        results = session.exec(statement).all()
+        results = (await session.exec(statement)).all()
 
         # Convertir a un formato serializable
         planificaciones_por_periodo = [
@@ -365,51 +378,152 @@ async def get_planificaciones_por_periodo(session: SessionDep) -> Any:
         ) from e
 
 
+async def _planificaciones_por_estado_por_area(session: AsyncSession, periodo_id: int) -> list[dict]:
+    """Total de planificaciones del periodo por área, estado y fecha_subida."""
+    # Consulta para obtener el total de planificaciones por estado para cada área, agrupado por fecha_subida
+    statement = (
+        select(
+            Areas.nombre.label("nombre_area"),
+            Planificacion_Profesor.estado,
+            Planificaciones.fecha_subida,
+            func.count().label("total_planificaciones")
+        )
+        .join(Asignaturas, Areas.id == Asignaturas.area_id)
+        .join(Planificaciones, Asignaturas.id == Planificaciones.asignaturas_id)
+        .join(Planificacion_Profesor, Planificaciones.id == Planificacion_Profesor.planificacion_id)
+        .where(Planificaciones.periodo_id == periodo_id)
+        .group_by(Areas.nombre, Planificacion_Profesor.estado, Planificaciones.fecha_subida)
+    )
+
+    results = (await session.exec(statement)).all()
+
+    # Formatear los resultados en una lista de diccionarios
+    return [
+        {
+            "nombre_area": result.nombre_area,
+            "estado": result.estado,
+            "fecha_subida": result.fecha_subida,
+            "total_planificaciones": result.total_planificaciones,
+        }
+        for result in results
+    ]
+
+
 @router.get("/metricas/planificaciones-por-estado-por-area", response_description="Obtener el total de planificaciones por estado para cada área, agrupado por fecha_subida")
-async def get_planificaciones_por_estado_por_area(session: SessionDep, periodo_id: int):
+async def get_planificaciones_por_estado_por_area(session: AsyncSessionDep, periodo_id: int):
+    try:
+        return await _planificaciones_por_estado_por_area(session, periodo_id)
+
+    except Exception as e:
+        print(f"Error en la consulta: {str(e)}")
+        raise HTTPException(
+            status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
+            detail=f"Error al obtener las métricas de planificaciones por estado por área: {str(e)}"
+        ) from e
+
+# Valores de grouping(estado, área, profesor) de cada conjunto de /summary;
+# un bit en 1 indica que esa columna no forma parte del grupo
+_RESUMEN_TOTAL = 0b111
+_RESUMEN_POR_ESTADO = 0b011
+_RESUMEN_POR_AREA = 0b101
+_RESUMEN_POR_PROFESOR = 0b110
+
+
+@router.get("/summary", response_description="Obtener todas las métricas del dashboard de un periodo")
+async def get_dashboard_summary(session: AsyncSessionDep, periodo_id: int) -> Any:
+    """
+    Reúne en una sola respuesta las métricas que el dashboard pedía por
+    separado para un periodo: totales generales, planificaciones por estado,
+    total asignadas, por área, profesores con más atrasadas, docentes
+    atrasados y planificaciones por estado por área.
+
+    Los conteos del periodo salen de una sola consulta con GROUPING SETS
+    sobre periodo_stats. Las planificaciones por estado por área (que se
+    agrupan también por fecha_subida), el detalle de docentes atrasados y
+    los totales generales son otras tres consultas; las dos primeras son las
+    mismas funciones que usan sus rutas individuales. Cada clave tiene el
+    mismo formato que la ruta individual correspondiente.
+    """
     try:
-        # Consulta para obtener el total de planificaciones por estado para cada área, agrupado por fecha_subida
         statement = (
             select(
+                func.grouping(Periodo_Stats.estado, Areas.nombre, Profesores.nombre).label("conjunto"),
+                Periodo_Stats.estado,
                 Areas.nombre.label("nombre_area"),
-                Planificacion_Profesor.estado,
-                Planificaciones.fecha_subida,
-                func.count().label("total_planificaciones")
+                Profesores.nombre.label("nombre_profesor"),
+                func.sum(Periodo_Stats.total).label("total"),
+                func.sum(Periodo_Stats.total).filter(Periodo_Stats.estado == "no_entregado").label("total_atrasadas"),
+            )
+            .select_from(Periodo_Stats)
+            .join(Areas, Areas.id == Periodo_Stats.area_id, isouter=True)
+            .join(Profesores, Profesores.id == Periodo_Stats.profesor_id, isouter=True)
+            .where(Periodo_Stats.periodo_id == periodo_id)
+            .group_by(
+                func.grouping_sets(
+                    tuple_(),
+                    tuple_(Periodo_Stats.estado),
+                    tuple_(Areas.nombre),
+                    tuple_(Profesores.nombre),
+                )
             )
-            .join(Asignaturas, Areas.id == Asignaturas.area_id)
-            .join(Planificaciones, Asignaturas.id == Planificaciones.asignaturas_id)
-            .join(Planificacion_Profesor, Planificaciones.id == Planificacion_Profesor.planificacion_id)
-            .where(Planificaciones.periodo_id == periodo_id)
-            .group_by(Areas.nombre, Planificacion_Profesor.estado, Planificaciones.fecha_subida)
         )
-
-        results = session.exec(statement).all()
-
-        # Formatear los resultados en una lista de diccionarios
-        planificaciones_por_estado_por_area = [
-            {
-                "nombre_area": result.nombre_area,
-                "estado": result.estado,
-                "fecha_subida": result.fecha_subida,
-                "total_planificaciones": result.total_planificaciones,
-            }
-            for result in results
-        ]
-
-        return planificaciones_por_estado_por_area
+        grupos = (await session.exec(statement)).all()
+
+        total_asignadas = 0
+        count_by_estado = {}
+        por_area = []
+        profesores_atrasados = []
+        for fila in grupos:
+            if not fila.total:
+                continue
+            if fila.conjunto == _RESUMEN_TOTAL:
+                total_asignadas = fila.total
+            elif fila.conjunto == _RESUMEN_POR_ESTADO:
+                count_by_estado[estado_publico(fila.estado)] = fila.total
+            # Las planificaciones sin área o sin profesor no aparecían en las
+            # rutas individuales, que usaban uniones internas
+            elif fila.conjunto == _RESUMEN_POR_AREA and fila.nombre_area is not None:
+                por_area.append({"nombre": fila.nombre_area, "total_planificaciones": fila.total})
+            elif fila.conjunto == _RESUMEN_POR_PROFESOR and fila.nombre_profesor is not None and fila.total_atrasadas:
+                profesores_atrasados.append({"nombre": fila.nombre_profesor, "total_atrasadas": fila.total_atrasadas})
+        profesores_atrasados.sort(key=lambda profesor: profesor["total_atrasadas"], reverse=True)
+
+        por_estado_por_area = await _planificaciones_por_estado_por_area(session, periodo_id)
+        docentes_atrasados = await _docentes_atrasados(session, periodo_id)
+
+        statement = select(
+            select(func.count(Areas.id)).scalar_subquery().label("total_areas"),
+            select(func.count()).select_from(Profesores).scalar_subquery().label("total_profesores"),
+            select(func.count(Asignaturas.id)).scalar_subquery().label("total_asignaturas"),
+        )
+        totales = (await session.exec(statement)).one()
+
+        return {
+            "periodo_id": periodo_id,
+            "total_areas": totales.total_areas,
+            "total_profesores": totales.total_profesores,
+            "total_asignaturas": totales.total_asignaturas,
+            "count_by_estado": count_by_estado,
+            "total_planificaciones_asignadas": total_asignadas,
+            "planificaciones_por_area": por_area,
+            "profesores_con_mas_planificaciones_atrasadas": profesores_atrasados,
+            "docentes_atrasados": docentes_atrasados,
+            "planificaciones_por_estado_por_area": por_estado_por_area,
+        }
 
     except Exception as e:
         print(f"Error en la consulta: {str(e)}")
         raise HTTPException(
             status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
-            detail=f"Error al obtener las métricas de planificaciones por estado por área: {str(e)}"
+            detail="Error al obtener el resumen del dashboard"
         ) from e
 
+
 @router.get("/metricas/documentos-entregados-rango/", response_description="Listar documentos entregados en un rango de fechas", response_model=List[Any])
 async def get_documentos_entregados_rango(
     fecha_inicio: date,  # Fecha de inicio del rango
     fecha_fin: date,     # Fecha de fin del rango
-    session: SessionDep
+    session: AsyncSessionDep
 ) -> Any:
     try:
         # Crear alias para la tabla Profesores
@@ -446,7 +560,7 @@ async def get_documentos_entregados_rango(
         )
 
         # Ejecutar la consulta y obtener los resultados
-        documentos = session.exec(query).all()
+        documentos = (await session.exec(query)).all()
 
         # Formatear la respuesta
         result = [
@@ -465,7 +579,7 @@ async def get_documentos_entregados_rango(
             for documento in documentos
         ]
 
-        return result
+        return respuesta_json(result)
 
     except Exception as e:
         print(f"Error: {str(e)}")
@@ -484,25 +598,25 @@ async def get_documentos_entregados_rango(
 #mis planificaciones por estado
 @router.get("/metricas/mis-planificaciones-por-estado/{profesor_id}", response_description="Obtener las planificaciones de un profesor por estado")
 async def get_mis_planificaciones_por_estado(
-    session: SessionDep, 
+    session: AsyncSessionDep, 
     profesor_id: int, 
     periodo_id: int  # Nuevo parámetro: periodo_id
 ) :
     try:
         # Consulta para obtener las planificaciones del profesor filtradas por periodo_id
         statement = (
-            select(Planificacion_Profesor.estado, func.count().label("total"))
-            .join(Planificaciones, Planificacion_Profesor.planificacion_id == Planificaciones.id)
+            select(Periodo_Stats.estado, func.sum(Periodo_Stats.total).label("total"))
             .where(
-                Planificaciones.profesor_id == profesor_id,
-                Planificaciones.periodo_id == periodo_id  # Filtro por periodo_id
+                Periodo_Stats.profesor_id == profesor_id,
+                Periodo_Stats.periodo_id == periodo_id  # Filtro por periodo_id
             )
-            .group_by(Planificacion_Profesor.estado)
+            .group_by(Periodo_Stats.estado)
+            .having(func.sum(Periodo_Stats.total) > 0)
         )
-        results = session.exec(statement).all()
+        results = (await session.exec(statement)).all()
 
         # Formatear los resultados como un diccionario {estado: total}
-        return {"mis_planificaciones_por_estado": {result.estado: result.total for result in results}}
+        return {"mis_planificaciones_por_estado": {estado_publico(result.estado): result.total for result in results}}
     except Exception as e:
         raise HTTPException(
             status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
@@ -511,7 +625,7 @@ async def get_mis_planificaciones_por_estado(
         
         
 @router.get("/metricas/mis-planificaciones-atrasadas/{profesor_id}", response_description="Obtener las planificaciones atrasadas de un profesor")
-async def get_mis_planificaciones_atrasadas(session: SessionDep,
+async def get_mis_planificaciones_atrasadas(session: AsyncSessionDep,
                                             profesor_id: int,
                                             periodo_id: int  # Nuevo parámetro: periodo_id
 ) :
@@ -524,7 +638,7 @@ async def get_mis_planificaciones_atrasadas(session: SessionDep,
                    Planificaciones.fecha_subida > Periodo.fecha_fin,
                    Planificaciones.periodo_id == periodo_id)
         )
-        total = session.exec(statement).one()
+        total = (await session.exec(statement)).one()
         return {"mis_planificaciones_atrasadas": total}
     except Exception as e:
         raise HTTPException(
@@ -533,7 +647,7 @@ async def get_mis_planificaciones_atrasadas(session: SessionDep,
         ) from e
         
 @router.get("/metricas/mis-planificaciones-proximas-a-vencer/{profesor_id}", response_description="Obtener las planificaciones próximas a vencer de un profesor")
-async def get_mis_planificaciones_proximas_a_vencer(session: SessionDep, profesor_id: int,periodo_id: int):
+async def get_mis_planificaciones_proximas_a_vencer(session: AsyncSessionDep, profesor_id: int,periodo_id: int):
     try:
         # Consulta corregida
         statement = (
@@ -551,7 +665,7 @@ async def get_mis_planificaciones_proximas_a_vencer(session: SessionDep, profeso
                 Planificacion_Profesor.estado == "pendiente"
             )
         )
-        results = session.exec(statement).all()
+        results = (await session.exec(statement)).all()
 
         # Convertir los resultados a una lista de diccionarios
         planificaciones = [
@@ -574,7 +688,7 @@ async def get_mis_planificaciones_proximas_a_vencer(session: SessionDep, profeso
 
         
 @router.get("/planificaciones-asignadas/{profesor_id}", response_description="Obtener las planificaciones asignadas a un profesor con áreas y asignaturas")
-async def get_planificaciones_asignadas(session: SessionDep, profesor_id: int, periodo_id: int) :
+async def get_planificaciones_asignadas(session: AsyncSessionDep, profesor_id: int, periodo_id: int) :
     try:
         # Consulta para obtener las planificaciones asignadas al profesor, junto con las áreas y asignaturas
         statement = (
@@ -594,7 +708,7 @@ async def get_planificaciones_asignadas(session: SessionDep, profesor_id: int, p
             .where(Planificaciones.profesor_id == profesor_id, Planificaciones.periodo_id == periodo_id)
         )
 
-        results = session.exec(statement).all()
+        results = (await session.exec(statement)).all()
 
         # Formatear los resultados en una lista de diccionarios
         planificaciones = [
@@ -621,7 +735,7 @@ async def get_planificaciones_asignadas(session: SessionDep, profesor_id: int, p
         
 @router.get("/asignaturas-con-planificaciones/{profesor_id}/{periodo_id}", response_description="Obtener las asignaturas con el número de planificaciones asignadas a un profesor en un periodo específico")
 async def get_asignaturas_con_planificaciones(
-    session: SessionDep, 
+    session: AsyncSessionDep, 
     profesor_id: int, 
     periodo_id: int
 ) :
@@ -642,7 +756,7 @@ async def get_asignaturas_con_planificaciones(
             .group_by(Asignaturas.id, Asignaturas.nombre, Asignaturas.codigo)
         )
 
-        results = session.exec(statement).all()
+        results = (await session.exec(statement)).all()
 
         # Formatear los resultados en una lista de diccionarios
         asignaturas = [
@@ -667,123 +781,14 @@ async def get_asignaturas_con_planificaciones(
 @router.get("/search/", response_description="Listar todas las planificaciones", response_model=List[Any])
 async def get_all_planificaciones_descargar(
     periodo_id: int,  # Solo necesitamos el ID del periodo
-    session: SessionDep
+    session: AsyncSessionDep
 ) -> Any:
     try:
-        # Realizamos el join entre todas las tablas necesarias
-        query = (
-            select(
-                Planificaciones,
-                Planificacion_Profesor.id,
-                Planificacion_Profesor.planificacion_id,
-                Profesores.nombre.label("profesor_nombre"),
-                Asignaturas.nombre.label("asignatura_nombre"),
-                Asignaturas.curso.label("curso_nombre"),  # Agregar el nombre del curso
-                Asignaturas.paralelo.label("paralelo"),  # Agregar el paralelo
-                Periodo.nombre.label("periodo_nombre"),
-                # Información del profesor aprobador
-                Planificacion_Profesor.profesor_aprobador_id,
-                # Información del profesor revisor
-                Planificacion_Profesor.profesor_revisor_id,
-                # Información del área
-                Areas.id.label("area_id"),
-                Areas.nombre.label("area_nombre"),
-                Areas.codigo.label("area_codigo"),
-                # Información adicional de la planificación
-                Planificacion_Profesor.fecha_de_actualizacion,
-                Planificacion_Profesor.estado,
-                Planificacion_Profesor.archivo,
-            )
-            .join(Profesores, Planificaciones.profesor_id == Profesores.id)
-            .join(Asignaturas, Planificaciones.asignaturas_id == Asignaturas.id)
-            .join(Periodo, Planificaciones.periodo_id == Periodo.id)
-            .join(Areas, Asignaturas.area_id == Areas.id)
-            .join(
-                Planificacion_Profesor,
-                Planificaciones.id == Planificacion_Profesor.planificacion_id
-            )
-            # Join para obtener la información del profesor revisor
-            .join(
-                areas_profesor,
-                Planificacion_Profesor.profesor_revisor_id == areas_profesor.id,
-                isouter=True
-            )
-            .where(Planificaciones.periodo_id == periodo_id)  # Solo filtramos por periodo_id
+        planificaciones = await listar_planificaciones(
+            session,
+            consulta_planificaciones().where(Planificaciones.periodo_id == periodo_id)  # Solo filtramos por periodo_id
         )
-        
-        # Ejecutar la consulta y obtener los resultados
-        planificaciones = session.exec(query).all()
-
-        # Obtener los IDs de profesores aprobadores y revisores
-        profesor_aprobador_ids = [int(p[8]) for p in planificaciones if p[8] is not None]  # Convertir a entero
-        profesor_revisor_ids = [int(p[9]) for p in planificaciones if p[9] is not None]    # Convertir a entero
-
-        # Consultar nombres de profesores aprobadores
-        aprobadores = {}
-        if profesor_aprobador_ids:
-            query_aprobadores = select(Profesores).where(Profesores.id.in_(profesor_aprobador_ids))
-            aprobadores = {p.id: p.nombre for p in session.exec(query_aprobadores)}
-
-        # Consultar nombres de profesores revisores a través de Areas_Profesor
-        revisores = {}
-        if profesor_revisor_ids:
-            query_revisores = (
-                select(areas_profesor, Profesores.nombre)
-                .join(Profesores, areas_profesor.profesor_id == Profesores.id)
-                .where(areas_profesor.id.in_(profesor_revisor_ids))
-            )
-            revisores = {ap.id: nombre for ap, nombre in session.exec(query_revisores)}
-
-        # Crear una lista de resultados con los campos deseados
-        result = [
-            {
-                # Información básica de la planificación
-                "titulo": planificacion.titulo,
-                "descripcion": planificacion.descripcion,
-                "fecha_subida": planificacion.fecha_subida,
-                
-                # IDs de relaciones
-                "profesor_id": planificacion.profesor_id,
-                "asignaturas_id": planificacion.asignaturas_id,
-                "periodo_id": planificacion.periodo_id,
-
-                "id": id,
-                "id_planificacion": planificacion_id,
-                
-                # Nombres de las relaciones principales
-                "profesor_nombre": profesor_nombre,
-                "periodo_nombre": periodo_nombre,
-                "asignatura_nombre": asignatura_nombre,
-                "curso_nombre": curso_nombre,  # Agregar el nombre del curso
-                "paralelo": paralelo,  # Agregar el paralelo
-                
-                # Información del área
-                "area_id": area_id,
-                "area_nombre": area_nombre,
-                "area_codigo": area_codigo,
-                
-                # Información del profesor aprobador
-                "profesor_aprobador_id": profesor_aprobador_id,
-                "profesor_aprobador_nombre": aprobadores.get(profesor_aprobador_id) if profesor_aprobador_id else None,
-                
-                # Información del profesor revisor
-                "profesor_revisor_id": profesor_revisor_id,
-                "profesor_revisor_nombre": revisores.get(profesor_revisor_id) if profesor_revisor_id else None,
-                
-                # Información adicional de la planificación
-                "fecha_de_actualizacion": fecha_de_actualizacion,
-                "estado": estado,
-                "archivo": archivo,
-            }
-            for (
-                planificacion, id, planificacion_id, profesor_nombre, asignatura_nombre, curso_nombre, paralelo, periodo_nombre,
-                profesor_aprobador_id, profesor_revisor_id,
-                area_id, area_nombre, area_codigo,
-                fecha_de_actualizacion, estado, archivo
-            ) in planificaciones
-        ]
-        
-        return result
+        return planificaciones
 
     except Exception as e:
         print(f"Error: {str(e)}")
@@ -799,28 +804,27 @@ async def get_all_planificaciones_descargar(
 async def get_planificaciones_por_estado_por_area_periodo(
     area_id: int,
     periodo_id: int,
-    session: SessionDep
+    session: AsyncSessionDep
 ):
     try:
         # Consulta para obtener el total de planificaciones por estado para un área y período específico
         statement = (
             select(
-                Planificacion_Profesor.estado,
-                func.count().label("total_planificaciones")
+                Periodo_Stats.estado,
+                func.sum(Periodo_Stats.total).label("total_planificaciones")
             )
-            .join(Planificaciones, Planificacion_Profesor.planificacion_id == Planificaciones.id)
-            .join(Asignaturas, Planificaciones.asignaturas_id == Asignaturas.id)
             .where(
-                Asignaturas.area_id == area_id,
-                Planificaciones.periodo_id == periodo_id
+                Periodo_Stats.area_id == area_id,
+                Periodo_Stats.periodo_id == periodo_id
             )
-            .group_by(Planificacion_Profesor.estado)
+            .group_by(Periodo_Stats.estado)
+            .having(func.sum(Periodo_Stats.total) > 0)
         )
 
-        results = session.exec(statement).all()
+        results = (await session.exec(statement)).all()
 
         # Formatear los resultados como un diccionario {estado: total}
-        return {result.estado: result.total_planificaciones for result in results}
+        return {estado_publico(result.estado): result.total_planificaciones for result in results}
 
     except Exception as e:
         raise HTTPException(
@@ -834,7 +838,7 @@ async def get_planificaciones_por_estado_por_area_periodo(
 async def get_docentes_atrasados_por_area_periodo(
     area_id: int,
     periodo_id: int,
-    session: SessionDep
+    session: AsyncSessionDep
 ):
     try:
         # Consulta para obtener docentes con planificaciones atrasadas por área y período
@@ -857,7 +861,7 @@ async def get_docentes_atrasados_por_area_periodo(
             )
         )
 
-        results = session.exec(statement).all()
+        results = (await session.exec(statement)).all()
 
         # Formatear los resultados
         docentes_atrasados = [
@@ -872,7 +876,7 @@ async def get_docentes_atrasados_por_area_periodo(
             for result in results
         ]
 
-        return docentes_atrasados
+        return respuesta_json(docentes_atrasados)
 
     except Exception as e:
         raise HTTPException(
@@ -884,7 +888,7 @@ async def get_docentes_atrasados_por_area_periodo(
 async def get_planificaciones_por_estado_asignatura_por_area_periodo(
     area_id: int,
     periodo_id: int,
-    session: SessionDep
+    session: AsyncSessionDep
 ):
     try:
         # Consulta para obtener planificaciones por estado y asignatura para un área y período específico
@@ -910,7 +914,7 @@ async def get_planificaciones_por_estado_asignatura_por_area_periodo(
             )
         )
 
-        results = session.exec(statement).all()
+        results = (await session.exec(statement)).all()
 
         # Formatear los resultados
         planificaciones_por_estado_asignatura = [
@@ -936,7 +940,7 @@ async def get_planificaciones_por_estado_asignatura_por_area_periodo(
 async def get_planificaciones_por_area_periodo(
     area_id: int,
     periodo_id: int,
-    session: SessionDep
+    session: AsyncSessionDep
 ):
     try:
         # Alias para las tablas de profesores (asignado y revisor)
@@ -970,7 +974,7 @@ async def get_planificaciones_por_area_periodo(
         )
 
         # Ejecutar la consulta
-        results = session.exec(statement).all()
+        results = (await session.exec(statement)).all()
 
         # Formatear los resultados
         planificaciones = [
@@ -1006,72 +1010,128 @@ status_color_map = {
     'revisado': 'A855F7'    # morado
 }
 
+# Un solo objeto de relleno por estado, compartido por todas las celdas
+ESTADO_FILLS = {
+    estado: PatternFill(start_color=color, end_color=color, fill_type="solid")
+    for estado, color in status_color_map.items()
+}
+
+ENCABEZADOS_EXPORTACION = [
+    "Título", "Descripción", "Fecha de Subida", "Profesor", "Asignatura", "Curso", "Paralelo", "Periodo",
+    "Área", "Profesor Aprobador", "Profesor Revisor", "Fecha de Actualización", "Estado", "Archivo"
+]
+
+
+def _fila_exportacion(planificacion: Planificacion_Listado_Dto) -> list:
+    fecha_de_actualizacion = planificacion.fecha_de_actualizacion
+    return [
+        planificacion.titulo,
+        planificacion.descripcion,
+        planificacion.fecha_subida.strftime("%Y-%m-%d %H:%M:%S"),
+        planificacion.profesor_nombre,
+        planificacion.asignatura_nombre,
+        planificacion.curso_nombre,
+        planificacion.paralelo,  # Incluir el paralelo
+        planificacion.periodo_nombre,
+        planificacion.area_nombre,
+        planificacion.profesor_aprobador_nombre,
+        planificacion.profesor_revisor_nombre,
+        fecha_de_actualizacion.strftime("%Y-%m-%d %H:%M:%S") if fecha_de_actualizacion else None,
+        planificacion.estado,
+        planificacion.archivo
+    ]
+
+
+def _agregar_filas_excel(ws, planificaciones: List[Planificacion_Listado_Dto]) -> None:
+    for planificacion in planificaciones:
+        row = _fila_exportacion(planificacion)
+        # Aplicar el color de fondo solo a la celda de la columna "Estado"
+        fill = ESTADO_FILLS.get((planificacion.estado or "").lower())
+        if fill is not None:
+            celda = WriteOnlyCell(ws, value=row[12])  # Columna 13 es "Estado"
+            celda.fill = fill
+            row[12] = celda
+        ws.append(row)
+
+
+def _leer_por_bloques(archivo, tamanio: int = 64 * 1024) -> Iterator[bytes]:
+    try:
+        while bloque := archivo.read(tamanio):
+            yield bloque
+    finally:
+        archivo.close()
+
+
+def _nombre_exportacion(periodo_id: int, extension: str) -> str:
+    return f"planificaciones_periodo_{periodo_id}_{datetime.now(pytz.timezone('America/Guayaquil')).strftime('%Y%m%d_%H%M%S')}.{extension}"
+
+
 @router.get("/download-planificaciones-excel/", response_description="Descargar planificaciones en formato Excel")
 async def download_planificaciones_excel(
     periodo_id: int,  # ID del periodo
-    session: SessionDep
+    session: AsyncSessionDep
 ) -> Any:
+    """
+    Genera el Excel con openpyxl en modo de solo escritura: las filas se leen
+    por lotes con un cursor del servidor y se escriben al libro sin
+    conservarlas, y el archivo se arma en un temporal que queda en memoria
+    solo hasta EXPORTACION_MEMORIA_MAX bytes. Luego se envía por bloques.
+    """
+    archivo = tempfile.SpooledTemporaryFile(max_size=settings.EXPORTACION_MEMORIA_MAX)
     try:
-        # Obtener los datos del endpoint existente
-        planificaciones = await get_all_planificaciones_descargar(periodo_id, session)
-
-        # Crear un nuevo libro de Excel en memoria
-        wb = Workbook()
-        ws = wb.active
-        ws.title = "Planificaciones"
-
-        # Definir los encabezados de las columnas
-        headers = [
-            "Título", "Descripción", "Fecha de Subida", "Profesor", "Asignatura", "Curso", "Paralelo", "Periodo",
-            "Área", "Profesor Aprobador", "Profesor Revisor", "Fecha de Actualización", "Estado", "Archivo"
-        ]
-        ws.append(headers)
-
-        # Llenar el archivo Excel con los datos
-        for planificacion in planificaciones:
-            row = [
-                planificacion["titulo"],
-                planificacion["descripcion"],
-                planificacion["fecha_subida"].strftime("%Y-%m-%d %H:%M:%S"),
-                planificacion["profesor_nombre"],
-                planificacion["asignatura_nombre"],
-                planificacion["curso_nombre"],
-                planificacion["paralelo"],  # Incluir el paralelo
-                planificacion["periodo_nombre"],
-                planificacion["area_nombre"],
-                planificacion["profesor_aprobador_nombre"],
-                planificacion["profesor_revisor_nombre"],
-                planificacion["fecha_de_actualizacion"].strftime("%Y-%m-%d %H:%M:%S"),
-                planificacion["estado"],
-                planificacion["archivo"]
-            ]
-            ws.append(row)
-
-            # Aplicar el color de fondo solo a la celda de la columna "Estado"
-            estado = planificacion["estado"].lower()
-            if estado in status_color_map:
-                fill = PatternFill(start_color=status_color_map[estado], end_color=status_color_map[estado], fill_type="solid")
-                # La columna "Estado" es la columna 12 (índice 11 en base 0)
-                ws.cell(row=ws.max_row, column=13).fill = fill  # Columna 13 es "Estado"
-
-        # Crear un archivo en memoria
-        excel_file = io.BytesIO()
-        wb.save(excel_file)
-        excel_file.seek(0)  # Mover el puntero al inicio del archivo
-
-        # Nombre del archivo
-        filename = f"planificaciones_periodo_{periodo_id}_{datetime.now(pytz.timezone('America/Guayaquil')).strftime('%Y%m%d_%H%M%S')}.xlsx"
+        wb = Workbook(write_only=True)
+        ws = wb.create_sheet("Planificaciones")
+        ws.append(ENCABEZADOS_EXPORTACION)
+
+        # Llenar el archivo Excel con los datos, un lote a la vez y fuera del
+        # bucle de eventos
+        consulta = consulta_planificaciones().where(Planificaciones.periodo_id == periodo_id)
+        async for planificaciones in iterar_planificaciones(session, consulta):
+            await run_in_threadpool(_agregar_filas_excel, ws, planificaciones)
+
+        await run_in_threadpool(wb.save, archivo)
+        archivo.seek(0)  # Mover el puntero al inicio del archivo
 
         # Devolver el archivo como una respuesta de streaming
         return StreamingResponse(
-            excel_file,
+            _leer_por_bloques(archivo),
             media_type="application/vnd.openxmlformats-officedocument.spreadsheetml.sheet",
-            headers={"Content-Disposition": f"attachment; filename={filename}"}
+            headers={"Content-Disposition": f"attachment; filename={_nombre_exportacion(periodo_id, 'xlsx')}"}
         )
 
     except Exception as e:
+        archivo.close()
         print(f"Error: {str(e)}")
         raise HTTPException(
             status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
             detail=f"Error al generar el archivo Excel: {str(e)}"
-        )
\ No newline at end of file
+        )
+
+
+@router.get("/download-planificaciones-csv/", response_description="Descargar planificaciones en formato CSV")
+async def download_planificaciones_csv(periodo_id: int) -> Any:
+    """
+    Igual que la descarga en Excel pero en CSV, que se puede enviar a medida
+    que se leen las filas sin armar antes el archivo. Usa su propia sesión
+    porque las dependencias se cierran antes de enviar el cuerpo.
+    """
+    consulta = consulta_planificaciones().where(Planificaciones.periodo_id == periodo_id)
+
+    async def generar_csv() -> AsyncIterator[bytes]:
+        buffer = io.StringIO()
+        writer = csv.writer(buffer)
+        writer.writerow(ENCABEZADOS_EXPORTACION)
+        # BOM para que Excel reconozca la codificación UTF-8
+        yield ("\ufeff" + buffer.getvalue()).encode("utf-8")
+        async with AsyncSession(async_engine) as session:
+            async for planificaciones in iterar_planificaciones(session, consulta):
+                buffer.seek(0)
+                buffer.truncate()
+                writer.writerows(_fila_exportacion(planificacion) for planificacion in planificaciones)
+                yield buffer.getvalue().encode("utf-8")
+
+    return StreamingResponse(
+        generar_csv(),
+        media_type="text/csv; charset=utf-8",
+        headers={"Content-Disposition": f"attachment; filename={_nombre_exportacion(periodo_id, 'csv')}"}
+    )
@@ -1,24 +1,21 @@
 
 
 from datetime import datetime
-import ftplib
-import io
-import os
 
-from fastapi import APIRouter, File, Form, Request, Response, HTTPException, UploadFile, status,BackgroundTasks
+from fastapi import APIRouter, File, Form, Header, Response, HTTPException, UploadFile, status
 from fastapi.encoders import jsonable_encoder
 from typing import Any, List, Optional
-from fastapi.responses import FileResponse
 import pytz
 from sqlalchemy import String, alias, cast, extract
 from sqlalchemy.exc import SQLAlchemyError
 from sqlmodel import select , func
 from model import Comentarios_Informe, Comentarios_Informe_Dto, Informe_Profesor_DTO, Periodo,  Profesores, Informe_Profesor
-from api.deps import SessionDep, sender_email
-import tempfile
-import io
-from typing import Optional
-from utils import formatear_fecha, normalize_filename, render_email_template_info, send_email
+from api.deps import PaginacionDep, SessionDep, StorageDep
+from api.descargas import respuesta_archivo
+from api.respuestas import respuesta_json
+from api.subidas import SubidaPDF
+from core.correo import encolar_email
+from utils import formatear_fecha, normalize_filename, render_email_template_info
 
 router = APIRouter()
 
@@ -26,8 +23,7 @@ router = APIRouter()
 @router.post("/informe/create/", response_description="Crear un nuevo informe", status_code=status.HTTP_201_CREATED)
 async def create_informe(
     session: SessionDep,
-    request: Request,
-    background_tasks: BackgroundTasks,
+    storage: StorageDep,
      profesor_id:  int = Form(...),
     periodo_id:  int = Form(...),
     estado:  str = Form(...),
@@ -36,10 +32,9 @@ async def create_informe(
 
 ):
     try:
-        # Validar conexión al servidor FTP
-        ftp_server: Optional[ftplib.FTP] = request.app.ftp
-        if not ftp_server:
-            raise HTTPException(status_code=500, detail="No hay conexión con el servidor FTP.")
+        # Validar el PDF antes de modificar nada
+        subida = SubidaPDF(pdf)
+        await subida.validar()
 
         # Verificar si el profesor existe
         profesor = session.exec(select(Profesores).where(Profesores.id == profesor_id)).one_or_none()
@@ -61,28 +56,8 @@ async def create_informe(
         nombre_archivo = f"{profesor.nombre}_{estado}_{datetime.now(pytz.timezone('America/Guayaquil')).strftime('%Y%m%d_%H%M%S')}.pdf"
         ruta_completa = f"{ruta_carpeta}{nombre_archivo}"
 
-        # Crear directorios en el servidor FTP si no existen
-        partes = ruta_carpeta.split("/")
-        for i in range(1, len(partes) + 1):
-            subpath = "/".join(partes[:i])
-            try:
-                ftp_server.mkd(subpath)
-            except ftplib.error_perm:
-                # Ignorar error si el directorio ya existe
-                pass
-
-        # Cambiar al directorio correspondiente
-        ftp_server.cwd(ruta_carpeta)
-
-        # Subir el archivo al servidor FTP
-        contenido = await pdf.read()
-        ftp_server.storbinary(f"STOR {nombre_archivo}", io.BytesIO(contenido))
-
-        # Guardar la ruta del archivo en el informe
-        try:
-            ftp_server.cwd('/')
-        except Exception as e:
-            print(f"Error regresando al directorio inicial: {e}")
+        # Subir el archivo al servidor FTP por bloques
+        await storage.put_stream(ruta_completa, subida)
 
         informe_listo = Informe_Profesor(
             
@@ -94,13 +69,7 @@ async def create_informe(
             
         )
 
-        # Guardar el informe en la base de datos
-        
-        session.add(informe_listo)
-        session.commit()
-        session.refresh(informe_listo)
-
-        # Enviar un correo electrónico al profesor
+        # Encolar un correo electrónico al profesor
         email_data = render_email_template_info(
             template_name="info_docente.html",
             email_to=profesor.email,
@@ -108,15 +77,19 @@ async def create_informe(
             subject="Nuevo Informe Creado"
         )
 
-        background_tasks.add_task(
-            send_email,
-            email_to=profesor.email,
-            subject=email_data.subject,
-            html_content=email_data.html_content,
-        )
+        encolar_email(session, profesor.email, email_data.subject, email_data.html_content)
+
+        # Guardar el informe en la base de datos
+        
+        session.add(informe_listo)
+        session.commit()
+        session.refresh(informe_listo)
 
-        return {"message": "Informe creado exitosamente", "informe": informe_listo}
+        return {"message": "Informe creado exitosamente", "informe": informe_listo, "sha256": subida.sha256}
 
+    except HTTPException:
+        session.rollback()
+        raise
     except Exception as e:
         session.rollback()
         print(f"Error: {e}")
@@ -126,18 +99,16 @@ async def create_informe(
 @router.put("/informe/update/{informe_id}", response_description="Actualizar un informe", status_code=status.HTTP_200_OK)
 async def update_informe(
     session: SessionDep,
-    request: Request,
-    background_tasks: BackgroundTasks,
+    storage: StorageDep,
     informe_id: int,
     profesor_id: int,
     pdf: UploadFile = File(None),
     
 ):
     try:
-        # Validar conexión al servidor FTP
-        ftp_server: Optional[ftplib.FTP] = request.app.ftp
-        if not ftp_server:
-            raise HTTPException(status_code=500, detail="No hay conexión con el servidor FTP.")
+        # Validar el PDF antes de modificar nada
+        subida = SubidaPDF(pdf)
+        await subida.validar()
 
         # Verificar si el informe existe
         informe = session.exec(select(Informe_Profesor).where(Informe_Profesor.id == informe_id)).one_or_none()
@@ -166,23 +137,12 @@ async def update_informe(
         nombre_archivo = f"{normalize_filename(profesor.nombre)}_{estado}_{datetime.now(pytz.timezone('America/Guayaquil')).strftime('%Y%m%d_%H%M%S')}.pdf"
         ruta_completa = f"{ruta_carpeta}{nombre_archivo}"
         
-        partes = ruta_carpeta.split("/")
-        for i in range(1, len(partes) + 1):
-            subpath = "/".join(partes[:i])
-            try:
-                ftp_server.mkd(subpath)
-            except ftplib.error_perm:
-                # Ignorar error si el directorio ya existe
-                pass
-
-        
-        ftp_server.cwd(ruta_carpeta)
-        # archivos_en_directorio = ftp_server.nlst()
-        # print(archivos_en_directorio, informe.archivo, informe.archivo in archivos_en_directorio)
-        
         if informe.archivo:
-                # Eliminar el archivo existente
-            ftp_server.delete(informe.archivo)
+            # Eliminar el archivo existente
+            try:
+                await storage.delete(informe.archivo)
+            except Exception as e:
+                print(f"Error al eliminar archivo del FTP: {e}")
 
 
         # Crear la ruta del nuevo archivo
@@ -190,10 +150,8 @@ async def update_informe(
 
         
 
-        # Subir el nuevo archivo al servidor FTP
-        contenido = await pdf.read()
-        ftp_server.storbinary(f"STOR {nombre_archivo}", io.BytesIO(contenido))
-        ftp_server.cwd('/')
+        # Subir el nuevo archivo al servidor FTP por bloques
+        await storage.put_stream(ruta_completa, subida)
 
             # Actualizar la ruta del archivo en el informe
         informe.archivo = ruta_completa
@@ -201,18 +159,9 @@ async def update_informe(
 
         # Actualizar la fecha de actualización
         informe.fecha_de_actualizacion = datetime.now(pytz.timezone('America/Guayaquil'))
-        try:
-            ftp_server.cwd('/')
-        except Exception as e:
-            print(f"Error regresando al directorio inicial: {e}")
 
 
-        # Guardar los cambios en la base de datos
-        session.add(informe)
-        session.commit()
-        session.refresh(informe)
-
-        # Enviar un correo electrónico al profesor
+        # Encolar un correo electrónico al profesor
         email_data = render_email_template_info(
             template_name="info_docente.html",
             email_to=profesor.email,
@@ -220,16 +169,19 @@ async def update_informe(
             subject="Informe Actualizado"
         )
 
-        background_tasks.add_task(
-            send_email,
-            email_to=profesor.email,
-            subject=email_data.subject,
-            html_content=email_data.html_content,
-        )
+        encolar_email(session, profesor.email, email_data.subject, email_data.html_content)
 
+        # Guardar los cambios en la base de datos
+        session.add(informe)
+        session.commit()
+        session.refresh(informe)
 
-        return {"message": "Informe actualizado exitosamente", "informe": informe}
 
+        return {"message": "Informe actualizado exitosamente", "informe": informe, "sha256": subida.sha256}
+
+    except HTTPException:
+        session.rollback()
+        raise
     except Exception as e:
         session.rollback()
         print(f"Error: {e}")
@@ -240,14 +192,9 @@ async def update_informe(
 async def delete_informe(
     informe_id: int,
     session: SessionDep,
-    request: Request
+    storage: StorageDep
 ):
     try:
-        # Validar conexión al servidor FTP
-        ftp_server: Optional[ftplib.FTP] = request.app.ftp
-        if not ftp_server:
-            raise HTTPException(status_code=500, detail="No hay conexión con el servidor FTP.")
-
         # Verificar si el informe existe
         informe = session.exec(select(Informe_Profesor).where(Informe_Profesor.id == informe_id)).one_or_none()
         if not informe:
@@ -256,14 +203,9 @@ async def delete_informe(
         # Eliminar el archivo del servidor FTP si existe
         if informe.archivo:
             try:
-                ftp_server.delete(informe.archivo)
+                await storage.delete(informe.archivo)
             except Exception as e:
                 print(f"Error al eliminar archivo del FTP: {e}")
-        
-        try:
-            ftp_server.cwd('/')
-        except Exception as e:
-            print(f"Error regresando al directorio inicial: {e}")
 
         # Eliminar el informe de la base de datos
         session.delete(informe)
@@ -280,14 +222,10 @@ async def delete_informe(
 async def download_informe(
     informe_id: int,
     session: SessionDep,
-    request: Request
+    storage: StorageDep,
+    rango: Optional[str] = Header(None, alias="Range"),
 ):
     try:
-        # Validar conexión al servidor FTP
-        ftp_server: Optional[ftplib.FTP] = request.app.ftp
-        if not ftp_server:
-            raise HTTPException(status_code=500, detail="No hay conexión con el servidor FTP.")
-
         # Verificar si el informe existe
         informe = session.exec(select(Informe_Profesor).where(Informe_Profesor.id == informe_id)).one_or_none()
         if not informe:
@@ -297,33 +235,19 @@ async def download_informe(
         if not informe.archivo:
             raise HTTPException(status_code=404, detail="Archivo no encontrado.")
 
-        # Obtener el nombre del archivo
-        
-        directorio, nombre_archivo = os.path.split(informe.archivo)
-
-        # Cambiar al directorio correspondiente en el servidor FTP
-        ftp_server.cwd(directorio)
-
-        # Crear un archivo temporal para la descarga
-        with tempfile.NamedTemporaryFile(delete=False, suffix='.pdf') as temp_file:
-            try:
-                # Descargar el archivo desde el servidor FTP
-                ftp_server.retrbinary(f"RETR {nombre_archivo}", temp_file.write)
-            except Exception as e:
-                print(f"Error al descargar archivo: {e}")
-                raise HTTPException(status_code=500, detail="Error al descargar el archivo desde el servidor FTP.")
-            finally:
-                # Regresar al directorio raíz del servidor FTP
-                ftp_server.cwd('/')
-
-        # Devolver el archivo como respuesta
-        return FileResponse(
-            path=temp_file.name,
-            media_type='application/pdf',
-            filename=nombre_archivo,
-            headers={"Content-Disposition": f"attachment; filename={nombre_archivo}"}
-        )
+        # Enviar el archivo directamente desde el almacenamiento
+        try:
+            return await respuesta_archivo(storage, informe.archivo, rango)
+        except FileNotFoundError:
+            raise HTTPException(status_code=404, detail="Archivo no encontrado en el servidor FTP.")
+        except HTTPException:
+            raise
+        except Exception as e:
+            print(f"Error al descargar archivo: {e}")
+            raise HTTPException(status_code=500, detail="Error al descargar el archivo desde el servidor FTP.")
 
+    except HTTPException:
+        raise
     except Exception as e:
         print(f"Error: {e}")
         raise HTTPException(status_code=500, detail=f"Error al descargar el informe: {str(e)}")
@@ -354,7 +278,8 @@ async def get_conteo_informes_por_periodo(
 @router.get("/informe/listar-por-periodo/", response_description="Listar todos los informes por período")
 async def listar_informes_por_periodo(
     periodo_id: int,
-    session: SessionDep
+    session: SessionDep,
+    pagina: PaginacionDep
 ):
     try:
         # Verificar si el período existe
@@ -363,7 +288,7 @@ async def listar_informes_por_periodo(
             raise HTTPException(status_code=404, detail="Período no encontrado.")
 
         # Consulta para obtener todos los informes asociados al período, incluyendo el nombre del profesor
-        informes = session.exec(
+        statement = (
             select(
                 Informe_Profesor,
                 Profesores.nombre.label("profesor_nombre"),  # Seleccionar el nombre del profesor
@@ -372,7 +297,13 @@ async def listar_informes_por_periodo(
             .join(Profesores, Informe_Profesor.profesor_id == Profesores.id)  # Join con la tabla Profesores
             .join(Periodo, Informe_Profesor.periodo_id == Periodo.id)  # Join con la tabla Periodo
             .where(Informe_Profesor.periodo_id == periodo_id)
-        ).all()
+        )
+        if pagina.total:
+            pagina.registrar_total(session.exec(pagina.contar(statement)).one())
+        informes = pagina.recortar(
+            session.exec(pagina.ordenar(statement, Informe_Profesor.id)).all(),
+            clave=lambda fila: (fila[0].id,)
+        )
 
         # Formatear la respuesta
         resultados = [
@@ -390,8 +321,10 @@ async def listar_informes_por_periodo(
             for informe, profesor_nombre, periodo_nombre in informes  # Desempaquetar el resultado del join
         ]
 
-        return resultados
+        return respuesta_json(resultados, pagina.response)
 
+    except HTTPException:
+        raise
     except Exception as e:
         print(f"Error: {e}")
         raise HTTPException(status_code=500, detail=f"Error al listar los informes: {str(e)}")
@@ -435,25 +368,19 @@ async def comentar_planificacion(
             fecha_enviado=datetime.now(pytz.timezone('America/Guayaquil'))
         )
 
+        # Encolar el correo electrónico, se guarda junto con el comentario
+        encolar_email(
+            session,
+            fechtprofesor.email,
+            "Comentario de Informe",
+            text=comentario.comentario  # El comentario como cuerpo del correo
+        )
+
         # Guardar el comentario en la base de datos
         session.add(comentario_data)
         session.commit()
         session.refresh(comentario_data)
 
-        # Enviar el correo electrónico
-        try:
-            sender_email(
-                fechtprofesor.email,  # Asegúrate de que esta propiedad exista
-                f"Comentario de Informe",
-                comentario.comentario  # El comentario como cuerpo del correo
-            )
-        except Exception as e:
-            print(f"Error al enviar el email: {e}")
-            raise HTTPException(
-                status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
-                detail="Fallo al enviar el email"
-            )
-
         return comentario_data
         
     except Exception as e:
@@ -0,0 +1,35 @@
+import secrets
+from typing import Optional
+
+from fastapi import APIRouter, Header, HTTPException, status
+from fastapi.responses import PlainTextResponse
+
+from core.config import settings
+from core.metricas import metricas
+
+router = APIRouter()
+
+
+@router.get("/metrics", response_description="Métricas en formato Prometheus", response_class=PlainTextResponse)
+async def get_metricas(authorization: Optional[str] = Header(None)) -> str:
+    """
+    Latencia, respuestas y excepciones por ruta, sentencias SQL y tiempo de
+    base de datos por ruta, y tiempo en FTP y SMTP. Las tareas del scheduler
+    aparecen con la ruta "sin_peticion".
+
+    Exige `Authorization: Bearer <METRICAS_TOKEN>`; sin METRICAS_TOKEN el
+    endpoint está deshabilitado y responde 404.
+    """
+    if not settings.METRICAS_TOKEN:
+        raise HTTPException(
+            status_code=status.HTTP_404_NOT_FOUND,
+            detail="Métricas deshabilitadas: configure METRICAS_TOKEN",
+        )
+    esperado = f"Bearer {settings.METRICAS_TOKEN}"
+    if authorization is None or not secrets.compare_digest(authorization, esperado):
+        raise HTTPException(
+            status_code=status.HTTP_401_UNAUTHORIZED,
+            detail="Token de métricas no válido",
+            headers={"WWW-Authenticate": "Bearer"},
+        )
+    return metricas.exportar()
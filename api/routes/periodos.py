@@ -6,7 +6,9 @@ from sqlalchemy.exc import IntegrityError, SQLAlchemyError
 
 from sqlmodel import desc, select , func
 from model import Periodo
-from api.deps import SessionDep
+from api.deps import PaginacionDep, SessionDep
+from api.busqueda import coincide, relevancia
+from api.respuestas import respuesta_modelos
 
 router = APIRouter()
 
@@ -31,11 +33,14 @@ async def create_periodo(periodo: Periodo, session: SessionDep) -> Any:
 
 # Obtener todos los periodos
 @router.get("/periodo/", response_description="Listar todos los periodos", response_model=List[Periodo])
-async def get_periodos(session: SessionDep) -> Any:
+async def get_periodos(session: SessionDep, pagina: PaginacionDep) -> Any:
+    statement = select(Periodo)
+    if pagina.total:
+        pagina.registrar_total(session.exec(pagina.contar(statement)).one())
     # Consulta ordenada por id descendente
-    statement = select(Periodo).order_by(Periodo.id.desc())
-    result = session.exec(statement).all()
-    return result
+    statement = pagina.ordenar(statement, Periodo.id, descendente=True)
+    result = pagina.recortar(session.exec(statement).all())
+    return respuesta_modelos(result, Periodo, pagina.response)
 
 # Obtener un periodo específico por ID
 @router.get("/periodo/{periodo_id}", response_description="Obtener un periodo por ID")
@@ -120,8 +125,8 @@ async def search_period(
     try:
         # Construir la consulta para buscar por nombre o código
         statement = select(Periodo).where(
-            (Periodo.nombre.ilike(f"%{query}%"))
-        ).limit(7).order_by(Periodo.id.desc())  # Limitar resultados
+            coincide(query, Periodo.nombre)
+        ).order_by(relevancia(query, Periodo.nombre).desc(), Periodo.id.desc()).limit(7)  # Limitar resultados
         
         # Ejecutar la consulta
         result = session.exec(statement).all()
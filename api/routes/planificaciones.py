@@ -1,24 +1,25 @@
 
-from datetime import datetime
-import ftplib
-import io
+from collections import Counter
+from datetime import date, datetime
 import os
 
 
-from fastapi import APIRouter, File, Form, Request, Response, HTTPException, UploadFile, status,BackgroundTasks
+from fastapi import APIRouter, File, Form, Header, Response, HTTPException, UploadFile, status
 from fastapi.encoders import jsonable_encoder
 from typing import Any, List, Optional
-from fastapi.responses import FileResponse
 import pytz
-from sqlalchemy import String, alias, cast, extract
 from sqlalchemy.exc import SQLAlchemyError
 from sqlmodel import select , func
-from model import Areas, Comentarios, Comentarios_Dto, areas_profesor, Asignaturas, Periodo, Planificacion_Profesor, Planificaciones, Profesores
-from api.deps import SessionDep, sender_email
-import tempfile
-import io
-from typing import Optional
-from utils import formatear_fecha, normalize_filename, render_email_template_info, send_email
+from model import Comentarios, Comentarios_Dto, areas_profesor, Asignaturas, Planificacion_Listado_Dto, Planificacion_Profesor, Planificaciones, Profesores
+from api.deps import AsyncSessionDep, CachePDFDep, PaginacionDep, SessionDep, StorageDep
+from api.consultas import consulta_planificaciones, listar_pagina
+from api.descargas import respuesta_archivo
+from api.respuestas import respuesta_modelos
+from api.estadisticas import conteos, registrar_cambios
+from api.filtros import filtro_fecha_subida
+from api.subidas import SubidaPDF
+from core.correo import encolar_email
+from utils import formatear_fecha, normalize_filename, render_email_template_info
 
 router = APIRouter()
 
@@ -53,7 +54,7 @@ MESES = {
 
 
 @router.post("/create", response_description="Agregar nueva planificación", status_code=status.HTTP_201_CREATED)
-async def create_planificacion(planificacion: Planificaciones, session: SessionDep,background_tasks: BackgroundTasks) -> Any:
+async def create_planificacion(planificacion: Planificaciones, session: SessionDep) -> Any:
     try:
         # Verificar si el usuario (profesor) existe y obtener su email
         
@@ -88,12 +89,7 @@ async def create_planificacion(planificacion: Planificaciones, session: SessionD
         subject="Planificación de asignaturas"
         )
         
-        background_tasks.add_task(
-            send_email,
-            email_to=fechtprofesor.email,
-            subject=email_data.subject,
-            html_content=email_data.html_content,
-        )
+        encolar_email(session, fechtprofesor.email, email_data.subject, email_data.html_content)
         
         # Crear una nueva instancia del modelo Planificacion
         
@@ -103,6 +99,10 @@ async def create_planificacion(planificacion: Planificaciones, session: SessionD
         
         # Guardar en la base de datos
         session.add(new_planificacion)
+        session.flush()
+
+        # El trigger de la base de datos crea la fila de planificacion_profesor
+        registrar_cambios(session, Counter(), conteos(session, Planificaciones.id == new_planificacion.id))
         session.commit()
         session.refresh(new_planificacion)
         
@@ -120,7 +120,7 @@ async def create_planificacion(planificacion: Planificaciones, session: SessionD
 
 
 @router.put("/update/{planificacion_id}", response_description="Actualizar una planificación", status_code=status.HTTP_200_OK)
-async def update_planificacion(planificacion_id: int, updated_data: Planificaciones, session: SessionDep, request: Request,background_tasks: BackgroundTasks) -> Any:
+async def update_planificacion(planificacion_id: int, updated_data: Planificaciones, session: SessionDep, storage: StorageDep, cache: CachePDFDep) -> Any:
     try:
         # Verificar si la planificación existe
         existing_planificacion = session.exec(
@@ -152,19 +152,22 @@ async def update_planificacion(planificacion_id: int, updated_data: Planificacio
     
         if planificacion_profesor :
             # Eliminar archivo de FTP
-            ftp_server: Optional[ftplib.FTP] = request.app.ftp
-            if ftp_server:
-                try:
-                    if planificacion_profesor.archivo is not None:
-                        ftp_server.cwd('/')
-                        ftp_server.delete(planificacion_profesor.archivo)
-                except Exception as e:
-                    print(f"Error al eliminar archivo del FTP: {e}")
+            try:
+                if planificacion_profesor.archivo is not None:
+                    await cache.invalidar(planificacion_profesor.archivo)
+                    await storage.delete(planificacion_profesor.archivo)
+            except Exception as e:
+                print(f"Error al eliminar archivo del FTP: {e}")
             # Eliminar archivo de la base de datos
             planificacion_profesor.archivo = None
             session.add(planificacion_profesor)
             session.commit()
 
+        # Bloquear la fila hasta el commit para que el conteo anterior siga
+        # siendo válido al registrar el cambio en periodo_stats
+        session.refresh(existing_planificacion, with_for_update=True)
+        conteo_anterior = conteos(session, Planificaciones.id == planificacion_id)
+
         # Actualizar los campos de la planificación existente
         updated_fields = updated_data.dict(exclude_unset=True)  # Solo incluir campos enviados
         for key, value in updated_fields.items():
@@ -181,15 +184,12 @@ async def update_planificacion(planificacion_id: int, updated_data: Planificacio
             subject="Actualización de planificación de asignaturas"
         )
 
-        background_tasks.add_task(
-            send_email,
-            email_to=fechtprofesor.email,
-            subject=email_data.subject,
-            html_content=email_data.html_content,
-        )
+        encolar_email(session, fechtprofesor.email, email_data.subject, email_data.html_content)
 
         # Guardar los cambios en la base de datos
         session.add(existing_planificacion)
+        session.flush()
+        registrar_cambios(session, conteo_anterior, conteos(session, Planificaciones.id == planificacion_id))
         session.commit()
         session.refresh(existing_planificacion)
 
@@ -207,126 +207,24 @@ async def update_planificacion(planificacion_id: int, updated_data: Planificacio
 @router.get("/search/", response_description="Listar todas las planificaciones", response_model=List[Any])
 async def get_all_planificaciones(
     query: int, 
-    mes: str,
-    year: str,
-    session: SessionDep
+    session: AsyncSessionDep,
+    pagina: PaginacionDep,
+    mes: Optional[str] = None,
+    year: Optional[str] = None,
+    desde: Optional[date] = None,
+    hasta: Optional[date] = None,
 ) -> Any:
+    filtros_fecha = filtro_fecha_subida(Planificaciones.fecha_subida, mes, year, desde, hasta)
     try:
-        # Realizamos el join entre todas las tablas necesarias
-        query = (
-            select(
-                Planificaciones,
-                Planificacion_Profesor.id,
-                Planificacion_Profesor.planificacion_id,
-                Profesores.nombre.label("profesor_nombre"),
-                Asignaturas.nombre.label("asignatura_nombre"),
-                Asignaturas.curso.label("curso_nombre"),  # Agregar el nombre del curso
-                Periodo.nombre.label("periodo_nombre"),
-                # Información del profesor aprobador
-                Planificacion_Profesor.profesor_aprobador_id,
-                # Información del profesor revisor
-                Planificacion_Profesor.profesor_revisor_id,
-                # Información del área
-                Areas.id.label("area_id"),
-                Areas.nombre.label("area_nombre"),
-                Areas.codigo.label("area_codigo"),
-                # Información adicional de la planificación
-                Planificacion_Profesor.fecha_de_actualizacion,
-                Planificacion_Profesor.estado,
-                Planificacion_Profesor.archivo,
-            )
-            .join(Profesores, Planificaciones.profesor_id == Profesores.id)
-            .join(Asignaturas, Planificaciones.asignaturas_id == Asignaturas.id)
-            .join(Periodo, Planificaciones.periodo_id == Periodo.id)
-            .join(Areas, Asignaturas.area_id == Areas.id)
-            .join(
-                Planificacion_Profesor,
-                Planificaciones.id == Planificacion_Profesor.planificacion_id
-            )
-            # Join para obtener la información del profesor revisor
-            .join(
-                areas_profesor,
-                Planificacion_Profesor.profesor_revisor_id == areas_profesor.id,
-                isouter=True
-            )
+        consulta = (
+            consulta_planificaciones()
             .where(Planificaciones.periodo_id == query)
-            .where(cast(extract('month', Planificaciones.fecha_subida), String).ilike(f'%{mes}%'))
-            .where(cast(extract('year', Planificaciones.fecha_subida), String).ilike(f'%{year}%'))
+            .where(*filtros_fecha)
         )
-        
-        # Ejecutar la consulta y obtener los resultados
-        planificaciones = session.exec(query).all()
-
-        # Obtener los IDs de profesores aprobadores y revisores
-        profesor_aprobador_ids = [p[7] for p in planificaciones if p[7] is not None]  # índice 6 es profesor_aprobador_id
-        profesor_revisor_ids = [p[8] for p in planificaciones if p[8] is not None]    # índice 7 es profesor_revisor_id
-
-        # Consultar nombres de profesores aprobadores
-        aprobadores = {}
-        if profesor_aprobador_ids:
-            query_aprobadores = select(Profesores).where(Profesores.id.in_(profesor_aprobador_ids))
-            aprobadores = {p.id: p.nombre for p in session.exec(query_aprobadores)}
-
-        # Consultar nombres de profesores revisores a través de Areas_Profesor
-        revisores = {}
-        if profesor_revisor_ids:
-            query_revisores = (
-                select(areas_profesor, Profesores.nombre)
-                .join(Profesores, areas_profesor.profesor_id == Profesores.id)
-                .where(areas_profesor.id.in_(profesor_revisor_ids))
-            )
-            revisores = {ap.id: nombre for ap, nombre in session.exec(query_revisores)}
-
-        # Crear una lista de resultados con los campos deseados
-        result = [
-            {
-                # Información básica de la planificación
-                "titulo": planificacion.titulo,
-                "descripcion": planificacion.descripcion,
-                "fecha_subida": planificacion.fecha_subida,
-                
-                # IDs de relaciones
-                "profesor_id": planificacion.profesor_id,
-                "asignaturas_id": planificacion.asignaturas_id,
-                "periodo_id": planificacion.periodo_id,
-
-                "id": id,
-                "id_planificacion": planificacion_id,
-                
-                # Nombres de las relaciones principales
-                "profesor_nombre": profesor_nombre,
-                "periodo_nombre": periodo_nombre,
-                "asignatura_nombre": asignatura_nombre,
-                "curso_nombre": curso_nombre,  # Agregar el nombre del curso
-                
-                # Información del área
-                "area_id": area_id,
-                "area_nombre": area_nombre,
-                "area_codigo": area_codigo,
-                
-                # Información del profesor aprobador
-                "profesor_aprobador_id": profesor_aprobador_id,
-                "profesor_aprobador_nombre": aprobadores.get(profesor_aprobador_id) if profesor_aprobador_id else None,
-                
-                # Información del profesor revisor
-                "profesor_revisor_id": profesor_revisor_id,
-                "profesor_revisor_nombre": revisores.get(profesor_revisor_id) if profesor_revisor_id else None,
-                
-                # Información adicional de la planificación
-                "fecha_de_actualizacion": fecha_de_actualizacion,
-                "estado": estado,
-                "archivo": archivo,
-            }
-            for (
-                planificacion, id, planificacion_id, profesor_nombre, asignatura_nombre, curso_nombre, periodo_nombre,
-                profesor_aprobador_id, profesor_revisor_id,
-                area_id, area_nombre, area_codigo,
-                fecha_de_actualizacion, estado, archivo
-            ) in planificaciones
-        ]
-        
-        return result
+        return respuesta_modelos(await listar_pagina(session, consulta, pagina), Planificacion_Listado_Dto, pagina.response)
 
+    except HTTPException:
+        raise
     except Exception as e:
         print(f"Error: {str(e)}")
         raise HTTPException(
@@ -339,124 +237,25 @@ async def get_all_planificaciones(
 async def get_planificaciones_by_revisor(
     profesor_id: int,  # ID del profesor (no del areas_profesor)
     query: int,  # ID del periodo
-    mes: str,  # Mes de la planificación
-    year: str,  # Año de la planificación
-    session: SessionDep
+    session: AsyncSessionDep,
+    pagina: PaginacionDep,
+    mes: Optional[str] = None,  # Mes de la planificación (1-12)
+    year: Optional[str] = None,  # Año de la planificación
+    desde: Optional[date] = None,  # Fecha de subida mínima, incluida
+    hasta: Optional[date] = None,  # Fecha de subida máxima, incluida
 ) -> Any:
+    filtros_fecha = filtro_fecha_subida(Planificaciones.fecha_subida, mes, year, desde, hasta)
     try:
-        # Realizamos el join entre todas las tablas necesarias
-        query_planificaciones = (
-            select(
-                Planificaciones,
-                Planificacion_Profesor.id,
-                Planificacion_Profesor.planificacion_id,
-                Profesores.nombre.label("profesor_nombre"),
-                Asignaturas.nombre.label("asignatura_nombre"),
-                Asignaturas.curso.label("curso_nombre"),  # Agregar el nombre del curso
-
-                Periodo.nombre.label("periodo_nombre"),
-                
-                Planificacion_Profesor.profesor_aprobador_id,
-                Planificacion_Profesor.profesor_revisor_id,
-                Areas.id.label("area_id"),
-                Areas.nombre.label("area_nombre"),
-                Areas.codigo.label("area_codigo"),
-                Planificacion_Profesor.fecha_de_actualizacion,
-                Planificacion_Profesor.estado,
-                Planificacion_Profesor.archivo,
-            )
-            .join(Profesores, Planificaciones.profesor_id == Profesores.id)
-            .join(Asignaturas, Planificaciones.asignaturas_id == Asignaturas.id)
-            .join(Periodo, Planificaciones.periodo_id == Periodo.id)
-            .join(Areas, Asignaturas.area_id == Areas.id)
-            .join(
-                Planificacion_Profesor,
-                Planificaciones.id == Planificacion_Profesor.planificacion_id
-            )
-            .join(
-                areas_profesor,
-                Planificacion_Profesor.profesor_revisor_id == areas_profesor.id,
-                isouter=True
-            )
+        consulta = (
+            consulta_planificaciones()
             .where(areas_profesor.profesor_id == profesor_id)  # Filtrar por el ID del profesor en areas_profesor
             .where(Planificaciones.periodo_id == query)  # Filtrar por el periodo
-            .where(cast(extract('month', Planificaciones.fecha_subida), String).ilike(f'%{mes}%'))  # Filtrar por mes
-            .where(cast(extract('year', Planificaciones.fecha_subida), String).ilike(f'%{year}%'))  # Filtrar por año
+            .where(*filtros_fecha)  # Filtrar por mes, año o rango de fechas
         )
-        
-        # Ejecutar la consulta y obtener los resultados
-        planificaciones = session.exec(query_planificaciones).all()
-
-        # Obtener los IDs de profesores aprobadores y revisores
-        profesor_aprobador_ids = [p[7] for p in planificaciones if p[7] is not None]  # índice 6 es profesor_aprobador_id
-        profesor_revisor_ids = [p[8] for p in planificaciones if p[8] is not None]    # índice 7 es profesor_revisor_id
-
-        # Consultar nombres de profesores aprobadores
-        aprobadores = {}
-        if profesor_aprobador_ids:
-            query_aprobadores = select(Profesores).where(Profesores.id.in_(profesor_aprobador_ids))
-            aprobadores = {p.id: p.nombre for p in session.exec(query_aprobadores)}
-
-        # Consultar nombres de profesores revisores a través de Areas_Profesor
-        revisores = {}
-        if profesor_revisor_ids:
-            query_revisores = (
-                select(areas_profesor, Profesores.nombre)
-                .join(Profesores, areas_profesor.profesor_id == Profesores.id)
-                .where(areas_profesor.id.in_(profesor_revisor_ids))
-            )
-            revisores = {ap.id: nombre for ap, nombre in session.exec(query_revisores)}
-
-        # Crear una lista de resultados con los campos deseados
-        result = [
-            {
-                # Información básica de la planificación
-                "titulo": planificacion.titulo,
-                "descripcion": planificacion.descripcion,
-                "fecha_subida": planificacion.fecha_subida,
-                
-                # IDs de relaciones
-                "profesor_id": planificacion.profesor_id,
-                "asignaturas_id": planificacion.asignaturas_id,
-                "periodo_id": planificacion.periodo_id,
-
-                "id": id,
-                "id_planificacion": planificacion_id,
-                
-                # Nombres de las relaciones principales
-                "profesor_nombre": profesor_nombre,
-                "periodo_nombre": periodo_nombre,
-                "asignatura_nombre": asignatura_nombre,
-                "curso_nombre": curso_nombre,  # Agregar el nombre del curso
-                
-                # Información del área
-                "area_id": area_id,
-                "area_nombre": area_nombre,
-                "area_codigo": area_codigo,
-                
-                # Información del profesor aprobador
-                "profesor_aprobador_id": profesor_aprobador_id,
-                "profesor_aprobador_nombre": aprobadores.get(profesor_aprobador_id) if profesor_aprobador_id else None,
-                
-                # Información del profesor revisor
-                "profesor_revisor_id": profesor_revisor_id,
-                "profesor_revisor_nombre": revisores.get(profesor_revisor_id) if profesor_revisor_id else None,
-                
-                # Información adicional de la planificación
-                "fecha_de_actualizacion": fecha_de_actualizacion,
-                "estado": estado,
-                "archivo": archivo,
-            }
-            for (
-                planificacion, id, planificacion_id, profesor_nombre, asignatura_nombre,curso_nombre, periodo_nombre,
-                profesor_aprobador_id, profesor_revisor_id,
-                area_id, area_nombre, area_codigo,
-                fecha_de_actualizacion, estado, archivo
-            ) in planificaciones
-        ]
-        
-        return result
+        return respuesta_modelos(await listar_pagina(session, consulta, pagina), Planificacion_Listado_Dto, pagina.response)
 
+    except HTTPException:
+        raise
     except Exception as e:
         print(f"Error: {str(e)}")
         raise HTTPException(
@@ -473,8 +272,8 @@ BASE_UPLOAD_DIR = "uploads"
 @router.put("/subir-pdf/")
 async def subir_pdf(
     db: SessionDep,
-    request: Request,
-    background_tasks: BackgroundTasks,
+    storage: StorageDep,
+    cache: CachePDFDep,
 
     pdf: UploadFile = File(...),
     id_planificacion: int = Form(...),
@@ -485,16 +284,11 @@ async def subir_pdf(
     curso_nombre: str = Form(...),
     id_profesor_asignado: int = Form(...),
 ):
-    # Validar conexión al servidor FTP
-    ftp_server: Optional[ftplib.FTP] = request.app.ftp
-    if not ftp_server:
-        raise HTTPException(status_code=500, detail="No hay conexión con el servidor FTP.")
-
-    try:
-        ftp_server.cwd('/')
-    except Exception as e:
-        print(f"Error regresando al directorio inicial: {e}")
     try:
+        # Validar el PDF antes de modificar nada
+        subida = SubidaPDF(pdf)
+        await subida.validar()
+
         # Verificar si ya existe un registro de planificación_profesor
         query_planificacion_profesor = select(Planificacion_Profesor).where(
             Planificacion_Profesor.id == id_planificacion
@@ -533,12 +327,7 @@ async def subir_pdf(
                 subject="Actualización de planificación de asignaturas"
             )
 
-            background_tasks.add_task(
-                send_email,
-                email_to=profesor_asignado.email,
-                subject=email_data.subject,
-                html_content=email_data.html_content,
-            )
+            encolar_email(db, profesor_asignado.email, email_data.subject, email_data.html_content)
             
         elif planificacion_profesor.profesor_aprobador_id == id_usuario:
             estado = "aprobado"
@@ -549,12 +338,7 @@ async def subir_pdf(
                 subject="Actualización de planificación de asignaturas"
             )
 
-            background_tasks.add_task(
-                send_email,
-                email_to=profesor_asignado.email,
-                subject=email_data.subject,
-                html_content=email_data.html_content,
-            )
+            encolar_email(db, profesor_asignado.email, email_data.subject, email_data.html_content)
         else:
             estado = "entregado"
 
@@ -568,24 +352,17 @@ async def subir_pdf(
             
             estado = "entregado"
             
-            def enviar_email_revisor():
-                profesor_aprobador = db.exec(select(Profesores).where(
-                Profesores.id == planificacion_profesor.profesor_aprobador_id
-                )).first()
-                email_data = render_email_template_info(
-                template_name="info_docente.html",
-                email_to=profesor_aprobador.email,
-                message=f"Se ha realizado la entrega de la planificación en la asignatura {nombre_asignatura} del curso {curso_nombre}. Consultar estado con el identificador {id_planificacion}.",
-                subject="Actualización de planificación de asignaturas"
-                
-                )
-                send_email(
-                    email_to=profesor_aprobador.email,
-                    subject=email_data.subject,
-                    html_content=email_data.html_content,
-                )
-                
-            background_tasks.add_task(enviar_email_revisor)
+            profesor_aprobador = db.exec(select(Profesores).where(
+            Profesores.id == planificacion_profesor.profesor_aprobador_id
+            )).first()
+            email_data = render_email_template_info(
+            template_name="info_docente.html",
+            email_to=profesor_aprobador.email,
+            message=f"Se ha realizado la entrega de la planificación en la asignatura {nombre_asignatura} del curso {curso_nombre}. Consultar estado con el identificador {id_planificacion}.",
+            subject="Actualización de planificación de asignaturas"
+            
+            )
+            encolar_email(db, profesor_aprobador.email, email_data.subject, email_data.html_content)
             
        
             
@@ -596,34 +373,21 @@ async def subir_pdf(
         nombre_archivo = f"{id_planificacion}_{id_profesor_asignado}_{estado}.pdf"
         ruta_completa = f"{ruta_carpeta}/{nombre_archivo}"
 
-        # Verificar y crear directorios en el servidor FTP
-        partes = ruta_carpeta.split("/")
-        for i in range(1, len(partes) + 1):
-            subpath = "/".join(partes[:i])
-            try:
-                ftp_server.mkd(subpath)
-            except ftplib.error_perm:
-                # Ignorar error si el directorio ya existe
-                pass
-
-        # Cambiar al directorio correspondiente
-
-        # Verificar si el archivo ya existe
-        archivos_en_directorio = ftp_server.nlst()
-        
+        # Eliminar el archivo anterior si existe
         if planificacion_profesor.archivo:
             try:
-                ftp_server.cwd('/')
-                ftp_server.delete(planificacion_profesor.archivo)
-
+                await cache.invalidar(planificacion_profesor.archivo)
+                await storage.delete(planificacion_profesor.archivo)
             except Exception as e:
-                print(f"Error regresando al directorio inicial: {e}")
-            
-        ftp_server.cwd(ruta_carpeta)
+                print(f"Error al eliminar el archivo anterior: {e}")
+
+        # Subir el nuevo archivo por bloques
+        await storage.put_stream(ruta_completa, subida)
+        await cache.invalidar(ruta_completa)
 
-        # Subir el nuevo archivo
-        contenido = await pdf.read()
-        ftp_server.storbinary(f"STOR {nombre_archivo}", io.BytesIO(contenido))
+        # Bloquear la fila recién ahora, sin retenerla durante la subida
+        db.refresh(planificacion_profesor, with_for_update=True)
+        conteo_anterior = conteos(db, Planificacion_Profesor.id == id_planificacion)
 
         # Actualizar el registro en la base de datos
         planificacion_profesor.archivo = ruta_completa
@@ -631,18 +395,20 @@ async def subir_pdf(
 
         # Guardar cambios en la base de datos
         db.add(planificacion_profesor)
+        db.flush()
+        registrar_cambios(db, conteo_anterior, conteos(db, Planificacion_Profesor.id == id_planificacion))
         db.commit()
         db.refresh(planificacion_profesor)
-        try:
-            ftp_server.cwd('/')
-        except Exception as e:
-            print(f"Error regresando al directorio inicial: {e}")
 
         return {
             "mensaje": "Archivo actualizado exitosamente.",
             "ruta_archivo": ruta_completa,
-            "estado": estado
+            "estado": estado,
+            "sha256": subida.sha256,
         }
+    except HTTPException:
+        db.rollback()
+        raise
     except Exception as e:
         print(e)
         db.rollback()
@@ -654,21 +420,27 @@ async def subir_pdf(
 @router.get("/descargar-planificacion/", response_description="Descargar archivo de planificación")
 async def descargar_planificacion(
     ruta_archivo: str,
-    session: SessionDep,
+    session: AsyncSessionDep,
     response: Response,
-    request: Request,
+    storage: StorageDep,
+    cache: CachePDFDep,
+    rango: Optional[str] = Header(None, alias="Range"),
+    if_none_match: Optional[str] = Header(None, alias="If-None-Match"),
 ) -> Response:
     """
     Endpoint to download a planning file from FTP server
     
     Args:
         ruta_archivo (str): Path to the file to be downloaded
-        session (SessionDep): Database session
+        session (AsyncSessionDep): Database session
         response (Response): FastAPI response object
-        request (Request): FastAPI request object
+        storage (StorageDep): Almacenamiento de archivos
+        cache (CachePDFDep): Caché local de PDF
+        rango (str): Cabecera Range opcional para descargas parciales
+        if_none_match (str): ETag que el cliente ya tiene, para responder 304
     
     Returns:
-        FileResponse: The requested file
+        StreamingResponse: The requested file, streamed from storage
     """
     # Validate input to prevent null character injection
     if not ruta_archivo or '\0' in ruta_archivo:
@@ -677,23 +449,11 @@ async def descargar_planificacion(
             detail="Ruta de archivo inválida"
         )
 
-    ftp_server: Optional[ftplib.FTP] = request.app.ftp
-    if not ftp_server:
-        raise HTTPException(
-            status_code=status.HTTP_500_INTERNAL_SERVER_ERROR, 
-            detail="No hay conexión con el servidor FTP."
-        )
     try:
-        ftp_server.cwd('/')
-    except Exception as e:
-        print(f"Error regresando al directorio inicial: {e}")
-    
-    try:
-        # Store the initial directory
 
         # Validate planificacion exists in database
         query = select(Planificacion_Profesor).where(Planificacion_Profesor.archivo == ruta_archivo)
-        planificacion = session.exec(query).one_or_none()
+        planificacion = (await session.exec(query)).one_or_none()
 
         if not planificacion:
             raise HTTPException(
@@ -703,46 +463,25 @@ async def descargar_planificacion(
         
         # Safely split path
         directorio, filename = os.path.split(ruta_archivo)
-        
+
+        # Stream the file straight from storage
         try:
-            # Change to correct directory in FTP
-          
-            ftp_server.cwd(directorio)  
-        except Exception as e:
-            print(f"Error cambiando directorio FTP: {e}")
+            return await respuesta_archivo(
+                storage, ruta_archivo, rango, cache=cache, if_none_match=if_none_match
+            )
+        except FileNotFoundError:
             raise HTTPException(
                 status_code=status.HTTP_404_NOT_FOUND,
-                detail=f"El directorio {directorio} no existe en el servidor FTP."
+                detail=f"El archivo {filename} no existe en el servidor FTP."
+            )
+        except HTTPException:
+            raise
+        except Exception as e:
+            print(f"Error descargando archivo: {e}")
+            raise HTTPException(
+                status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
+                detail="Error al descargar el archivo desde el servidor FTP."
             )
-
-        # Create a temporary file for download
-        with tempfile.NamedTemporaryFile(delete=False, suffix='.pdf') as temp_file:
-            try:
-                # Download file directly to temporary file
-                ftp_server.retrbinary(f"RETR {filename}", temp_file.write)
-            except Exception as e:
-                print(f"Error descargando archivo: {e}")
-                raise HTTPException(
-                    status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
-                    detail="Error al descargar el archivo desde el servidor FTP."
-                )
-            finally:
-                # Always return to the initial directory
-                try:
-                    ftp_server.cwd('/')
-                except Exception as e:
-                    print(f"Error regresando al directorio inicial: {e}")
-
-        # Return file as a downloadable response
-        return FileResponse(
-            path=temp_file.name, 
-            media_type='application/pdf', 
-            filename=filename,
-            # Optional: add headers for download
-            headers={
-                "Content-Disposition": f"attachment; filename={filename}"
-            }
-        )
 
     except HTTPException as http_exc:
         # Re-raise HTTP exceptions
@@ -765,110 +504,25 @@ async def descargar_planificacion(
 async def get_all_planificaciones(
     profesor_id: int,
     query: int, 
-    mes: str,
-    year: str,
-    session: SessionDep
+    session: AsyncSessionDep,
+    pagina: PaginacionDep,
+    mes: Optional[str] = None,
+    year: Optional[str] = None,
+    desde: Optional[date] = None,
+    hasta: Optional[date] = None,
 ) -> Any:
+    filtros_fecha = filtro_fecha_subida(Planificaciones.fecha_subida, mes, year, desde, hasta)
     try:
-        # Realizamos el join entre todas las tablas necesarias
-        query_planificaciones = (
-            select(
-                Planificaciones,
-                Planificacion_Profesor.id,
-                Planificacion_Profesor.planificacion_id,
-                Profesores.nombre.label("profesor_nombre"),
-                Asignaturas.nombre.label("asignatura_nombre"),
-                Asignaturas.curso.label("curso_nombre"),
-
-                Periodo.nombre.label("periodo_nombre"),
-                Planificacion_Profesor.profesor_aprobador_id,
-                Planificacion_Profesor.profesor_revisor_id,
-                Areas.id.label("area_id"),
-                Areas.nombre.label("area_nombre"),
-                Areas.codigo.label("area_codigo"),
-                Planificacion_Profesor.fecha_de_actualizacion,
-                Planificacion_Profesor.estado,
-                Planificacion_Profesor.archivo,
-            )
-            .join(Profesores, Planificaciones.profesor_id == Profesores.id)
-            .join(Asignaturas, Planificaciones.asignaturas_id == Asignaturas.id)
-            .join(Periodo, Planificaciones.periodo_id == Periodo.id)
-            .join(Areas, Asignaturas.area_id == Areas.id)
-            .join(
-                Planificacion_Profesor,
-                Planificaciones.id == Planificacion_Profesor.planificacion_id
-            )
-            .join(
-                areas_profesor,
-                Planificacion_Profesor.profesor_revisor_id == areas_profesor.id,
-                isouter=True
-            )
+        consulta = (
+            consulta_planificaciones()
             .where(Planificaciones.profesor_id == profesor_id)  # Filtrar por el ID del profesor asignado
             .where(Planificaciones.periodo_id == query)
-            .where(cast(extract('month', Planificaciones.fecha_subida), String).ilike(f'%{mes}%'))
-            .where(cast(extract('year', Planificaciones.fecha_subida), String).ilike(f'%{year}%'))
-     
+            .where(*filtros_fecha)
         )
-        
-        # Ejecutar la consulta y obtener los resultados
-        planificaciones = session.exec(query_planificaciones).all()
-
-        # Obtener los IDs de profesores aprobadores y revisores
-        profesor_aprobador_ids = [p[7] for p in planificaciones if p[7] is not None]
-        profesor_revisor_ids = [p[8] for p in planificaciones if p[8] is not None]
-
-        # Consultar nombres de profesores aprobadores
-        aprobadores = {}
-        if profesor_aprobador_ids:
-            query_aprobadores = select(Profesores).where(Profesores.id.in_(profesor_aprobador_ids))
-            aprobadores = {p.id: p.nombre for p in session.exec(query_aprobadores)}
-
-        # Consultar nombres de profesores revisores a través de Areas_Profesor
-        revisores = {}
-        if profesor_revisor_ids:
-            query_revisores = (
-                select(areas_profesor, Profesores.nombre)
-                .join(Profesores, areas_profesor.profesor_id == Profesores.id)
-                .where(areas_profesor.id.in_(profesor_revisor_ids))
-            )
-            revisores = {ap.id: nombre for ap, nombre in session.exec(query_revisores)}
-
-        # Crear una lista de resultados con los campos deseados
-        result = [
-            {
-                "titulo": planificacion.titulo,
-                "descripcion": planificacion.descripcion,
-                "fecha_subida": planificacion.fecha_subida,
-                "profesor_id": planificacion.profesor_id,
-                "asignaturas_id": planificacion.asignaturas_id,
-                "periodo_id": planificacion.periodo_id,
-                "id": id,
-                "id_planificacion": planificacion_id,
-                "profesor_nombre": profesor_nombre,
-                "periodo_nombre": periodo_nombre,
-                "asignatura_nombre": asignatura_nombre,
-                "curso_nombre": curso_nombre,
-                "area_id": area_id,
-                "area_nombre": area_nombre,
-                "area_codigo": area_codigo,
-                "profesor_aprobador_id": profesor_aprobador_id,
-                "profesor_aprobador_nombre": aprobadores.get(profesor_aprobador_id) if profesor_aprobador_id else None,
-                "profesor_revisor_id": profesor_revisor_id,
-                "profesor_revisor_nombre": revisores.get(profesor_revisor_id) if profesor_revisor_id else None,
-                "fecha_de_actualizacion": fecha_de_actualizacion,
-                "estado": estado,
-                "archivo": archivo,
-            }
-            for (
-                planificacion, id, planificacion_id, profesor_nombre, asignatura_nombre,curso_nombre, periodo_nombre,
-                profesor_aprobador_id, profesor_revisor_id,
-                area_id, area_nombre, area_codigo,
-                fecha_de_actualizacion, estado, archivo
-            ) in planificaciones
-        ]
-        
-        return result
+        return respuesta_modelos(await listar_pagina(session, consulta, pagina), Planificacion_Listado_Dto, pagina.response)
 
+    except HTTPException:
+        raise
     except Exception as e:
         print(f"Error: {str(e)}")
         raise HTTPException(
@@ -914,25 +568,19 @@ async def comentar_planificacion(
             fecha_enviado=datetime.now(pytz.timezone('America/Guayaquil'))
         )
 
+        # Encolar el correo electrónico, se guarda junto con el comentario
+        encolar_email(
+            session,
+            fechtprofesor.email,
+            f"Comentario de Planificación: {comentario.nombre_planificacion}_{comentario.periodo_nombre}",
+            text=comentario.comentario  # El comentario como cuerpo del correo
+        )
+
         # Guardar el comentario en la base de datos
         session.add(comentario_data)
         session.commit()
         session.refresh(comentario_data)
 
-        # Enviar el correo electrónico
-        try:
-            sender_email(
-                fechtprofesor.email,  # Asegúrate de que esta propiedad exista
-                f"Comentario de Planificación: {comentario.nombre_planificacion}_{comentario.periodo_nombre}",
-                comentario.comentario  # El comentario como cuerpo del correo
-            )
-        except Exception as e:
-            print(f"Error al enviar el email: {e}")
-            raise HTTPException(
-                status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
-                detail="Fallo al enviar el email"
-            )
-
         return comentario_data
         
     except Exception as e:
@@ -949,7 +597,7 @@ async def comentar_planificacion(
 @router.get("/comentarios/", response_description="Listar todos los comentarios de planificaciones", response_model=List[Any])
 async def get_all_comentarios_planificacion(
     planificacion_profesor_id: int,
-    session: SessionDep
+    session: AsyncSessionDep
 ):
     
     print(planificacion_profesor_id)
@@ -962,7 +610,7 @@ async def get_all_comentarios_planificacion(
             )
         
         # Ejecutar la consulta y obtener los resultados
-        comentarios = session.exec(query).all()
+        comentarios = (await session.exec(query)).all()
         
 
         # Obtener los IDs de profesores 
@@ -970,7 +618,7 @@ async def get_all_comentarios_planificacion(
         
         # Consultar nombres de profesores
         nombres_profesores = select(Profesores).where(Profesores.id.in_(profesor_ids))
-        nombres_profesores = session.exec(nombres_profesores).all()
+        nombres_profesores = (await session.exec(nombres_profesores)).all()
         
         nombres_profesores = {p.id: p.nombre for p in nombres_profesores}
         
@@ -1013,7 +661,7 @@ async def get_all_comentarios_planificacion(
                 
 
 @router.delete("/delete/{planificacion_id}", response_description="Eliminar una planificación", status_code=status.HTTP_204_NO_CONTENT)
-async def delete_planificacion(planificacion_id: int, session: SessionDep, request: Request) :
+async def delete_planificacion(planificacion_id: int, session: SessionDep, storage: StorageDep, cache: CachePDFDep) :
     try:
         # Verificar si la planificación existe
         existing_planificacion = session.exec(
@@ -1032,21 +680,22 @@ async def delete_planificacion(planificacion_id: int, session: SessionDep, reque
         ).one_or_none()
         
         if planificacion_profesor:
-            ftp_server: Optional[ftplib.FTP] = request.app.ftp
-            if ftp_server:
-                
-                if planificacion_profesor.archivo is not None:
-                                        
-                    try:
-                        ftp_server.delete(planificacion_profesor.archivo)
-                    except Exception as e:
-                        print(f"Error al eliminar archivo del FTP: {e}")
+            if planificacion_profesor.archivo is not None:
+                                    
+                try:
+                    await cache.invalidar(planificacion_profesor.archivo)
+                    await storage.delete(planificacion_profesor.archivo)
+                except Exception as e:
+                    print(f"Error al eliminar archivo del FTP: {e}")
             
             # Eliminar archivo de la base de datos
           
 
         # Eliminar la planificación de la base de datos
+        session.refresh(existing_planificacion, with_for_update=True)
+        conteo_anterior = conteos(session, Planificaciones.id == planificacion_id)
         session.delete(existing_planificacion)
+        registrar_cambios(session, conteo_anterior, Counter())
         session.commit()
 
         return {"message": "Planificación eliminada correctamente"}
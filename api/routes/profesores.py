@@ -10,11 +10,14 @@ from sqlalchemy.exc import IntegrityError, SQLAlchemyError
 from sqlmodel import select , func
 from core.config import settings
 
-from core.security import get_password_hash
+from core.security import get_password_hash_async
 from model import Profesores, Roles, Total_profesores
 router = APIRouter()
 from PIL import Image
-from api.deps import  SessionDep
+from api.deps import  PaginacionDep, SessionDep
+from api.routes.auth import invalidar_usuario
+from api.busqueda import coincide, relevancia
+from api.respuestas import respuesta_modelos
 
 
 
@@ -44,7 +47,7 @@ from api.deps import  SessionDep
 async def create_professor(profesor: Profesores, session: SessionDep) -> Any:
     try:
         profesor_data = jsonable_encoder(profesor)
-        password_hash = get_password_hash(profesor_data["password"])
+        password_hash = await get_password_hash_async(profesor_data["password"])
         profesor_data["password"] = password_hash
         new_profesor = Profesores(**profesor_data)
     
@@ -81,10 +84,13 @@ async def create_professor(profesor: Profesores, session: SessionDep) -> Any:
 
 # Obtener todos los profesores
 @router.get("/", response_description="Listar todos los profesores", response_model=List[Profesores])
-async def get_professors(session: SessionDep) -> Any:
+async def get_professors(session: SessionDep, pagina: PaginacionDep) -> Any:
     statement = select(Profesores)
-    result = session.exec(statement).all()
-    return result
+    if pagina.total:
+        pagina.registrar_total(session.exec(pagina.contar(statement)).one())
+    statement = pagina.ordenar(statement, Profesores.id)
+    result = pagina.recortar(session.exec(statement).all())
+    return respuesta_modelos(result, Profesores, pagina.response)
 
 # Obtener un profesor específico por ID
 @router.get("/{profesor_id}", response_description="Obtener un profesor por ID")
@@ -123,7 +129,7 @@ async def update_professor(profesor_id: int, profesor: ProfesorUpdate, session:
 
     # Si no se proporciona una contraseña, no la actualizamos
     if "password" in updated_profesor_data and updated_profesor_data["password"] is not None:
-        updated_profesor_data["password"] = get_password_hash(updated_profesor_data["password"])
+        updated_profesor_data["password"] = await get_password_hash_async(updated_profesor_data["password"])
     else:
         updated_profesor_data.pop("password", None)  # Elimina el campo si no se proporciona
 
@@ -133,6 +139,7 @@ async def update_professor(profesor_id: int, profesor: ProfesorUpdate, session:
     session.add(existing_profesor)
     session.commit()
     session.refresh(existing_profesor)
+    invalidar_usuario(id=profesor_id)
     return existing_profesor
 
 # Eliminar un profesor
@@ -146,6 +153,7 @@ async def delete_professor(profesor_id: int, session: SessionDep) -> Any:
     
     session.delete(profesor)
     session.commit()
+    invalidar_usuario(id=profesor_id)
     return Response(status_code=status.HTTP_204_NO_CONTENT)
 
 
@@ -176,9 +184,10 @@ async def search_professor(
     
     try:
         # Construir la consulta para buscar por nombre o cédula
+        # Ordenada por relevancia, sin distinguir acentos
         statement = select(Profesores).where(
-            (Profesores.nombre.ilike(f"%{query}%")) | (Profesores.cedula.ilike(f"%{query}%"))
-        ).limit(7)
+            coincide(query, Profesores.nombre, Profesores.cedula)
+        ).order_by(relevancia(query, Profesores.nombre, Profesores.cedula).desc(), Profesores.nombre).limit(7)
         
         # Ejecutar la consulta
         result = session.exec(statement).all()
@@ -208,8 +217,10 @@ async def search_professor(
     try:
         # Construir la consulta para buscar por nombre o cédula
         statement = select(Profesores).where(
-            (Profesores.nombre.ilike(f"%{query}%")) | (Profesores.cedula.ilike(f"%{query}%"))
-        ).where(Profesores.rol == "Director de area").limit(7)
+            coincide(query, Profesores.nombre, Profesores.cedula)
+        ).where(Profesores.rol == "Director de area").order_by(
+            relevancia(query, Profesores.nombre, Profesores.cedula).desc(), Profesores.nombre
+        ).limit(7)
         
         # Ejecutar la consulta
         result = session.exec(statement).all()
@@ -0,0 +1,22 @@
+from fastapi import APIRouter, Request
+from typing import Any
+
+from core.db import estadisticas_pools
+
+router = APIRouter()
+
+
+@router.get("/pool", response_description="Estado de los pools de conexiones")
+async def get_estado_pools(request: Request) -> Any:
+    """
+    Devuelve el estado de los pools de base de datos (conexiones en uso,
+    overflow, tiempos de espera y veces que se agotaron) y del pool FTP.
+    """
+    ftp_pool = request.app.ftp_pool
+    return {
+        "db": estadisticas_pools(),
+        "ftp": {
+            "tamano_max": ftp_pool.max_size,
+            "abiertas": ftp_pool.total,
+        },
+    }
@@ -0,0 +1,97 @@
+import hashlib
+from typing import AsyncIterator
+
+from fastapi import HTTPException, UploadFile, status
+
+from core.config import settings
+from core.storage import CHUNK_SIZE
+
+# Cabecera de todo archivo PDF; el estándar permite que aparezca dentro
+# del primer kilobyte
+PDF_MAGIC = b"%PDF-"
+PDF_MAGIC_LIMITE = 1024
+
+
+class SubidaPDF:
+    """
+    Lee un UploadFile por bloques para enviarlo al almacenamiento sin
+    cargarlo completo en memoria.
+
+    Mientras se lee se comprueba el tamaño máximo y se calcula el SHA-256
+    del contenido, disponible en `sha256` al terminar. `validar()` revisa la
+    cabecera PDF antes de tocar el almacenamiento, para rechazar archivos
+    inválidos sin borrar ni subir nada.
+
+    Args:
+        archivo (UploadFile): Archivo recibido en la petición
+        max_bytes (int): Tamaño máximo permitido
+        chunk_size (int): Tamaño de cada bloque leído
+    """
+
+    def __init__(
+        self,
+        archivo: UploadFile,
+        max_bytes: int = settings.MAX_PDF_SIZE,
+        chunk_size: int = CHUNK_SIZE,
+    ) -> None:
+        self.archivo = archivo
+        self.max_bytes = max_bytes
+        self.chunk_size = chunk_size
+        self.tamano = 0
+        self._hash = hashlib.sha256()
+        self._inicio = b""
+        self._validada = False
+
+    @property
+    def sha256(self) -> str:
+        return self._hash.hexdigest()
+
+    async def validar(self) -> None:
+        """
+        Comprueba el tamaño declarado y la cabecera PDF.
+
+        Raises:
+            HTTPException: 413 si el archivo es demasiado grande,
+                415 si no es un PDF
+        """
+        if self._validada:
+            return
+        if self.archivo.size is not None and self.archivo.size > self.max_bytes:
+            self._demasiado_grande()
+
+        await self.archivo.seek(0)
+        inicio = b""
+        while len(inicio) < PDF_MAGIC_LIMITE:
+            chunk = await self._leer()
+            if not chunk:
+                break
+            inicio += chunk
+        if PDF_MAGIC not in inicio[:PDF_MAGIC_LIMITE]:
+            raise HTTPException(
+                status_code=status.HTTP_415_UNSUPPORTED_MEDIA_TYPE,
+                detail="El archivo no es un PDF válido."
+            )
+
+        self._inicio = inicio
+        self._validada = True
+
+    async def __aiter__(self) -> AsyncIterator[bytes]:
+        await self.validar()
+        chunk, self._inicio = self._inicio, b""
+        while chunk:
+            yield chunk
+            chunk = await self._leer()
+
+    async def _leer(self) -> bytes:
+        chunk = await self.archivo.read(self.chunk_size)
+        self.tamano += len(chunk)
+        if self.tamano > self.max_bytes:
+            self._demasiado_grande()
+        self._hash.update(chunk)
+        return chunk
+
+    def _demasiado_grande(self) -> None:
+        raise HTTPException(
+            status_code=status.HTTP_413_REQUEST_ENTITY_TOO_LARGE,
+            detail=f"El archivo supera el tamaño máximo de {self.max_bytes // (1024 * 1024)} MB."
+        )
@@ -0,0 +1,236 @@
+import asyncio
+import hashlib
+import json
+import os
+import time
+from dataclasses import dataclass
+from pathlib import Path
+from typing import Optional
+
+import aiofiles
+from anyio import to_thread
+
+from core.storage import LocalStorage, Storage
+
+# Una carga que empezó hace más que esto ya terminó o se abandonó; las
+# marcas de invalidación más antiguas se pueden borrar
+DURACION_MAXIMA_CARGA = 3600  # segundos
+
+
+@dataclass
+class EntradaCache:
+    """
+    Archivo presente en la caché local.
+
+    `etag` es el SHA-256 del contenido, así que dos versiones distintas de
+    un mismo archivo nunca comparten etag.
+    """
+    ruta: str
+    etag: str
+    tamano: int
+
+
+class CachePDF:
+    """
+    Caché LRU en disco para los PDF descargados del almacenamiento.
+
+    Cada ruta se guarda como dos archivos dentro de `directorio`, nombrados
+    con el SHA-256 de la ruta: `<clave>.pdf` con el contenido y
+    `<clave>.json` con la ruta, el etag y el tamaño. El índice vive en disco
+    y no en memoria, de modo que varios workers comparten la misma caché y
+    una invalidación en uno se ve en todos. Cada invalidación deja además
+    `<clave>.gen` con su instante, para que una descarga que otro worker
+    empezó antes no registre la versión anterior. La fecha de modificación del
+    `.json` se actualiza en cada acierto y se usa como orden LRU cuando se
+    supera `max_bytes`.
+
+    Args:
+        directorio (str): Carpeta donde se guardan los archivos
+        max_bytes (int): Tamaño máximo total de la caché; 0 la deshabilita
+    """
+
+    def __init__(self, directorio: str, max_bytes: int) -> None:
+        self.directorio = Path(directorio).resolve()
+        self.max_bytes = max_bytes
+        self.archivos = LocalStorage(str(self.directorio))
+        self._bloqueos: dict[str, asyncio.Lock] = {}
+        # Tareas que usan o esperan cada bloqueo; se descarta al llegar a 0
+        self._usos_bloqueo: dict[str, int] = {}
+        self.directorio.mkdir(parents=True, exist_ok=True)
+
+    @property
+    def habilitada(self) -> bool:
+        return self.max_bytes > 0
+
+    @staticmethod
+    def _clave(ruta: str) -> str:
+        return hashlib.sha256(ruta.encode("utf-8")).hexdigest()
+
+    def nombre_archivo(self, ruta: str) -> str:
+        """Nombre del contenido cacheado dentro de `archivos`."""
+        return f"{self._clave(ruta)}.pdf"
+
+    def _indice(self, ruta: str) -> Path:
+        return self.directorio / f"{self._clave(ruta)}.json"
+
+    def _marca(self, ruta: str) -> Path:
+        return self.directorio / f"{self._clave(ruta)}.gen"
+
+    def _ultima_invalidacion(self, ruta: str) -> int:
+        """Instante (time_ns) de la última invalidación de `ruta`, o 0."""
+        try:
+            return int(self._marca(ruta).read_text())
+        except (OSError, ValueError):
+            return 0
+
+    def _leer(self, ruta: str) -> Optional[EntradaCache]:
+        indice = self._indice(ruta)
+        try:
+            datos = json.loads(indice.read_text())
+            entrada = EntradaCache(**datos)
+            contenido = self.directorio / self.nombre_archivo(ruta)
+            if entrada.ruta != ruta or contenido.stat().st_size != entrada.tamano:
+                return None
+            os.utime(indice)
+        except (OSError, ValueError, TypeError):
+            return None
+        return entrada
+
+    async def obtener(self, ruta: str) -> Optional[EntradaCache]:
+        """Devuelve la entrada de `ruta` si está en caché."""
+        return await to_thread.run_sync(self._leer, ruta)
+
+    async def obtener_o_cargar(self, storage: Storage, ruta: str) -> Optional[EntradaCache]:
+        """
+        Devuelve la entrada de `ruta`, descargándola del almacenamiento si no
+        está en caché. Las descargas simultáneas del mismo archivo esperan a
+        la primera en lugar de ir todas al servidor. Devuelve None si el
+        archivo es más grande que la caché completa o si se reemplazó
+        mientras se descargaba; en ese caso se lee del almacenamiento.
+
+        Raises:
+            FileNotFoundError: Si el archivo no existe en el almacenamiento
+        """
+        entrada = await self.obtener(ruta)
+        if entrada is not None:
+            return entrada
+
+        bloqueo = self._bloqueos.setdefault(ruta, asyncio.Lock())
+        self._usos_bloqueo[ruta] = self._usos_bloqueo.get(ruta, 0) + 1
+        try:
+            async with bloqueo:
+                entrada = await self.obtener(ruta)
+                if entrada is None:
+                    entrada = await self._cargar(storage, ruta)
+                return entrada
+        finally:
+            # Mientras otra tarea espere el bloqueo debe seguir en el dict, si
+            # no una petición nueva tomaría otro y repetiría la descarga
+            self._usos_bloqueo[ruta] -= 1
+            if not self._usos_bloqueo[ruta]:
+                del self._usos_bloqueo[ruta]
+                self._bloqueos.pop(ruta, None)
+
+    async def _cargar(self, storage: Storage, ruta: str) -> Optional[EntradaCache]:
+        inicio = time.time_ns()
+        tamano = await storage.size(ruta)
+        if tamano > self.max_bytes:
+            return None
+
+        clave = self._clave(ruta)
+        temporal = self.directorio / f"{clave}.{os.getpid()}.tmp"
+        sha256 = hashlib.sha256()
+        try:
+            async with aiofiles.open(temporal, "wb") as archivo:
+                async for chunk in storage.stream(ruta):
+                    sha256.update(chunk)
+                    await archivo.write(chunk)
+            entrada = EntradaCache(ruta=ruta, etag=sha256.hexdigest(), tamano=temporal.stat().st_size)
+            if not await to_thread.run_sync(self._registrar, entrada, temporal, inicio):
+                # El archivo se reemplazó mientras se descargaba
+                return None
+        finally:
+            temporal.unlink(missing_ok=True)
+
+        await to_thread.run_sync(self._recortar)
+        return entrada
+
+    def _registrar(self, entrada: EntradaCache, temporal: Path, inicio: int) -> bool:
+        """
+        Registra la descarga que empezó en `inicio` (time_ns), salvo que la
+        ruta se haya invalidado desde entonces en cualquier worker.
+
+        Returns:
+            bool: False si no se registró por una invalidación posterior
+        """
+        if self._ultima_invalidacion(entrada.ruta) >= inicio:
+            return False
+        clave = self._clave(entrada.ruta)
+        os.replace(temporal, self.directorio / f"{clave}.pdf")
+        indice_temporal = self.directorio / f"{clave}.{os.getpid()}.json.tmp"
+        indice_temporal.write_text(json.dumps(entrada.__dict__))
+        os.replace(indice_temporal, self._indice(entrada.ruta))
+        # Una invalidación que escribió su marca durante el registro pudo
+        # borrar los archivos antes de que se reemplazaran; se deshace el
+        # registro. Si la marca llega después, esa invalidación lo borra.
+        if self._ultima_invalidacion(entrada.ruta) >= inicio:
+            self._borrar(entrada.ruta)
+            return False
+        return True
+
+    def _recortar(self) -> None:
+        """Elimina las entradas menos usadas hasta respetar `max_bytes`."""
+        entradas = []
+        total = 0
+        for indice in self.directorio.glob("*.json"):
+            contenido = indice.with_suffix(".pdf")
+            try:
+                tamano = contenido.stat().st_size
+                usado = indice.stat().st_mtime
+            except OSError:
+                continue
+            entradas.append((usado, indice, contenido, tamano))
+            total += tamano
+
+        for _, indice, contenido, tamano in sorted(entradas):
+            if total <= self.max_bytes:
+                break
+            indice.unlink(missing_ok=True)
+            contenido.unlink(missing_ok=True)
+            total -= tamano
+
+        limite = time.time() - DURACION_MAXIMA_CARGA
+        for marca in self.directorio.glob("*.gen"):
+            try:
+                if marca.stat().st_mtime < limite:
+                    marca.unlink()
+            except OSError:
+                pass
+
+    def _borrar(self, ruta: str) -> None:
+        # Primero el índice: sin él la entrada ya no se considera válida
+        self._indice(ruta).unlink(missing_ok=True)
+        (self.directorio / self.nombre_archivo(ruta)).unlink(missing_ok=True)
+
+    def _invalidar(self, ruta: str) -> None:
+        # La marca se escribe antes de borrar, así una carga en curso en
+        # otro worker la ve al registrar (ver `_registrar`)
+        marca_temporal = self.directorio / f"{self._clave(ruta)}.{os.getpid()}.gen.tmp"
+        marca_temporal.write_text(str(time.time_ns()))
+        os.replace(marca_temporal, self._marca(ruta))
+        self._borrar(ruta)
+
+    async def invalidar(self, ruta: Optional[str]) -> None:
+        """Quita `ruta` de la caché tras reemplazar o eliminar el archivo."""
+        if ruta:
+            await to_thread.run_sync(self._invalidar, ruta)
+
+    def limpiar_temporales(self, antiguedad: float = 3600) -> None:
+        """Borra archivos temporales de cargas interrumpidas."""
+        limite = time.time() - antiguedad
+        for temporal in self.directorio.glob("*.tmp"):
+            try:
+                if temporal.stat().st_mtime < limite:
+                    temporal.unlink()
+            except OSError:
+                pass
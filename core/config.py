@@ -1,5 +1,6 @@
 from pydantic_settings import BaseSettings, SettingsConfigDict
 from pydantic import PostgresDsn, computed_field, model_validator
+from typing import Optional
 from typing_extensions import Self
 
 
@@ -22,22 +23,85 @@ class Settings(BaseSettings):
     def SQLALCHEMY_DATABASE_URI(self) -> PostgresDsn:
         return f"postgresql+psycopg2://{self.POSTGRES_USER}:{self.POSTGRES_PASSWORD}@{self.POSTGRES_SERVER}:{self.POSTGRES_PORT}/{self.POSTGRES_DB}"
 
+    @computed_field
+    @property
+    def SQLALCHEMY_ASYNC_DATABASE_URI(self) -> PostgresDsn:
+        return f"postgresql+asyncpg://{self.POSTGRES_USER}:{self.POSTGRES_PASSWORD}@{self.POSTGRES_SERVER}:{self.POSTGRES_PORT}/{self.POSTGRES_DB}"
+
+    # Pool de conexiones (se aplica a cada motor: síncrono y asíncrono)
+    DB_POOL_SIZE: int = 10
+    DB_MAX_OVERFLOW: int = 10
+    DB_POOL_TIMEOUT: int = 30  # segundos esperando una conexión libre
+    DB_POOL_RECYCLE: int = 1800  # segundos antes de reabrir una conexión
+    DB_POOL_PRE_PING: bool = True
+    DB_STATEMENT_TIMEOUT: int = 30000  # milisegundos, 0 sin límite
+
     # Configuración de correos
     SMTP_HOST: str
     SMTP_PORT: int = 587
     SMTP_PASSWORD: str
     EMAILS_FROM_EMAIL: str
 
+    # Cola de correos (email_outbox); Gmail limita los envíos por día
+    EMAIL_OUTBOX_INTERVAL: int = 60  # segundos entre ejecuciones del worker
+    EMAIL_POR_MINUTO: int = 20
+    EMAIL_LIMITE_DIARIO: int = 450
+    EMAIL_MAX_INTENTOS: int = 5
+    EMAIL_REINTENTO_BASE: int = 60  # segundos, se duplica en cada intento
+    RECORDATORIOS_INTERVAL: int = 15  # minutos entre revisiones de fechas límite
+
+    # Plantillas de correo: recargar al modificarlas (solo en desarrollo) y
+    # carpeta de la caché de bytecode de Jinja ("" la deshabilita)
+    EMAIL_TEMPLATES_AUTO_RELOAD: bool = False
+    EMAIL_TEMPLATES_CACHE_DIR: str = "./cache/jinja"
+
     # Otros parámetros
     SECRET_KEY: str
     ALGORITHM: str = "HS256"
     PROJECT_NAME: str
     EMAIL_RESET_TOKEN_EXPIRE_HOURS: int = 1
 
+    # Caché de tokens validados en get_current_user
+    AUTH_CACHE_TTL: int = 60  # segundos
+    AUTH_CACHE_MAX_SIZE: int = 1024
+
+    # Costo de bcrypt (log2 de iteraciones) e hilos dedicados a calcular y
+    # verificar contraseñas
+    BCRYPT_ROUNDS: int = 12
+    PASSWORD_HASH_WORKERS: int = 4
+
+    # Paginación de los listados (cantidad de filas por página cuando se
+    # pide con cursor y sin limit, y máximo de limit)
+    PAGINACION_LIMITE: int = 100
+    PAGINACION_LIMITE_MAX: int = 500
+
+    # Exportaciones a Excel/CSV: filas por lote leídas de la base de datos y
+    # bytes del archivo Excel que se mantienen en memoria antes de usar disco
+    EXPORTACION_LOTE: int = 1000
+    EXPORTACION_MEMORIA_MAX: int = 8 * 1024 * 1024
+
+    # Token que Prometheus envía como "Authorization: Bearer" al leer
+    # /metrics; sin configurar el endpoint está deshabilitado
+    METRICAS_TOKEN: Optional[str] = None
+
     # FTP Configuración
     FTP_USER: str
     FTP_PASSWORD: str
     FTP_SERVER: str
+    FTP_PORT: int = 21
+    FTP_POOL_MAX_SIZE: int = 5
+    FTP_POOL_IDLE_TIMEOUT: int = 300  # segundos
+    FTP_POOL_CHECKOUT_TIMEOUT: int = 30  # segundos
+    FTP_KEEPALIVE_INTERVAL: int = 60  # segundos
+
+    # Almacenamiento de archivos: "ftp" o "local"
+    STORAGE_BACKEND: str = "ftp"
+    LOCAL_STORAGE_DIR: str = "./storage"
+    MAX_PDF_SIZE: int = 50 * 1024 * 1024  # bytes
+
+    # Caché local de PDF descargados (0 la deshabilita)
+    PDF_CACHE_DIR: str = "./cache/pdf"
+    PDF_CACHE_MAX_BYTES: int = 512 * 1024 * 1024
     BACKEND_URL:str
 
     @model_validator(mode="after")
@@ -0,0 +1,242 @@
+import time
+from datetime import datetime, timedelta
+from typing import Any, Iterator, Optional, Sequence
+
+import emails  # type: ignore
+from emails.backend.smtp import SMTPBackend  # type: ignore
+import pytz
+from sqlmodel import Session, func, or_, select, update
+
+from core.config import settings
+from core.db import engine
+from core.metricas import medir_externo
+from model import EmailOutbox
+
+# Clave de pg_advisory_xact_lock que serializa entre workers el cálculo del
+# cupo diario y la reserva de correos
+BLOQUEO_OUTBOX = 7_150_001
+# Un correo reservado ('enviando') que no se marcó como enviado o fallido
+# después del intervalo más este margen se considera abandonado (el worker
+# se detuvo) y se vuelve a reservar. El margen cubre el envío del último
+# correo del lote, que puede empezar casi al final del intervalo.
+MARGEN_RESERVA = 120  # segundos
+
+
+def opciones_smtp() -> dict[str, Any]:
+    # Configuración específica para Gmail
+    return {
+        "host": settings.SMTP_HOST,  # Servidor SMTP de Gmail
+        "port": settings.SMTP_PORT,  # Puerto para TLS
+        "tls": True,  # Habilitar TLS
+        "user": settings.EMAILS_FROM_EMAIL,  # Tu dirección de Gmail
+        "password": settings.SMTP_PASSWORD,  # Tu contraseña de aplicación
+        "timeout": 10
+    }
+
+
+def crear_mensaje(subject: str, html_content: Optional[str] = None, text: Optional[str] = None) -> emails.Message:
+    return emails.Message(
+        subject=subject,
+        html=html_content,
+        text=text,
+        mail_from=('no-reply', settings.EMAILS_FROM_EMAIL),
+    )
+
+
+def encolar_email(
+    session: Session,
+    email_to: str,
+    subject: str,
+    html_content: Optional[str] = None,
+    text: Optional[str] = None,
+) -> EmailOutbox:
+    """
+    Agrega un correo a email_outbox en la sesión recibida. El correo se
+    guarda con el resto de cambios al hacer `session.commit()`, así que si la
+    operación falla y se revierte tampoco se envía el aviso.
+    """
+    correo = EmailOutbox(destinatario=email_to, asunto=subject, html=html_content, texto=text)
+    session.add(correo)
+    return correo
+
+
+def enviar_lote(
+    correos: Sequence[EmailOutbox], intervalo: float = 0, hasta: Optional[float] = None
+) -> Iterator[tuple[EmailOutbox, Optional[str]]]:
+    """
+    Envía `correos` por una sola conexión SMTP, empezando un envío cada
+    `intervalo` segundos. A medida que se envía cada correo entrega
+    `(correo, error)`, con error None si se envió. Si se indica `hasta`
+    (reloj de time.monotonic) no empieza envíos después de ese instante y
+    los correos restantes no se entregan.
+    """
+    inicio = time.monotonic()
+    with SMTPBackend(**opciones_smtp()) as smtp:
+        for i, correo in enumerate(correos):
+            # El ritmo se mide entre inicios de envío, así el tiempo de cada
+            # envío no se suma al intervalo
+            espera = inicio + i * intervalo - time.monotonic()
+            if hasta is not None and time.monotonic() + max(espera, 0) >= hasta:
+                return
+            if espera > 0:
+                time.sleep(espera)
+            try:
+                mensaje = crear_mensaje(correo.asunto, correo.html, correo.texto)
+                # Se mide cada envío y no el lote, que incluye las esperas;
+                # la conexión se abre en el primero y se mide con él
+                with medir_externo("smtp"):
+                    response = mensaje.send(to=correo.destinatario, smtp=smtp)
+            except Exception as e:
+                yield correo, str(e) or type(e).__name__
+                continue
+            if response.status_code != 250:
+                # Sin status_code el error fue de conexión, no del servidor
+                yield correo, f"{response.status_code}: {response.error}" if response.status_code else str(response.error)
+            else:
+                yield correo, None
+
+
+def reservar_lote() -> list[EmailOutbox]:
+    """
+    Reserva los correos a enviar en esta ejecución: los marca 'enviando'
+    con `proximo_intento` como vencimiento de la reserva y confirma en
+    seguida, de modo que el envío ocurre fuera de cualquier transacción.
+
+    El cupo diario y la reserva se calculan bajo pg_advisory_xact_lock, así
+    dos workers no reservan a la vez contando el mismo cupo libre. Los
+    correos reservados por otra ejecución y todavía no terminados cuentan
+    para el cupo diario y para el del intervalo, de modo que con varios
+    workers el ritmo total sigue siendo EMAIL_POR_MINUTO. Cada reserva suma un intento, así que un correo que
+    detiene al worker en cada envío termina como 'fallido'.
+    """
+    with Session(engine, expire_on_commit=False) as session:
+        session.exec(select(func.pg_advisory_xact_lock(BLOQUEO_OUTBOX))).one()
+        enviado_24h = EmailOutbox.enviado_en > func.now() - timedelta(days=1)
+        en_curso = (EmailOutbox.estado == "enviando") & (EmailOutbox.proximo_intento > func.now())
+        enviados, reservados = session.exec(
+            select(func.count().filter(enviado_24h), func.count().filter(en_curso))
+            .where(or_(enviado_24h, en_curso))
+        ).one()
+        if enviados + reservados >= settings.EMAIL_LIMITE_DIARIO:
+            print("Límite diario de correos alcanzado, se reintentará más tarde")
+            return []
+        # Un envío empieza cada 60 / EMAIL_POR_MINUTO segundos, así que el
+        # lote ocupa a lo sumo el intervalo hasta la próxima ejecución
+        lote = max(1, settings.EMAIL_POR_MINUTO * settings.EMAIL_OUTBOX_INTERVAL // 60) - reservados
+        lote = min(lote, settings.EMAIL_LIMITE_DIARIO - enviados - reservados)
+        if lote <= 0:
+            return []
+
+        correos = session.exec(
+            select(EmailOutbox)
+            .where(
+                EmailOutbox.estado.in_(("pendiente", "enviando")),
+                EmailOutbox.proximo_intento <= func.now(),
+            )
+            .order_by(EmailOutbox.proximo_intento, EmailOutbox.id)
+            .limit(lote)
+            .with_for_update(skip_locked=True)
+        ).all()
+
+        vence = datetime.now(pytz.utc) + timedelta(seconds=settings.EMAIL_OUTBOX_INTERVAL + MARGEN_RESERVA)
+        for correo in correos:
+            correo.estado = "enviando"
+            correo.intentos += 1
+            correo.proximo_intento = vence
+            session.add(correo)
+        session.commit()
+        return list(correos)
+
+
+def _actualizar_reservado(session: Session, correo: EmailOutbox, **valores: Any) -> None:
+    # La reserva se identifica por su vencimiento: si venció y otro worker
+    # volvió a reservar el correo, este ya no lo modifica
+    resultado = session.exec(
+        update(EmailOutbox)
+        .where(
+            EmailOutbox.id == correo.id,
+            EmailOutbox.estado == "enviando",
+            EmailOutbox.proximo_intento == correo.proximo_intento,
+        )
+        .values(**valores)
+    )
+    if not resultado.rowcount:
+        print(f"La reserva del correo {correo.id} venció antes de registrar el resultado")
+
+
+def registrar_resultado(correo: EmailOutbox, error: Optional[str]) -> None:
+    """
+    Marca un correo reservado como 'enviado', o lo devuelve a 'pendiente'
+    con espera exponencial, o como 'fallido' tras EMAIL_MAX_INTENTOS. Cada
+    correo se confirma por separado, apenas termina su envío.
+    """
+    ahora = datetime.now(pytz.utc)
+    if error is None:
+        valores = {"estado": "enviado", "enviado_en": ahora}
+    elif correo.intentos >= settings.EMAIL_MAX_INTENTOS:
+        valores = {"estado": "fallido", "ultimo_error": error[:1000]}
+    else:
+        espera = settings.EMAIL_REINTENTO_BASE * 2 ** (correo.intentos - 1)
+        valores = {
+            "estado": "pendiente",
+            "ultimo_error": error[:1000],
+            "proximo_intento": ahora + timedelta(seconds=espera),
+        }
+    with Session(engine) as session:
+        _actualizar_reservado(session, correo, **valores)
+        session.commit()
+
+
+def liberar(correos: Sequence[EmailOutbox]) -> None:
+    """Devuelve a 'pendiente' los correos reservados que no se intentaron."""
+    with Session(engine) as session:
+        for correo in correos:
+            _actualizar_reservado(
+                session, correo,
+                estado="pendiente",
+                intentos=EmailOutbox.intentos - 1,
+                proximo_intento=func.now(),
+            )
+        session.commit()
+
+
+def procesar_outbox() -> int:
+    """
+    Envía los correos pendientes de email_outbox. Lo ejecuta el scheduler
+    cada EMAIL_OUTBOX_INTERVAL segundos.
+
+    Los correos se reservan en una transacción corta (`reservar_lote`) y se
+    envían fuera de ella, confirmando el resultado de cada uno apenas se
+    envía; si el worker se detiene a mitad del lote solo quedan sin marcar
+    los correos en curso, que se reintentan al vencer su reserva (pueden
+    llegar dos veces). Por ejecución se envían a lo sumo los correos que
+    caben en el intervalo a EMAIL_POR_MINUTO, sin superar
+    EMAIL_LIMITE_DIARIO en 24 horas; los que no alcanzan a empezar dentro
+    del intervalo se liberan para la próxima ejecución.
+
+    Returns:
+        int: Cantidad de correos enviados
+    """
+    try:
+        correos = reservar_lote()
+        if not correos:
+            return 0
+
+        hasta = time.monotonic() + settings.EMAIL_OUTBOX_INTERVAL
+        enviados = 0
+        intentados = 0
+        try:
+            for correo, error in enviar_lote(correos, intervalo=60 / settings.EMAIL_POR_MINUTO, hasta=hasta):
+                intentados += 1
+                registrar_resultado(correo, error)
+                enviados += error is None
+        finally:
+            if intentados < len(correos):
+                liberar(correos[intentados:])
+
+        print(f"Correos enviados: {enviados} de {len(correos)}")
+        return enviados
+
+    except Exception as e:
+        print(f"Error al procesar la cola de correos: {e}")
+        return 0
@@ -1,15 +1,132 @@
 from datetime import date
+import threading
+import time
 from typing import Optional
 
+from sqlalchemy import exc
+from sqlalchemy.ext.asyncio import create_async_engine
+from sqlalchemy.pool import AsyncAdaptedQueuePool, QueuePool
 from sqlmodel import Field, Session, SQLModel, create_engine, select
 
 from core.config import settings
+from core.metricas import instrumentar_motor
 
 
 
 #print(Settings.POSTGRES_USER)
 
-engine = create_engine(str(settings.SQLALCHEMY_DATABASE_URI))
 
-#SQLModel.metadata.create_all(engine)
+class EstadisticasPool:
+    """
+    Tiempos de checkout acumulados de un pool de conexiones.
+
+    `espera` incluye el tiempo bloqueado esperando una conexión libre y, si
+    el pool abre una conexión de overflow, el tiempo de conectarse.
+    """
+
+    def __init__(self) -> None:
+        self._lock = threading.Lock()
+        self.checkouts = 0
+        self.espera_total = 0.0
+        self.espera_max = 0.0
+        self.agotado = 0
+
+    def registrar(self, espera: float, agotado: bool = False) -> None:
+        with self._lock:
+            self.checkouts += 1
+            self.espera_total += espera
+            self.espera_max = max(self.espera_max, espera)
+            if agotado:
+                self.agotado += 1
+
+    def resumen(self, pool: QueuePool) -> dict:
+        with self._lock:
+            return {
+                "tamano": pool.size(),
+                "abiertas": pool.checkedin() + pool.checkedout(),
+                "en_uso": pool.checkedout(),
+                "libres": pool.checkedin(),
+                # SQLAlchemy usa valores negativos mientras no se llena el pool
+                "overflow": max(pool.overflow(), 0),
+                "checkouts": self.checkouts,
+                "espera_promedio_ms": round(1000 * self.espera_total / self.checkouts, 2) if self.checkouts else 0.0,
+                "espera_max_ms": round(1000 * self.espera_max, 2),
+                "agotado": self.agotado,
+            }
+
+
+class _PoolMedido:
+    """
+    Mezcla para QueuePool que mide cuánto tarda cada checkout y cuántas
+    veces el pool se agota (TimeoutError tras `pool_timeout`).
+    """
+
+    estadisticas: EstadisticasPool
+
+    def _do_get(self):
+        inicio = time.perf_counter()
+        try:
+            conexion = super()._do_get()
+        except exc.TimeoutError:
+            espera = time.perf_counter() - inicio
+            self.estadisticas.registrar(espera, agotado=True)
+            print(f"Pool de conexiones agotado tras {espera:.1f}s: {self.status()}")
+            raise
+        self.estadisticas.registrar(time.perf_counter() - inicio)
+        return conexion
+
+    def recreate(self):
+        # engine.dispose() crea un pool nuevo; las estadísticas se conservan
+        pool = super().recreate()
+        pool.estadisticas = self.estadisticas
+        return pool
+
 
+class QueuePoolMedido(_PoolMedido, QueuePool):
+    pass
+
+
+class AsyncQueuePoolMedido(_PoolMedido, AsyncAdaptedQueuePool):
+    pass
+
+
+def _opciones_pool() -> dict:
+    return {
+        "pool_size": settings.DB_POOL_SIZE,
+        "max_overflow": settings.DB_MAX_OVERFLOW,
+        "pool_timeout": settings.DB_POOL_TIMEOUT,
+        "pool_recycle": settings.DB_POOL_RECYCLE,
+        "pool_pre_ping": settings.DB_POOL_PRE_PING,
+    }
+
+
+engine = create_engine(
+    str(settings.SQLALCHEMY_DATABASE_URI),
+    poolclass=QueuePoolMedido,
+    # statement_timeout en milisegundos; 0 desactiva el límite
+    connect_args={"options": f"-c statement_timeout={settings.DB_STATEMENT_TIMEOUT}"},
+    **_opciones_pool(),
+)
+engine.pool.estadisticas = EstadisticasPool()
+instrumentar_motor(engine)
+
+# Motor asíncrono (asyncpg) para las rutas de lectura, así una consulta lenta
+# no bloquea el event loop mientras espera a la base de datos
+async_engine = create_async_engine(
+    str(settings.SQLALCHEMY_ASYNC_DATABASE_URI),
+    poolclass=AsyncQueuePoolMedido,
+    connect_args={"server_settings": {"statement_timeout": str(settings.DB_STATEMENT_TIMEOUT)}},
+    **_opciones_pool(),
+)
+async_engine.pool.estadisticas = EstadisticasPool()
+instrumentar_motor(async_engine.sync_engine)
+
+
+def estadisticas_pools() -> dict:
+    """Estado actual de los pools de conexiones síncrono y asíncrono."""
+    return {
+        "sync": engine.pool.estadisticas.resumen(engine.pool),
+        "async": async_engine.pool.estadisticas.resumen(async_engine.pool),
+    }
+
+#SQLModel.metadata.create_all(engine)
@@ -0,0 +1,243 @@
+import ftplib
+import threading
+import time
+from collections import deque
+from dataclasses import dataclass, field
+from typing import Callable, Optional
+
+
+@dataclass(eq=False)
+class ConexionFTP:
+    """
+    Conexión FTP administrada por el pool junto con su estado de salud.
+    """
+    ftp: ftplib.FTP
+    creada: float = field(default_factory=time.monotonic)
+    ultimo_uso: float = field(default_factory=time.monotonic)
+    verificada: float = field(default_factory=time.monotonic)
+    sana: bool = True
+
+
+class FTPPool:
+    """
+    Pool acotado de conexiones FTP.
+
+    Cada petición toma una conexión propia (checkout) y la devuelve al
+    terminar (checkin), de modo que varias subidas y descargas pueden
+    ejecutarse en paralelo sin mezclar `cwd`/`STOR`/`RETR` sobre el mismo
+    socket. Las conexiones que superan `idle_timeout` sin uso se cierran.
+    Las conexiones se abren bajo demanda y su salud se comprueba con
+    `keepalive`, que se ejecuta periódicamente fuera del ciclo de peticiones.
+
+    Args:
+        factory: Función que abre una conexión nueva o devuelve None si falla
+        max_size (int): Número máximo de conexiones abiertas a la vez
+        idle_timeout (float): Segundos sin uso antes de cerrar una conexión
+        checkout_timeout (float): Segundos de espera cuando el pool está lleno
+        health_check_after (float): Segundos sin verificar tras los que se
+            comprueba la conexión con NOOP antes de entregarla
+    """
+
+    def __init__(
+        self,
+        factory: Callable[[], Optional[ftplib.FTP]],
+        max_size: int = 5,
+        idle_timeout: float = 300,
+        checkout_timeout: float = 30,
+        health_check_after: float = 30,
+    ) -> None:
+        self.factory = factory
+        self.max_size = max_size
+        self.idle_timeout = idle_timeout
+        self.checkout_timeout = checkout_timeout
+        self.health_check_after = health_check_after
+
+        self._libres: deque[ConexionFTP] = deque()
+        self._en_uso: dict[int, ConexionFTP] = {}
+        self._reservas = 0
+        self._cond = threading.Condition()
+        self._cerrado = False
+
+    @property
+    def total(self) -> int:
+        return len(self._libres) + len(self._en_uso) + self._reservas
+
+    def checkout(self) -> ftplib.FTP:
+        """
+        Entrega una conexión lista para usar.
+
+        Raises:
+            TimeoutError: Si el pool está lleno durante `checkout_timeout`
+            ConnectionError: Si no se puede abrir una conexión nueva
+        """
+        limite = time.monotonic() + self.checkout_timeout
+        while True:
+            conexion = self._tomar(limite)
+            if conexion is None:
+                return self._abrir()
+            if self._verificar(conexion):
+                return conexion.ftp
+            self.discard(conexion.ftp)
+
+    def checkin(self, ftp: ftplib.FTP) -> None:
+        """
+        Devuelve una conexión al pool tras regresar al directorio raíz.
+        Si el servidor no responde la conexión se descarta.
+        """
+        with self._cond:
+            conexion = self._en_uso.pop(id(ftp), None)
+        if conexion is None:
+            return
+
+        try:
+            if ftp.sock is None:
+                conexion.sana = False
+            else:
+                ftp.cwd('/')
+        except ftplib.all_errors:
+            conexion.sana = False
+
+        with self._cond:
+            devolver = conexion.sana and not self._cerrado
+            if devolver:
+                conexion.ultimo_uso = conexion.verificada = time.monotonic()
+                self._libres.append(conexion)
+            self._cond.notify()
+        if not devolver:
+            self._cerrar(conexion)
+
+    def discard(self, ftp: ftplib.FTP) -> None:
+        """
+        Retira una conexión del pool sin devolverla, por ejemplo tras un
+        error de transferencia que la dejó en un estado desconocido.
+        """
+        with self._cond:
+            conexion = self._en_uso.pop(id(ftp), None)
+            self._cond.notify()
+        if conexion is not None:
+            self._cerrar(conexion)
+
+    def keepalive(self) -> None:
+        """
+        Cierra las conexiones inactivas y envía NOOP a las libres restantes
+        para mantenerlas abiertas. Las que no responden se descartan, así la
+        siguiente petición que necesite el servidor abre una nueva.
+        """
+        with self._cond:
+            expiradas = self._expirar_locked()
+            revisar = list(self._libres)
+            self._libres.clear()
+            for conexion in revisar:
+                self._en_uso[id(conexion.ftp)] = conexion
+
+        for conexion in expiradas:
+            self._cerrar(conexion)
+
+        for conexion in revisar:
+            if not self._noop(conexion):
+                self.discard(conexion.ftp)
+                continue
+            with self._cond:
+                self._en_uso.pop(id(conexion.ftp), None)
+                devolver = not self._cerrado
+                if devolver:
+                    conexion.verificada = time.monotonic()
+                    self._libres.appendleft(conexion)
+                self._cond.notify()
+            if not devolver:
+                self._cerrar(conexion)
+
+    def close(self) -> None:
+        """
+        Cierra todas las conexiones libres y marca el pool como cerrado.
+        Las conexiones en uso se cierran cuando se devuelven.
+        """
+        with self._cond:
+            self._cerrado = True
+            libres = list(self._libres)
+            self._libres.clear()
+            self._cond.notify_all()
+        for conexion in libres:
+            self._cerrar(conexion)
+
+    def _tomar(self, limite: float) -> Optional[ConexionFTP]:
+        """
+        Saca una conexión libre del pool. Devuelve None cuando en su lugar
+        se reservó un cupo para abrir una conexión nueva.
+        """
+        expiradas = []
+        try:
+            with self._cond:
+                while True:
+                    if self._cerrado:
+                        raise ConnectionError("El pool FTP está cerrado")
+
+                    expiradas.extend(self._expirar_locked())
+                    if self._libres:
+                        conexion = self._libres.pop()
+                        self._en_uso[id(conexion.ftp)] = conexion
+                        return conexion
+
+                    if self.total < self.max_size:
+                        self._reservas += 1
+                        return None
+
+                    restante = limite - time.monotonic()
+                    if restante <= 0:
+                        raise TimeoutError("No hay conexiones FTP disponibles")
+                    self._cond.wait(restante)
+        finally:
+            for conexion in expiradas:
+                self._cerrar(conexion)
+
+    def _abrir(self) -> ftplib.FTP:
+        ftp = None
+        try:
+            ftp = self.factory()
+        finally:
+            with self._cond:
+                self._reservas -= 1
+                if ftp is not None:
+                    self._en_uso[id(ftp)] = ConexionFTP(ftp=ftp)
+                self._cond.notify()
+
+        if ftp is None:
+            raise ConnectionError("No se pudo establecer la conexión FTP")
+        return ftp
+
+    def _expirar_locked(self) -> list[ConexionFTP]:
+        ahora = time.monotonic()
+        expiradas = [c for c in self._libres if ahora - c.ultimo_uso > self.idle_timeout]
+        if expiradas:
+            self._libres = deque(c for c in self._libres if c not in expiradas)
+        return expiradas
+
+    def _verificar(self, conexion: ConexionFTP) -> bool:
+        if not conexion.sana or conexion.ftp.sock is None:
+            return False
+        if time.monotonic() - conexion.verificada < self.health_check_after:
+            return True
+        return self._noop(conexion)
+
+    @staticmethod
+    def _noop(conexion: ConexionFTP) -> bool:
+        if conexion.ftp.sock is None:
+            conexion.sana = False
+            return False
+        try:
+            conexion.ftp.voidcmd("NOOP")
+        except ftplib.all_errors:
+            conexion.sana = False
+            return False
+        conexion.verificada = time.monotonic()
+        return True
+
+    @staticmethod
+    def _cerrar(conexion: ConexionFTP) -> None:
+        conexion.sana = False
+        if conexion.ftp.sock is None:
+            return
+        try:
+            conexion.ftp.quit()
+        except ftplib.all_errors:
+            conexion.ftp.close()
@@ -0,0 +1,253 @@
+import threading
+import time
+from bisect import bisect_left
+from collections import defaultdict
+from contextlib import contextmanager
+from contextvars import ContextVar
+from dataclasses import dataclass, field
+from typing import Iterator, Optional
+
+from sqlalchemy import event
+from sqlalchemy.engine import Engine
+
+# Límites (segundos) de los buckets del histograma de duración de peticiones
+BUCKETS_DURACION = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0)
+
+# Etiqueta de ruta de lo que ocurre fuera de una petición (tareas del
+# scheduler) y de las peticiones que no coinciden con ninguna ruta
+SIN_PETICION = "sin_peticion"
+SIN_RUTA = "sin_ruta"
+
+
+@dataclass
+class MedicionPeticion:
+    """Tiempos acumulados durante una petición HTTP."""
+
+    consultas: int = 0
+    tiempo_db: float = 0.0
+    # Segundos y cantidad de llamadas por servicio externo ("ftp", "smtp")
+    tiempo_externo: dict[str, float] = field(default_factory=lambda: defaultdict(float))
+    llamadas_externas: dict[str, int] = field(default_factory=lambda: defaultdict(int))
+
+
+# El objeto se comparte con los hilos de trabajo y las tareas que copian el
+# contexto de la petición, así que todos suman sobre la misma medición
+_medicion: ContextVar[Optional[MedicionPeticion]] = ContextVar("medicion_peticion", default=None)
+
+
+class Metricas:
+    """
+    Contadores e histogramas por ruta de la API en formato Prometheus.
+
+    Los valores son del proceso: con varios workers cada uno expone los
+    suyos y Prometheus los agrega por instancia.
+    """
+
+    def __init__(self) -> None:
+        self._lock = threading.Lock()
+        # (metodo, ruta) -> conteo por bucket, suma y cantidad
+        self._buckets: dict[tuple[str, str], list[int]] = {}
+        self._duracion_suma: dict[tuple[str, str], float] = defaultdict(float)
+        self._duracion_cantidad: dict[tuple[str, str], int] = defaultdict(int)
+        self._respuestas: dict[tuple[str, str, str], int] = defaultdict(int)
+        self._excepciones: dict[tuple[str, str], int] = defaultdict(int)
+        self._consultas: dict[str, int] = defaultdict(int)
+        self._tiempo_db: dict[str, float] = defaultdict(float)
+        self._tiempo_externo: dict[tuple[str, str], float] = defaultdict(float)
+        self._llamadas_externas: dict[tuple[str, str], int] = defaultdict(int)
+
+    def registrar_peticion(
+        self,
+        metodo: str,
+        ruta: str,
+        estado: int,
+        duracion: float,
+        medicion: MedicionPeticion,
+        excepcion: bool = False,
+    ) -> None:
+        clave = (metodo, ruta)
+        with self._lock:
+            buckets = self._buckets.setdefault(clave, [0] * len(BUCKETS_DURACION))
+            indice = bisect_left(BUCKETS_DURACION, duracion)
+            if indice < len(buckets):
+                buckets[indice] += 1
+            self._duracion_suma[clave] += duracion
+            self._duracion_cantidad[clave] += 1
+            self._respuestas[(metodo, ruta, str(estado))] += 1
+            if excepcion:
+                self._excepciones[clave] += 1
+            self._sumar(ruta, medicion)
+
+    def registrar_fuera_de_peticion(self, medicion: MedicionPeticion) -> None:
+        with self._lock:
+            self._sumar(SIN_PETICION, medicion)
+
+    def _sumar(self, ruta: str, medicion: MedicionPeticion) -> None:
+        if medicion.consultas:
+            self._consultas[ruta] += medicion.consultas
+            self._tiempo_db[ruta] += medicion.tiempo_db
+        for servicio, segundos in medicion.tiempo_externo.items():
+            self._tiempo_externo[(ruta, servicio)] += segundos
+            self._llamadas_externas[(ruta, servicio)] += medicion.llamadas_externas[servicio]
+
+    def exportar(self) -> str:
+        """Texto en el formato de exposición de Prometheus (versión 0.0.4)."""
+        lineas: list[str] = []
+
+        def cabecera(nombre: str, tipo: str, ayuda: str) -> None:
+            lineas.append(f"# HELP {nombre} {ayuda}")
+            lineas.append(f"# TYPE {nombre} {tipo}")
+
+        with self._lock:
+            nombre = "http_peticion_duracion_segundos"
+            cabecera(nombre, "histogram", "Duración de las peticiones HTTP por ruta.")
+            for (metodo, ruta), buckets in sorted(self._buckets.items()):
+                etiquetas = _etiquetas(metodo=metodo, ruta=ruta)
+                acumulado = 0
+                for limite, cantidad in zip(BUCKETS_DURACION, buckets):
+                    acumulado += cantidad
+                    lineas.append(f'{nombre}_bucket{{{etiquetas},le="{limite}"}} {acumulado}')
+                cantidad_total = self._duracion_cantidad[(metodo, ruta)]
+                lineas.append(f'{nombre}_bucket{{{etiquetas},le="+Inf"}} {cantidad_total}')
+                lineas.append(f"{nombre}_sum{{{etiquetas}}} {self._duracion_suma[(metodo, ruta)]}")
+                lineas.append(f"{nombre}_count{{{etiquetas}}} {cantidad_total}")
+
+            nombre = "http_respuestas_total"
+            cabecera(nombre, "counter", "Respuestas HTTP por ruta y código de estado.")
+            for (metodo, ruta, estado), cantidad in sorted(self._respuestas.items()):
+                lineas.append(f"{nombre}{{{_etiquetas(metodo=metodo, ruta=ruta, estado=estado)}}} {cantidad}")
+
+            nombre = "http_excepciones_total"
+            cabecera(nombre, "counter", "Peticiones que terminaron con una excepción no controlada.")
+            for (metodo, ruta), cantidad in sorted(self._excepciones.items()):
+                lineas.append(f"{nombre}{{{_etiquetas(metodo=metodo, ruta=ruta)}}} {cantidad}")
+
+            nombre = "db_consultas_total"
+            cabecera(nombre, "counter", "Sentencias SQL ejecutadas por ruta.")
+            for ruta, cantidad in sorted(self._consultas.items()):
+                lineas.append(f"{nombre}{{{_etiquetas(ruta=ruta)}}} {cantidad}")
+
+            nombre = "db_duracion_segundos_total"
+            cabecera(nombre, "counter", "Tiempo total de las sentencias SQL por ruta.")
+            for ruta, segundos in sorted(self._tiempo_db.items()):
+                lineas.append(f"{nombre}{{{_etiquetas(ruta=ruta)}}} {segundos}")
+
+            nombre = "externo_llamadas_total"
+            cabecera(nombre, "counter", "Operaciones en servicios externos (FTP, SMTP) por ruta.")
+            for (ruta, servicio), cantidad in sorted(self._llamadas_externas.items()):
+                lineas.append(f"{nombre}{{{_etiquetas(ruta=ruta, servicio=servicio)}}} {cantidad}")
+
+            nombre = "externo_duracion_segundos_total"
+            cabecera(nombre, "counter", "Tiempo total en servicios externos (FTP, SMTP) por ruta.")
+            for (ruta, servicio), segundos in sorted(self._tiempo_externo.items()):
+                lineas.append(f"{nombre}{{{_etiquetas(ruta=ruta, servicio=servicio)}}} {segundos}")
+
+        return "\n".join(lineas) + "\n"
+
+
+def _etiquetas(**valores: str) -> str:
+    return ",".join(f'{clave}="{_escapar(valor)}"' for clave, valor in valores.items())
+
+
+def _escapar(valor: str) -> str:
+    return valor.replace("\\", "\\\\").replace('"', '\\"').replace("\n", "\\n")
+
+
+metricas = Metricas()
+
+
+def _registrar(actualizar) -> None:
+    medicion = _medicion.get()
+    if medicion is not None:
+        actualizar(medicion)
+    else:
+        medicion = MedicionPeticion()
+        actualizar(medicion)
+        metricas.registrar_fuera_de_peticion(medicion)
+
+
+@contextmanager
+def medir_externo(servicio: str) -> Iterator[None]:
+    """Suma la duración del bloque al tiempo en `servicio` de la petición."""
+    inicio = time.perf_counter()
+    try:
+        yield
+    finally:
+        duracion = time.perf_counter() - inicio
+
+        def actualizar(medicion: MedicionPeticion) -> None:
+            medicion.tiempo_externo[servicio] += duracion
+            medicion.llamadas_externas[servicio] += 1
+
+        _registrar(actualizar)
+
+
+def instrumentar_motor(engine: Engine) -> None:
+    """
+    Cuenta las sentencias SQL de `engine` y su duración. Para un motor
+    asíncrono se pasa `async_engine.sync_engine`.
+    """
+
+    @event.listens_for(engine, "before_cursor_execute")
+    def _inicio(conn, cursor, statement, parameters, context, executemany):
+        conn.info.setdefault("inicio_consulta", []).append(time.perf_counter())
+
+    @event.listens_for(engine, "after_cursor_execute")
+    def _fin(conn, cursor, statement, parameters, context, executemany):
+        duracion = time.perf_counter() - conn.info["inicio_consulta"].pop()
+
+        def actualizar(medicion: MedicionPeticion) -> None:
+            medicion.consultas += 1
+            medicion.tiempo_db += duracion
+
+        _registrar(actualizar)
+
+    @event.listens_for(engine, "handle_error")
+    def _error(contexto):
+        # Si la sentencia falla no hay after_cursor_execute
+        inicios = contexto.connection.info.get("inicio_consulta") if contexto.connection is not None else None
+        if inicios:
+            inicios.pop()
+
+
+class MiddlewareMetricas:
+    """
+    Middleware ASGI que mide cada petición HTTP y la registra en `metricas`
+    con la plantilla de su ruta (`/planificacion/search/`, no la URL con los
+    parámetros), para que la cantidad de series no crezca con los ids.
+
+    La duración incluye el envío completo del cuerpo, también en las
+    respuestas en streaming.
+    """
+
+    def __init__(self, app) -> None:
+        self.app = app
+
+    async def __call__(self, scope, receive, send) -> None:
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+
+        medicion = MedicionPeticion()
+        token = _medicion.set(medicion)
+        estado = 500
+        excepcion = False
+        inicio = time.perf_counter()
+
+        async def send_con_estado(mensaje) -> None:
+            nonlocal estado
+            if mensaje["type"] == "http.response.start":
+                estado = mensaje["status"]
+            await send(mensaje)
+
+        try:
+            await self.app(scope, receive, send_con_estado)
+        except Exception:
+            excepcion = True
+            raise
+        finally:
+            duracion = time.perf_counter() - inicio
+            _medicion.reset(token)
+            # El router de FastAPI agrega la ruta encontrada al scope
+            ruta = getattr(scope.get("route"), "path", None) or SIN_RUTA
+            metricas.registrar_peticion(scope["method"], ruta, estado, duracion, medicion, excepcion)
@@ -1,14 +1,25 @@
 
 
+import asyncio
+from concurrent.futures import ThreadPoolExecutor
 from datetime import datetime, timedelta, timezone
-from typing import Any
+from typing import Any, Optional
 
 import jwt
 from passlib.context import CryptContext
 import pytz
 from core.config import settings
 
-pwd_context = CryptContext(schemes=["bcrypt"], deprecated="auto")
+# Un hash con otro costo que BCRYPT_ROUNDS se considera desactualizado y se
+# vuelve a generar al iniciar sesión (verify_and_update_password)
+pwd_context = CryptContext(schemes=["bcrypt"], deprecated="auto", bcrypt__rounds=settings.BCRYPT_ROUNDS)
+
+# bcrypt tarda cientos de milisegundos por contraseña y libera el GIL; se
+# ejecuta en un pool propio para no bloquear el event loop y para que muchos
+# inicios de sesión simultáneos no ocupen más de PASSWORD_HASH_WORKERS núcleos
+_password_pool = ThreadPoolExecutor(
+    max_workers=settings.PASSWORD_HASH_WORKERS, thread_name_prefix="password-hash"
+)
 
 
 ALGORITHM = "HS256"
@@ -22,11 +33,30 @@ def create_access_token(subject: str | Any, expires_delta: timedelta) -> str:
 
 
 def verify_password(plain_password: str, hashed_password: str) -> bool:
-    return pwd_context.verify(plain_password, hashed_password)
+    return _password_pool.submit(pwd_context.verify, plain_password, hashed_password).result()
 
 
 def get_password_hash(password: str) -> str:
-    return pwd_context.hash(password)
+    return _password_pool.submit(pwd_context.hash, password).result()
+
+
+async def get_password_hash_async(password: str) -> str:
+    """Como `get_password_hash`, sin bloquear el event loop."""
+    return await asyncio.get_running_loop().run_in_executor(_password_pool, pwd_context.hash, password)
+
+
+async def verify_and_update_password(plain_password: str, hashed_password: str) -> tuple[bool, Optional[str]]:
+    """
+    Verifica la contraseña en el pool de hashing sin bloquear el event loop.
+
+    Returns:
+        tuple: (válida, hash nuevo). El hash nuevo no es None cuando la
+        contraseña es válida pero su hash usa parámetros desactualizados;
+        el llamador debe guardarlo en lugar del anterior.
+    """
+    return await asyncio.get_running_loop().run_in_executor(
+        _password_pool, pwd_context.verify_and_update, plain_password, hashed_password
+    )
 
 
 # async def create_db_and_tables():
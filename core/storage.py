@@ -0,0 +1,332 @@
+import ftplib
+import io
+import posixpath
+from abc import ABC, abstractmethod
+from contextlib import contextmanager
+from pathlib import Path
+from typing import AsyncIterable, AsyncIterator, Iterator, Optional
+
+import aiofiles
+import aiofiles.os
+from anyio import to_thread
+
+from core.ftp import FTPPool
+from core.metricas import medir_externo
+
+CHUNK_SIZE = 64 * 1024
+
+
+class Storage(ABC):
+    """
+    Almacenamiento de los archivos PDF de planificaciones e informes.
+
+    Las rutas son relativas a la raíz del almacenamiento, por ejemplo
+    `uploads/informe/2024-2025/archivo.pdf`. Los métodos que leen o borran
+    un archivo inexistente lanzan FileNotFoundError.
+    """
+
+    @abstractmethod
+    async def put(self, path: str, data: bytes) -> None:
+        """Guarda `data` en `path`, creando los directorios necesarios."""
+
+    @abstractmethod
+    async def put_stream(self, path: str, chunks: AsyncIterable[bytes]) -> None:
+        """
+        Guarda en `path` los bloques de `chunks` a medida que llegan, sin
+        reunir el archivo en memoria. Si `chunks` lanza una excepción la
+        escritura se cancela, no queda un archivo parcial y la excepción se
+        propaga.
+        """
+
+    @abstractmethod
+    async def get(self, path: str) -> bytes:
+        """Devuelve el contenido completo del archivo."""
+
+    @abstractmethod
+    async def delete(self, path: str) -> None:
+        """Elimina el archivo."""
+
+    @abstractmethod
+    async def exists(self, path: str) -> bool:
+        """Indica si el archivo existe."""
+
+    @abstractmethod
+    async def size(self, path: str) -> int:
+        """Devuelve el tamaño del archivo en bytes."""
+
+    @abstractmethod
+    def stream(
+        self,
+        path: str,
+        chunk_size: int = CHUNK_SIZE,
+        offset: int = 0,
+        length: Optional[int] = None,
+    ) -> AsyncIterator[bytes]:
+        """
+        Lee el archivo en bloques de a lo sumo `chunk_size` bytes, desde
+        `offset` y hasta `length` bytes (o hasta el final si es None).
+        Cada bloque se lee cuando el consumidor pide el siguiente, así que
+        a lo sumo un bloque está en memoria por descarga.
+        """
+
+
+def _no_encontrado(error: Exception) -> bool:
+    return isinstance(error, ftplib.error_perm) and str(error).startswith("550")
+
+
+class FTPStorage(Storage):
+    """
+    Almacenamiento sobre el servidor FTP. Las llamadas a ftplib son
+    bloqueantes, así que se ejecutan en un hilo de trabajo con una conexión
+    propia tomada del pool para no detener el event loop.
+    """
+
+    def __init__(self, pool: FTPPool) -> None:
+        self.pool = pool
+
+    @staticmethod
+    async def _en_hilo(funcion, *args):
+        # Toda llamada a ftplib pasa por aquí y cuenta como tiempo de FTP
+        with medir_externo("ftp"):
+            return await to_thread.run_sync(funcion, *args)
+
+    @contextmanager
+    def _conexion(self) -> Iterator[ftplib.FTP]:
+        ftp = self.pool.checkout()
+        try:
+            yield ftp
+        except ftplib.all_errors as e:
+            if _no_encontrado(e):
+                self.pool.checkin(ftp)
+                raise FileNotFoundError(str(e)) from e
+            self.pool.discard(ftp)
+            raise
+        except BaseException:
+            self.pool.discard(ftp)
+            raise
+        else:
+            self.pool.checkin(ftp)
+
+    @staticmethod
+    def _crear_directorios(ftp: ftplib.FTP, directorio: str) -> None:
+        partes = [parte for parte in directorio.split("/") if parte]
+        for i in range(1, len(partes) + 1):
+            try:
+                ftp.mkd("/".join(partes[:i]))
+            except ftplib.error_perm:
+                # Ignorar error si el directorio ya existe
+                pass
+
+    def _put(self, path: str, data: bytes) -> None:
+        directorio, nombre = posixpath.split(path)
+        with self._conexion() as ftp:
+            self._crear_directorios(ftp, directorio)
+            if directorio:
+                ftp.cwd(directorio)
+            ftp.storbinary(f"STOR {nombre}", io.BytesIO(data))
+
+    def _abrir_stor(self, ftp: ftplib.FTP, path: str):
+        directorio, nombre = posixpath.split(path)
+        self._crear_directorios(ftp, directorio)
+        if directorio:
+            ftp.cwd(directorio)
+        ftp.voidcmd("TYPE I")
+        return ftp.transfercmd(f"STOR {nombre}")
+
+    def _get(self, path: str) -> bytes:
+        buffer = io.BytesIO()
+        with self._conexion() as ftp:
+            ftp.retrbinary(f"RETR {path}", buffer.write)
+        return buffer.getvalue()
+
+    def _delete(self, path: str) -> None:
+        with self._conexion() as ftp:
+            ftp.delete(path)
+
+    def _size(self, path: str) -> int:
+        with self._conexion() as ftp:
+            ftp.voidcmd("TYPE I")
+            return ftp.size(path)
+
+    def _exists(self, path: str) -> bool:
+        directorio, nombre = posixpath.split(path)
+        try:
+            with self._conexion() as ftp:
+                nombres = ftp.nlst(directorio or ".")
+        except FileNotFoundError:
+            return False
+        return nombre in {posixpath.basename(n) for n in nombres}
+
+    async def put(self, path: str, data: bytes) -> None:
+        await self._en_hilo(self._put, path, data)
+
+    async def put_stream(self, path: str, chunks: AsyncIterable[bytes]) -> None:
+        try:
+            await self._put_stream(path, chunks)
+        except Exception:
+            # No dejar en el servidor un archivo a medio subir
+            try:
+                await self.delete(path)
+            except Exception:
+                pass
+            raise
+
+    async def _put_stream(self, path: str, chunks: AsyncIterable[bytes]) -> None:
+        ftp = await self._en_hilo(self.pool.checkout)
+        conn = None
+        completa = False
+        try:
+            conn = await self._en_hilo(self._abrir_stor, ftp, path)
+            async for chunk in chunks:
+                await self._en_hilo(conn.sendall, chunk)
+            conn.close()
+            conn = None
+            await self._en_hilo(ftp.voidresp)
+            completa = True
+        finally:
+            if conn is not None:
+                conn.close()
+            if completa:
+                await self._en_hilo(self.pool.checkin, ftp)
+            else:
+                ftp.close()
+                self.pool.discard(ftp)
+
+    async def get(self, path: str) -> bytes:
+        return await self._en_hilo(self._get, path)
+
+    async def delete(self, path: str) -> None:
+        await self._en_hilo(self._delete, path)
+
+    async def exists(self, path: str) -> bool:
+        return await self._en_hilo(self._exists, path)
+
+    async def size(self, path: str) -> int:
+        return await self._en_hilo(self._size, path)
+
+    async def stream(
+        self,
+        path: str,
+        chunk_size: int = CHUNK_SIZE,
+        offset: int = 0,
+        length: Optional[int] = None,
+    ) -> AsyncIterator[bytes]:
+        ftp = await self._en_hilo(self.pool.checkout)
+        conn = None
+        reutilizable = False
+        try:
+            try:
+                conn = await self._en_hilo(self._abrir_retr, ftp, path, offset)
+            except ftplib.error_perm as e:
+                if _no_encontrado(e):
+                    reutilizable = True
+                    raise FileNotFoundError(str(e)) from e
+                raise
+
+            restante = length
+            while restante is None or restante > 0:
+                tamano = chunk_size if restante is None else min(chunk_size, restante)
+                chunk = await self._en_hilo(conn.recv, tamano)
+                if not chunk:
+                    break
+                if restante is not None:
+                    restante -= len(chunk)
+                yield chunk
+
+            conn.close()
+            conn = None
+            await self._en_hilo(self._cerrar_retr, ftp, restante == 0)
+            reutilizable = True
+        finally:
+            if conn is not None:
+                conn.close()
+            if reutilizable:
+                await self._en_hilo(self.pool.checkin, ftp)
+            else:
+                # Cerrar sin esperar al servidor: la transferencia quedó a medias
+                ftp.close()
+                self.pool.discard(ftp)
+
+    @staticmethod
+    def _abrir_retr(ftp: ftplib.FTP, path: str, offset: int):
+        ftp.voidcmd("TYPE I")
+        return ftp.transfercmd(f"RETR {path}", rest=offset or None)
+
+    @staticmethod
+    def _cerrar_retr(ftp: ftplib.FTP, cortada: bool) -> None:
+        try:
+            ftp.voidresp()
+        except (ftplib.error_temp, ftplib.error_perm):
+            # Al cerrar el canal de datos antes del final (rango parcial)
+            # el servidor responde 426; la conexión de control sigue sana
+            if not cortada:
+                raise
+
+
+class LocalStorage(Storage):
+    """
+    Almacenamiento en el disco local con E/S asíncrona. Útil en desarrollo,
+    en pruebas y para medir el pipeline de PDFs sin un servidor FTP.
+    """
+
+    def __init__(self, root: str) -> None:
+        self.root = Path(root).resolve()
+
+    def _ruta(self, path: str) -> Path:
+        ruta = (self.root / path.lstrip("/")).resolve()
+        if not ruta.is_relative_to(self.root):
+            raise ValueError(f"Ruta fuera del almacenamiento: {path}")
+        return ruta
+
+    async def put(self, path: str, data: bytes) -> None:
+        ruta = self._ruta(path)
+        await aiofiles.os.makedirs(ruta.parent, exist_ok=True)
+        async with aiofiles.open(ruta, "wb") as archivo:
+            await archivo.write(data)
+
+    async def put_stream(self, path: str, chunks: AsyncIterable[bytes]) -> None:
+        ruta = self._ruta(path)
+        await aiofiles.os.makedirs(ruta.parent, exist_ok=True)
+        parcial = ruta.with_name(f"{ruta.name}.part")
+        try:
+            async with aiofiles.open(parcial, "wb") as archivo:
+                async for chunk in chunks:
+                    await archivo.write(chunk)
+            await aiofiles.os.replace(parcial, ruta)
+        except BaseException:
+            if await aiofiles.os.path.exists(parcial):
+                await aiofiles.os.remove(parcial)
+            raise
+
+    async def get(self, path: str) -> bytes:
+        async with aiofiles.open(self._ruta(path), "rb") as archivo:
+            return await archivo.read()
+
+    async def delete(self, path: str) -> None:
+        await aiofiles.os.remove(self._ruta(path))
+
+    async def exists(self, path: str) -> bool:
+        return await aiofiles.os.path.isfile(self._ruta(path))
+
+    async def size(self, path: str) -> int:
+        return await aiofiles.os.path.getsize(self._ruta(path))
+
+    async def stream(
+        self,
+        path: str,
+        chunk_size: int = CHUNK_SIZE,
+        offset: int = 0,
+        length: Optional[int] = None,
+    ) -> AsyncIterator[bytes]:
+        async with aiofiles.open(self._ruta(path), "rb") as archivo:
+            if offset:
+                await archivo.seek(offset)
+            restante = length
+            while restante is None or restante > 0:
+                tamano = chunk_size if restante is None else min(chunk_size, restante)
+                chunk = await archivo.read(tamano)
+                if not chunk:
+                    break
+                if restante is not None:
+                    restante -= len(chunk)
+                yield chunk
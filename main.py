@@ -1,6 +1,4 @@
-import ftplib
-from typing import Optional
-from fastapi import Depends, FastAPI, HTTPException, Request
+from fastapi import Depends, FastAPI
 from dotenv import dotenv_values
 from fastapi import  FastAPI
 
@@ -8,14 +6,18 @@ from fastapi import  FastAPI
 #import joblib  # importa las bibliotecas joblib para cargar el
 from fastapi.concurrency import asynccontextmanager
 from fastapi.middleware.cors import CORSMiddleware
+from fastapi.responses import ORJSONResponse
 from sqlmodel import select
 
 from utils import check_and_send_reminders, check_and_update_states
 #import cv2
 config = dotenv_values(".env")
 from api.main import api_router
-from api.deps import SessionDep, cerrar_conexion_ftp, conexion_ftp, reconectar_ftp
-from starlette.middleware.base import BaseHTTPMiddleware
+from api.deps import SessionDep, crear_cache_pdf, crear_pool_ftp, crear_storage
+from core.config import settings
+from core.correo import procesar_outbox
+from core.db import async_engine
+from core.metricas import MiddlewareMetricas
 from apscheduler.schedulers.background import BackgroundScheduler
 
 
@@ -29,21 +31,30 @@ scheduler_send_email_reminders = BackgroundScheduler()
 @asynccontextmanager
 async def lifespan(app: FastAPI):
 
-    ftp: Optional[ftplib.FTP] = conexion_ftp()
+    if not settings.METRICAS_TOKEN:
+        print("METRICAS_TOKEN no está configurado: /metrics queda deshabilitado")
+    ftp_pool = crear_pool_ftp()
     # device = 'cuda' if torch.cuda.is_available() else 'cpu'
     # model = YOLO('Modelos/best.pt').to(device)
-    app.ftp = ftp
-    scheduler_send_email_reminders.add_job(check_and_send_reminders, 'interval', minutes=60)
+    app.ftp_pool = ftp_pool
+    app.storage = crear_storage(ftp_pool)
+    app.pdf_cache = crear_cache_pdf()
+    app.pdf_cache.limpiar_temporales()
+    scheduler_send_email_reminders.add_job(check_and_send_reminders, 'interval', minutes=settings.RECORDATORIOS_INTERVAL)
     scheduler_send_email_reminders.add_job(check_and_update_states, 'interval', minutes=30)
+    scheduler_send_email_reminders.add_job(procesar_outbox, 'interval', seconds=settings.EMAIL_OUTBOX_INTERVAL)
+    scheduler_send_email_reminders.add_job(ftp_pool.keepalive, 'interval', seconds=settings.FTP_KEEPALIVE_INTERVAL)
     scheduler_send_email_reminders.start()
     
     
     yield
-    cerrar_conexion_ftp(ftp)
+    ftp_pool.close()
+    await async_engine.dispose()
 
 
 
-app = FastAPI(lifespan=lifespan)
+# orjson serializa las respuestas JSON más rápido que json de la biblioteca estándar
+app = FastAPI(lifespan=lifespan, default_response_class=ORJSONResponse)
 
 app.add_middleware(
         CORSMiddleware,
@@ -51,58 +62,10 @@ app.add_middleware(
         allow_credentials=True,
         allow_methods=["*"],
         allow_headers=["*"],
-     
+        # Cabeceras de paginación que el frontend necesita leer
+        expose_headers=["X-Next-Cursor", "X-Total-Count"],
     )
+# Se agrega último para que quede por fuera de CORS y mida la petición completa
+app.add_middleware(MiddlewareMetricas)
 
-# class FTPMiddleware(BaseHTTPMiddleware):
-#     async def dispatch(self, request: Request, call_next):
-#         # Obtén la conexión FTP
-#         ftp = request.app.ftp
-#         # Reconectar si es necesario
-#         ftp = reconectar_ftp(ftp)
-#         # Actualiza la conexión en la aplicación para que esté disponible en todos los endpoints
-#         request.app.ftp = ftp
-#         # Llama al siguiente middleware o endpoint
-#         response = await call_next(request)
-#         return response
-
-class FTPMiddleware(BaseHTTPMiddleware):
-    async def dispatch(self, request: Request, call_next):
-        try:
-            # Obtain FTP connection
-            ftp = request.app.ftp
-            
-            # More robust reconnection
-            if not ftp or not hasattr(ftp, 'sock') or ftp.sock is None:
-                ftp = conexion_ftp()
-                if not ftp:
-                    raise HTTPException(
-                        status_code=503, 
-                        detail="Unable to establish FTP connection"
-                    )
-            
-            # Verify connection is active
-            try:
-                ftp.pwd()  # Check if connection is still alive
-            except ftplib.all_errors:
-                ftp = conexion_ftp()
-            
-            # Update app's FTP connection
-            request.app.ftp = ftp
-            
-            response = await call_next(request)
-            return response
-        
-        except Exception as e:
-            print(f"FTP Middleware Error: {e}")
-            raise HTTPException(
-                status_code=500, 
-                detail="Internal server error with FTP connection"
-            )
-
-
-
-
-
-app.add_middleware(FTPMiddleware)
 app.include_router(api_router)
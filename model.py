@@ -7,6 +7,7 @@ from datetime import datetime
 from fastapi import UploadFile
 from pydantic import EmailStr
 import pytz
+from sqlalchemy import DateTime, Index, UniqueConstraint, text
 from sqlmodel import Relationship, SQLModel,Field
 
 
@@ -61,6 +62,13 @@ class Periodo(SQLModel, table=True):
     fecha_creacion: date = Field(default_factory=date.today)
 
 class Planificaciones(SQLModel, table=True):
+    __table_args__ = (
+        Index("ix_planificaciones_periodo_profesor", "periodo_id", "profesor_id"),
+        Index("ix_planificaciones_periodo_fecha_subida", "periodo_id", "fecha_subida"),
+        Index("ix_planificaciones_asignaturas_id", "asignaturas_id"),
+        # Ventanas de recordatorio de todos los periodos
+        Index("ix_planificaciones_fecha_subida", "fecha_subida"),
+    )
 
     id: Optional[int] = Field(default=None, primary_key=True)  # Clave primaria
     titulo: str = Field(index=True)  # Campo de texto con índice
@@ -81,6 +89,10 @@ class Areas(SQLModel, table=True):
 
 
 class Asignaturas(SQLModel, table=True):
+    __table_args__ = (
+        Index("ix_asignaturas_area_id", "area_id"),
+    )
+
     id: Optional[int] = Field(default=None, primary_key=True)
     fecha_creacion: Optional[date] = Field(default_factory=date.today)
     codigo: str = Field(..., max_length=50, description="Código único de la asignatura")
@@ -92,6 +104,11 @@ class Asignaturas(SQLModel, table=True):
 
 
 class areas_profesor(SQLModel, table=True):
+    __table_args__ = (
+        Index("ix_areas_profesor_profesor_id", "profesor_id"),
+        Index("ix_areas_profesor_area_id", "area_id"),
+    )
+
     id: Optional[int] = Field(default=None, primary_key=True)
     profesor_id: int = Field(..., foreign_key="profesores.id", description="ID del profesor relacionado")
     area_id: int = Field(..., foreign_key="areas.id", description="ID del área relacionada")
@@ -100,6 +117,12 @@ class areas_profesor(SQLModel, table=True):
 
 class Planificacion_Profesor(SQLModel, table=True):
     __tablename__ = "planificacion_profesor"
+    __table_args__ = (
+        Index("ix_planificacion_profesor_planificacion_estado", "planificacion_id", "estado"),
+        Index("ix_planificacion_profesor_estado", "estado"),
+        Index("ix_planificacion_profesor_revisor", "profesor_revisor_id"),
+        Index("ix_planificacion_profesor_aprobador", "profesor_aprobador_id"),
+    )
     id: Optional[int] = Field(default=None, primary_key=True)
     planificacion_id: int = Field(..., foreign_key="planificaciones.id", description="ID de la planificación asociada")
     profesor_aprobador_id: Optional[int] = Field(default=None, foreign_key="profesores.id", description="ID del profesor que aprobó")
@@ -108,6 +131,21 @@ class Planificacion_Profesor(SQLModel, table=True):
     estado: Optional[str] = Field(default=None, description="Estado actual de la planificación")
     profesor_revisor_id: Optional[int] = Field(default=None, foreign_key="areas_profesor.id", description="ID del profesor que revisó")
 
+class Periodo_Stats(SQLModel, table=True):
+    """
+    Cantidad de planificaciones por periodo, área, profesor y estado. Se
+    mantiene con api.estadisticas en la misma transacción que cada cambio de
+    planificación y la leen las métricas del dashboard.
+    """
+    __tablename__ = "periodo_stats"
+
+    periodo_id: int = Field(primary_key=True)
+    area_id: int = Field(primary_key=True)
+    profesor_id: int = Field(primary_key=True)
+    estado: str = Field(primary_key=True)
+    total: int = Field(default=0)
+
+
 class FormularioSubirPdf(SQLModel, table=False):
     pdf: UploadFile = Field(..., description="Archivo PDF")
     id_planificacion: int = Field(..., description="ID de la planificación")
@@ -120,6 +158,9 @@ class FormularioSubirPdf(SQLModel, table=False):
     
 class Comentarios(SQLModel, table=True):
     __tablename__ = "comentarios"
+    __table_args__ = (
+        Index("ix_comentarios_planificacion_profesor_id", "planificacion_profesor_id"),
+    )
     id: Optional[int] = Field(default=None, primary_key=True)
     id_profesor: int = Field(..., foreign_key="profesores.id")
     planificacion_profesor_id: int = Field(..., foreign_key="planificacion_profesor.id")
@@ -127,6 +168,23 @@ class Comentarios(SQLModel, table=True):
     fecha_enviado: datetime = Field(default_factory=lambda: datetime.now(pytz.timezone('America/Guayaquil')))
 
 
+class Recordatorio_Planificacion(SQLModel, table=True):
+    """
+    Registro de los recordatorios de fecha límite ya enviados; la restricción
+    única impide enviar dos veces el mismo recordatorio.
+    """
+    __tablename__ = "recordatorio_planificacion"
+    __table_args__ = (
+        UniqueConstraint("planificacion_profesor_id", "horas", name="uq_recordatorio_planificacion_horas"),
+    )
+    id: Optional[int] = Field(default=None, primary_key=True)
+    planificacion_profesor_id: int = Field(..., foreign_key="planificacion_profesor.id")
+    horas: int = Field(..., description="Horas antes de la fecha límite (24, 3 o 1)")
+    enviado_en: datetime = Field(
+        default_factory=lambda: datetime.now(pytz.utc), sa_type=DateTime(timezone=True)
+    )
+
+
 class Comentarios_Dto(SQLModel):
     profesor_id: int
     planificacion_profesor_id: int
@@ -134,8 +192,74 @@ class Comentarios_Dto(SQLModel):
     nombre_planificacion: str
     periodo_nombre: str
 
+
+class Planificacion_Listado_Dto(SQLModel):
+    """
+    Fila de los listados de planificaciones con los nombres de las
+    relaciones ya resueltos. `id` es el de planificacion_profesor.
+    """
+    titulo: str
+    descripcion: Optional[str] = None
+    fecha_subida: datetime
+    profesor_id: Optional[int] = None
+    asignaturas_id: Optional[int] = None
+    periodo_id: Optional[int] = None
+    id: int
+    id_planificacion: int
+    profesor_nombre: str
+    periodo_nombre: str
+    asignatura_nombre: str
+    curso_nombre: str
+    paralelo: Optional[str] = None
+    area_id: int
+    area_nombre: str
+    area_codigo: str
+    profesor_aprobador_id: Optional[int] = None
+    profesor_aprobador_nombre: Optional[str] = None
+    profesor_revisor_id: Optional[int] = None
+    profesor_revisor_nombre: Optional[str] = None
+    fecha_de_actualizacion: Optional[date] = None
+    estado: Optional[str] = None
+    archivo: Optional[str] = None
+
+class EmailOutbox(SQLModel, table=True):
+    """
+    Correo pendiente de envío. Las rutas solo insertan filas y el worker de
+    core.correo las envía por lotes.
+    """
+    __tablename__ = "email_outbox"
+    __table_args__ = (
+        Index(
+            "ix_email_outbox_pendientes", "proximo_intento",
+            postgresql_where=text("estado IN ('pendiente', 'enviando')"),
+        ),
+        Index("ix_email_outbox_enviado_en", "enviado_en"),
+    )
+
+    id: Optional[int] = Field(default=None, primary_key=True)
+    destinatario: str = Field(..., max_length=320)
+    asunto: str
+    html: Optional[str] = None
+    texto: Optional[str] = None
+    estado: str = Field(default="pendiente", max_length=20)  # pendiente, enviando, enviado o fallido
+    intentos: int = Field(default=0)
+    ultimo_error: Optional[str] = None
+    # Para un correo 'enviando' es el vencimiento de la reserva del worker
+    proximo_intento: datetime = Field(
+        default_factory=lambda: datetime.now(pytz.utc), sa_type=DateTime(timezone=True)
+    )
+    creado_en: datetime = Field(
+        default_factory=lambda: datetime.now(pytz.utc), sa_type=DateTime(timezone=True)
+    )
+    enviado_en: Optional[datetime] = Field(default=None, sa_type=DateTime(timezone=True))
+
+
 class AccessToken(SQLModel, table=True):
     __tablename__ = 'accesstoken'  # Nombre de la tabla
+    __table_args__ = (
+        # Un token por profesor; save_token_to_db hace ON CONFLICT sobre este índice
+        Index("uq_accesstoken_profesor_id", "profesor_id", unique=True),
+    )
 
     profesor_id: int = Field(..., foreign_key="profesores.id")  # Referencia a la tabla 'profesores'
     token: str = Field(..., max_length=43, primary_key=True)
@@ -147,6 +271,9 @@ class Informe_Profesor(SQLModel, table=True):
     Modelo SQLModel para la tabla informe_profesor.
     """
     __tablename__ = "informe_profesor"
+    __table_args__ = (
+        Index("ix_informe_profesor_periodo_profesor", "periodo_id", "profesor_id"),
+    )
 
     id: Optional[int] = Field(default=None, primary_key=True)  # ID generado automáticamente
     estado: str = Field(..., description="Estado del informe (ej: 'pendiente', 'aprobado', etc.)")
@@ -179,6 +306,9 @@ class Informe_Profesor_DTO(SQLModel):
     
 class Comentarios_Informe(SQLModel, table=True):
     __tablename__ = "comentarios_informe"
+    __table_args__ = (
+        Index("ix_comentarios_informe_informe_profesor_id", "informe_profesor_id"),
+    )
     id: Optional[int] = Field(default=None, primary_key=True)
     id_profesor: int = Field(..., foreign_key="profesores.id")
     informe_profesor_id: int = Field(..., foreign_key="informe_profesor.id")
@@ -0,0 +1,30 @@
+"""
+Vuelve a calcular la tabla periodo_stats desde las planificaciones.
+
+Las rutas y la tarea de estados la mantienen al día en cada cambio; este
+comando sirve para poblarla la primera vez o corregirla si se modificaron
+planificaciones directamente en la base de datos. Usa la base de datos
+configurada en .env.
+
+Uso:
+    python -m scripts.reconstruir_periodo_stats
+"""
+import sys
+from pathlib import Path
+
+from sqlmodel import Session
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+
+from api.estadisticas import reconstruir_periodo_stats  # noqa: E402
+from core.db import engine  # noqa: E402
+
+
+def main() -> None:
+    with Session(engine) as session:
+        filas = reconstruir_periodo_stats(session)
+    print(f"periodo_stats reconstruida: {filas} filas")
+
+
+if __name__ == "__main__":
+    main()
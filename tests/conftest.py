@@ -0,0 +1,20 @@
+import os
+
+# Valores mínimos para que core.config cargue sin un .env; las pruebas de
+# esta carpeta no se conectan a la base de datos, al FTP ni al SMTP
+for variable, valor in {
+    "POSTGRES_SERVER": "localhost",
+    "POSTGRES_USER": "postgres",
+    "POSTGRES_PASSWORD": "postgres",
+    "POSTGRES_DB": "pruebas",
+    "SMTP_HOST": "localhost",
+    "SMTP_PASSWORD": "x",
+    "EMAILS_FROM_EMAIL": "pruebas@example.com",
+    "SECRET_KEY": "pruebas",
+    "PROJECT_NAME": "pruebas",
+    "FTP_USER": "x",
+    "FTP_PASSWORD": "x",
+    "FTP_SERVER": "localhost",
+    "BACKEND_URL": "http://localhost/",
+}.items():
+    os.environ.setdefault(variable, valor)
@@ -0,0 +1,73 @@
+import asyncio
+
+from core.cache import CachePDF
+from core.storage import LocalStorage
+
+RUTA = "uploads/informe/archivo.pdf"
+
+
+class StorageInvalidado(LocalStorage):
+    """Almacenamiento que invalida la ruta en otro worker durante la descarga."""
+
+    def __init__(self, root: str, otro_worker: CachePDF) -> None:
+        super().__init__(root)
+        self.otro_worker = otro_worker
+
+    async def stream(self, path, *args, **kwargs):
+        await self.otro_worker.invalidar(path)
+        async for chunk in super().stream(path, *args, **kwargs):
+            yield chunk
+
+
+def _preparar(tmp_path) -> LocalStorage:
+    storage = LocalStorage(str(tmp_path / "storage"))
+    asyncio.run(storage.put(RUTA, b"%PDF-1.4 contenido"))
+    return storage
+
+
+def test_carga_y_acierto(tmp_path):
+    storage = _preparar(tmp_path)
+    cache = CachePDF(str(tmp_path / "cache"), 1024)
+
+    entrada = asyncio.run(cache.obtener_o_cargar(storage, RUTA))
+
+    assert entrada is not None and entrada.tamano == 18
+    assert asyncio.run(cache.obtener(RUTA)) == entrada
+
+
+def test_invalidacion_en_otro_worker_durante_la_descarga(tmp_path):
+    _preparar(tmp_path)
+    otro_worker = CachePDF(str(tmp_path / "cache"), 1024)
+    cache = CachePDF(str(tmp_path / "cache"), 1024)
+    storage = StorageInvalidado(str(tmp_path / "storage"), otro_worker)
+
+    assert asyncio.run(cache.obtener_o_cargar(storage, RUTA)) is None
+    assert asyncio.run(cache.obtener(RUTA)) is None
+    assert asyncio.run(otro_worker.obtener(RUTA)) is None
+
+
+def test_carga_posterior_a_la_invalidacion(tmp_path):
+    storage = _preparar(tmp_path)
+    cache = CachePDF(str(tmp_path / "cache"), 1024)
+
+    asyncio.run(cache.invalidar(RUTA))
+
+    assert asyncio.run(cache.obtener_o_cargar(storage, RUTA)) is not None
+
+
+def test_bloqueo_se_conserva_mientras_hay_tareas_esperando(tmp_path):
+    storage = _preparar(tmp_path)
+    cache = CachePDF(str(tmp_path / "cache"), 1024)
+    bloqueos_al_terminar_la_primera = []
+
+    async def principal():
+        tareas = [asyncio.create_task(cache.obtener_o_cargar(storage, RUTA)) for _ in range(3)]
+        tareas[0].add_done_callback(lambda _: bloqueos_al_terminar_la_primera.append(dict(cache._bloqueos)))
+        return await asyncio.gather(*tareas)
+
+    entradas = asyncio.run(principal())
+
+    # Las otras dos tareas seguían esperando el bloqueo de la primera
+    assert list(bloqueos_al_terminar_la_primera[0]) == [RUTA]
+    assert entradas[0] == entradas[1] == entradas[2]
+    assert cache._bloqueos == {} and cache._usos_bloqueo == {}
@@ -0,0 +1,38 @@
+import pytest
+from fastapi import HTTPException
+
+from api.descargas import parsear_rango
+
+TAMANO = 100
+
+
+@pytest.mark.parametrize(
+    "rango, esperado",
+    [
+        (None, None),
+        ("", None),
+        ("bytes=0-0", (0, 0)),
+        ("bytes=-5", (95, 99)),
+        ("bytes=5-", (5, 99)),
+        ("bytes=5-1000", (5, 99)),
+        ("bytes=-1000", (0, 99)),
+        # Sintácticamente inválidos: se ignoran y se sirve el archivo completo
+        ("bytes=10-5", None),
+        ("bytes=-", None),
+        ("bytes=a-5", None),
+        ("bytes=5", None),
+        # Varios rangos y otras unidades no se soportan
+        ("bytes=0-1,5-6", None),
+        ("items=0-1", None),
+    ],
+)
+def test_parsear_rango(rango, esperado):
+    assert parsear_rango(rango, TAMANO) == esperado
+
+
+@pytest.mark.parametrize("rango", ["bytes=100-", "bytes=100-200", "bytes=-0"])
+def test_parsear_rango_no_satisfacible(rango):
+    with pytest.raises(HTTPException) as error:
+        parsear_rango(rango, TAMANO)
+    assert error.value.status_code == 416
+    assert error.value.headers["Content-Range"] == f"bytes */{TAMANO}"
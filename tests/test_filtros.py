@@ -0,0 +1,89 @@
+from datetime import date, datetime
+
+import pytest
+from fastapi import HTTPException
+from sqlalchemy import DateTime, column
+from sqlalchemy.dialects import postgresql
+
+from api.filtros import filtro_fecha_subida, rango_fechas
+
+FECHA_SUBIDA = column("fecha_subida", DateTime)
+
+
+def _sql(condiciones) -> list[str]:
+    return [
+        str(condicion.compile(dialect=postgresql.dialect(), compile_kwargs={"literal_binds": True}))
+        for condicion in condiciones
+    ]
+
+
+@pytest.mark.parametrize(
+    "argumentos, esperado",
+    [
+        ({}, (None, None)),
+        ({"mes": "", "year": ""}, (None, None)),
+        ({"year": "2024"}, (datetime(2024, 1, 1), datetime(2025, 1, 1))),
+        ({"mes": "3", "year": "2024"}, (datetime(2024, 3, 1), datetime(2024, 4, 1))),
+        # Diciembre pasa al año siguiente
+        ({"mes": "12", "year": "2024"}, (datetime(2024, 12, 1), datetime(2025, 1, 1))),
+        # El mes sin año no define un rango
+        ({"mes": "3"}, (None, None)),
+        ({"desde": date(2024, 3, 10)}, (datetime(2024, 3, 10), None)),
+        ({"hasta": date(2024, 3, 10)}, (None, datetime(2024, 3, 11))),
+        # Intersección con desde/hasta
+        (
+            {"mes": "3", "year": "2024", "desde": date(2024, 3, 10), "hasta": date(2024, 5, 1)},
+            (datetime(2024, 3, 10), datetime(2024, 4, 1)),
+        ),
+        (
+            {"year": "2024", "desde": date(2023, 6, 1), "hasta": date(2024, 2, 29)},
+            (datetime(2024, 1, 1), datetime(2024, 3, 1)),
+        ),
+        # Límites
+        ({"year": "1900"}, (datetime(1900, 1, 1), datetime(1901, 1, 1))),
+        ({"mes": "12", "year": "9998"}, (datetime(9998, 12, 1), datetime(9999, 1, 1))),
+        ({"hasta": date.max}, (None, None)),
+        ({"desde": date.min, "hasta": date.max}, (datetime(1, 1, 1), None)),
+    ],
+)
+def test_rango_fechas(argumentos, esperado):
+    assert rango_fechas(**argumentos) == esperado
+
+
+@pytest.mark.parametrize(
+    "argumentos",
+    [
+        {"mes": "0"},
+        {"mes": "13"},
+        {"mes": "marzo"},
+        {"year": "1899"},
+        {"year": "9999"},
+        {"year": "20x4"},
+    ],
+)
+def test_rango_fechas_invalido(argumentos):
+    with pytest.raises(HTTPException) as error:
+        rango_fechas(**argumentos)
+    assert error.value.status_code == 422
+
+
+def test_filtro_fecha_subida_rango():
+    condiciones = filtro_fecha_subida(FECHA_SUBIDA, mes="3", year="2024")
+
+    assert _sql(condiciones) == [
+        "fecha_subida >= '2024-03-01 00:00:00'",
+        "fecha_subida < '2024-04-01 00:00:00'",
+    ]
+
+
+def test_filtro_fecha_subida_mes_sin_year():
+    condiciones = filtro_fecha_subida(FECHA_SUBIDA, mes="3", desde=date(2024, 1, 1))
+
+    assert _sql(condiciones) == [
+        "fecha_subida >= '2024-01-01 00:00:00'",
+        "EXTRACT(month FROM fecha_subida) = 3",
+    ]
+
+
+def test_filtro_fecha_subida_sin_filtros():
+    assert filtro_fecha_subida(FECHA_SUBIDA, mes="", year="") == []
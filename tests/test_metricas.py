@@ -0,0 +1,40 @@
+import pytest
+from fastapi import FastAPI
+from fastapi.testclient import TestClient
+
+from api.routes import metricas as rutas_metricas
+from core.config import settings
+
+app = FastAPI()
+app.include_router(rutas_metricas.router)
+cliente = TestClient(app)
+
+
+@pytest.fixture
+def token(monkeypatch):
+    monkeypatch.setattr(settings, "METRICAS_TOKEN", "secreto")
+    return "secreto"
+
+
+def test_sin_token_configurado_esta_deshabilitado(monkeypatch):
+    monkeypatch.setattr(settings, "METRICAS_TOKEN", None)
+
+    assert cliente.get("/metrics").status_code == 404
+    assert cliente.get("/metrics", headers={"Authorization": "Bearer "}).status_code == 404
+
+
+@pytest.mark.parametrize("cabecera", [None, "Bearer otro", "secreto", "Basic secreto"])
+def test_token_incorrecto(token, cabecera):
+    headers = {"Authorization": cabecera} if cabecera else {}
+
+    respuesta = cliente.get("/metrics", headers=headers)
+
+    assert respuesta.status_code == 401
+    assert respuesta.headers["WWW-Authenticate"] == "Bearer"
+
+
+def test_token_correcto(token):
+    respuesta = cliente.get("/metrics", headers={"Authorization": f"Bearer {token}"})
+
+    assert respuesta.status_code == 200
+    assert "# TYPE http_peticion_duracion_segundos histogram" in respuesta.text
@@ -0,0 +1,111 @@
+import base64
+import json
+from datetime import date, datetime, timezone
+
+import pytest
+from fastapi import HTTPException, Response
+from sqlalchemy import Column, Integer, MetaData, String, Table
+from sqlalchemy.dialects import postgresql
+from sqlmodel import select
+
+from api.paginacion import Paginacion, codificar_cursor, decodificar_cursor
+from core.config import settings
+
+TABLA = Table("tabla", MetaData(), Column("id", Integer, primary_key=True), Column("nombre", String))
+
+
+def _cursor_de(datos) -> str:
+    return base64.urlsafe_b64encode(json.dumps(datos).encode()).rstrip(b"=").decode()
+
+
+def _paginacion(cursor=None, limit=None) -> Paginacion:
+    return Paginacion(Response(), cursor=cursor, limit=limit, total=False)
+
+
+def _sql(consulta) -> str:
+    return str(consulta.compile(dialect=postgresql.dialect()))
+
+
+@pytest.mark.parametrize(
+    "valores",
+    [
+        (1,),
+        ("Matemáticas", 15),
+        (datetime(2024, 3, 1, 10, 30, 5, 123456), 7),
+        (datetime(2024, 3, 1, 10, 30, tzinfo=timezone.utc), 7),
+        (date(2024, 3, 1), 7),
+        (None, 7),
+        (1.5, True, "texto con = y /"),
+    ],
+)
+def test_cursor_ida_y_vuelta(valores):
+    cursor = codificar_cursor(valores)
+
+    assert "=" not in cursor
+    assert decodificar_cursor(cursor) == valores
+    # Los tipos de fecha se conservan, no solo el valor
+    assert [type(v) for v in decodificar_cursor(cursor)] == [type(v) for v in valores]
+
+
+@pytest.mark.parametrize(
+    "cursor",
+    [
+        "",
+        "%%%",
+        "no es base64",
+        base64.urlsafe_b64encode(b"\xff\xfe").decode(),
+        _cursor_de({"a": 1}),
+        _cursor_de([]),
+        _cursor_de(3),
+        _cursor_de([{"x": 1}]),
+        _cursor_de([{"dt": "ayer"}]),
+        _cursor_de([{"dt": 5}]),
+        _cursor_de([{"d": None}]),
+        _cursor_de([[1, 2]]),
+        _cursor_de([{"a": 1}, 2]),
+    ],
+)
+def test_cursor_mal_formado(cursor):
+    with pytest.raises(ValueError):
+        decodificar_cursor(cursor)
+
+
+def test_cursor_mal_formado_en_la_peticion_es_400():
+    with pytest.raises(HTTPException) as error:
+        _paginacion(cursor="%%%")
+    assert error.value.status_code == 400
+
+
+def test_cursor_de_otras_columnas_es_400():
+    pagina = _paginacion(cursor=codificar_cursor(["a", 1]))
+    with pytest.raises(HTTPException) as error:
+        pagina.ordenar(select(TABLA), TABLA.c.id)
+    assert error.value.status_code == 400
+
+
+def test_sin_limit_ni_cursor_devuelve_todas_las_filas():
+    pagina = _paginacion()
+    consulta = pagina.ordenar(select(TABLA), TABLA.c.id)
+    filas = [{"id": i} for i in range(settings.PAGINACION_LIMITE + 10)]
+
+    assert "LIMIT" not in _sql(consulta)
+    assert pagina.recortar(filas, clave=lambda fila: [fila["id"]]) == filas
+    assert "X-Next-Cursor" not in pagina.response.headers
+
+
+def test_con_limit_recorta_y_publica_el_cursor():
+    pagina = _paginacion(limit=2)
+    consulta = pagina.ordenar(select(TABLA), TABLA.c.id)
+    filas = [{"id": i} for i in range(3)]
+
+    assert "LIMIT" in _sql(consulta)
+    assert pagina.recortar(filas, clave=lambda fila: [fila["id"]]) == filas[:2]
+    assert decodificar_cursor(pagina.response.headers["X-Next-Cursor"]) == (1,)
+
+
+def test_con_cursor_sin_limit_usa_el_limite_por_defecto():
+    pagina = _paginacion(cursor=codificar_cursor([1]))
+    consulta = pagina.ordenar(select(TABLA), TABLA.c.id)
+
+    assert pagina.limit == settings.PAGINACION_LIMITE
+    assert "tabla.id > " in _sql(consulta)
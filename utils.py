@@ -2,26 +2,28 @@ import logging
 from dataclasses import dataclass
 from datetime import datetime, timedelta, timezone
 from pathlib import Path
-from typing import Any
+from typing import Any, Iterable
 from zoneinfo import ZoneInfo
 
-import emails  # type: ignore
 import jwt
-from jinja2 import Template
+from jinja2 import Environment, FileSystemBytecodeCache, FileSystemLoader
 from jwt.exceptions import InvalidTokenError
 import pytz
-from sqlmodel import select
+from sqlalchemy import case
+from sqlalchemy.dialects.postgresql import insert
+from sqlmodel import select, update
 
 from core.config import settings
+from core.correo import encolar_email
 from core.db import engine
-from model import Planificacion_Profesor, Planificaciones, Profesores
+from api.estadisticas import cambios_de_estado, registrar_cambios
+from model import Asignaturas, Planificacion_Profesor, Planificaciones, Profesores, Recordatorio_Planificacion
 
 logging.basicConfig(level=logging.INFO)
 logger = logging.getLogger(__name__)
 from datetime import datetime, timedelta
 from api.deps import SessionDep, get_db
-from pytz import timezone as tz
-from sqlmodel import Session, select
+from sqlmodel import Session, func, select
 import unicodedata
 import re
 @dataclass
@@ -71,66 +73,35 @@ def formatear_fecha(fecha):
         fecha_eng = fecha_eng.replace(eng, esp)
     
     return fecha_eng
-def render_email_template(*, template_name: str, context: dict[str, Any]) -> str:
-    template_str = (
-        Path(__file__).parent / "email-templates" / "build" / template_name
-    ).read_text()
-    html_content = Template(template_str).render(context)
-    return html_content
 
 
-def send_email(
-    *,
-    email_to: str,
-    subject: str = "",
-    html_content: str = "",
-) -> None:
+def _crear_entorno_plantillas() -> Environment:
     """
-    Send email using Gmail SMTP server.
-    
-    Note: For Gmail, you need to:
-    1. Enable 2-Factor Authentication
-    2. Generate an App Password for use with this application
+    Entorno de Jinja para las plantillas de correo. Cada plantilla se
+    compila una sola vez por proceso y el bytecode se guarda en disco para
+    los siguientes arranques. Sin auto_reload no se revisa si el archivo
+    cambió en cada uso.
     """
-    #assert settings.emails_enabled, "no provided configuration for email variables"
-    
-    message = emails.Message(
-        subject=subject,
-        html=html_content,
-        mail_from=('no-reply', settings.EMAILS_FROM_EMAIL),
+    bytecode_cache = None
+    if settings.EMAIL_TEMPLATES_CACHE_DIR:
+        directorio = Path(settings.EMAIL_TEMPLATES_CACHE_DIR)
+        directorio.mkdir(parents=True, exist_ok=True)
+        bytecode_cache = FileSystemBytecodeCache(str(directorio))
+    return Environment(
+        loader=FileSystemLoader(Path(__file__).parent / "email-templates" / "build"),
+        bytecode_cache=bytecode_cache,
+        auto_reload=settings.EMAIL_TEMPLATES_AUTO_RELOAD,
     )
-    
-    
 
-    # Configuración específica para Gmail
-    
-    smtp_options = {
-        "host": settings.SMTP_HOST,  # Servidor SMTP de Gmail
-        "port": settings.SMTP_PORT,               # Puerto para TLS
-        "tls": True,              # Habilitar TLS
-        "user": settings.EMAILS_FROM_EMAIL,  # Tu dirección de Gmail
-        "password": settings.SMTP_PASSWORD,  # Tu contraseña de aplicación
-        "timeout": 10
-    }
-    
-    try:
-        
-        response = message.send(to=email_to, smtp=smtp_options)
-        
-        if response.status_code != 250:
-            logger.error(f"Failed to send email. Status code: {response.status_code}")
-            logger.error(f"Error: {response.error}")
-        else:
-            logger.info("Email sent successfully")
-            
-        logger.info(f"Send email result: {response}")
-        
-    except Exception as e:
-        logger.error(f"Exception while sending email: {str(e)}")
-        raise
-    
-    
-    
+
+plantillas_email = _crear_entorno_plantillas()
+
+
+def render_email_template(*, template_name: str, context: dict[str, Any]) -> str:
+    html_content = plantillas_email.get_template(template_name).render(context)
+    return html_content
+
+
 def generate_reset_password_email(email_to: str, email: str, token: str) -> EmailData:
     project_name = settings.PROJECT_NAME
     subject = f"{project_name} - Password recovery for user {email}"
@@ -149,12 +120,8 @@ def generate_reset_password_email(email_to: str, email: str, token: str) -> Emai
 
 
 def render_email_template_info(subject:str, template_name: str, email_to: str, message: str) -> EmailData:
-    
-    template_str = (
-        Path(__file__).parent / "email-templates" / "build" / template_name
-    ).read_text()
     html_content = render_email_template(
-        template_name="info_docente.html",
+        template_name=template_name,
         context={
             "project_name": settings.PROJECT_NAME,
             "username": settings.EMAILS_FROM_EMAIL,
@@ -192,122 +159,170 @@ def verify_password_reset_token(token: str) -> str | None:
     
 
 
-def check_and_send_reminders() :
-    with Session(engine) as session:  # Crear una sesión manualmente
+# Horas antes de la fecha límite en que se envía cada recordatorio
+VENTANAS_RECORDATORIO = (24, 3, 1)
 
-        tasks = session.query(Planificaciones).all()
-        now = datetime.now(tz("America/Guayaquil"))
 
-        for task in tasks:
-            time_until_deadline = task.deadline - now
-            
-            fecha_formateada = formatear_fecha(task.deadline)
-
-
-            # Enviar recordatorio 1 día antes
-            if timedelta(days=1) <= time_until_deadline < timedelta(days=1, hours=1):
-                
-                email = render_email_template_info(
-                    template_name="info_docente.html",
-                    subject=f"Recordatorio: {task.title}",
-                    email_to=task.professor_email,
-                    message=f"Le recordamos que la tarea {task.title} tiene una fecha límite el {fecha_formateada}."
+def check_and_send_reminders() -> int:
+    """
+    Encola los recordatorios de fecha límite de las planificaciones pendientes.
+
+    Cada recordatorio cubre una ventana: el de 24 horas se envía si faltan
+    entre 24 y 3 horas, el de 3 horas si faltan entre 3 y 1 y el de 1 hora
+    en la última hora. Una sola consulta busca, con el índice sobre
+    fecha_subida, las planificaciones que vencen en las próximas 24 horas
+    junto con el email del docente y descarta los recordatorios que ya
+    figuran en recordatorio_planificacion. Por eso el costo depende de los
+    recordatorios por enviar y no del tamaño de la tabla, y una planificación
+    creada a pocas horas de su fecha límite solo recibe el recordatorio de
+    la ventana en que se encuentra.
+
+    Returns:
+        int: Cantidad de recordatorios encolados
+    """
+    try:
+        with Session(engine) as session:
+            ahora = func.now()
+            ventanas = sorted(VENTANAS_RECORDATORIO)
+            horas = case(
+                *((Planificaciones.fecha_subida <= ahora + timedelta(hours=h), h) for h in ventanas[:-1]),
+                else_=ventanas[-1],
+            )
+            statement = (
+                select(
+                    Planificacion_Profesor.id,
+                    horas.label("horas"),
+                    Profesores.email,
+                    Planificaciones.titulo,
+                    Planificaciones.fecha_subida,
                 )
-                send_email(
-                    email_to=task.professor_email,
-                    subject=email.subject,
-                    html_content=email.html_content,
+                .join(Planificacion_Profesor, Planificacion_Profesor.planificacion_id == Planificaciones.id)
+                .join(Profesores, Planificaciones.profesor_id == Profesores.id)
+                .outerjoin(
+                    Recordatorio_Planificacion,
+                    (Recordatorio_Planificacion.planificacion_profesor_id == Planificacion_Profesor.id)
+                    & (Recordatorio_Planificacion.horas == horas),
                 )
-
-            # Enviar recordatorio 3 horas antes
-            if timedelta(hours=3) <= time_until_deadline < timedelta(hours=3, minutes=1):
-                email =  render_email_template_info(
-                        template_name="info_docente.html",
-
-                        subject=f"Último recordatorio: {task.title}",
-                        email_to=task.professor_email,
-                        message=f"La tarea {task.title} tiene una fecha límite en 3 horas ({fecha_formateada})."
-                    )
-                send_email(
-                        email_to=task.professor_email,
-                        subject=email.subject,
-                        html_content=email.html_content,
-                    )
-            
-                
-            if timedelta(hours=1) <= time_until_deadline < timedelta(hours=1, minutes=1):
+                .where(
+                    Planificaciones.fecha_subida > ahora,
+                    Planificaciones.fecha_subida <= ahora + timedelta(hours=ventanas[-1]),
+                    Planificacion_Profesor.estado == "pendiente",
+                    Recordatorio_Planificacion.id.is_(None),
+                )
+            )
+            pendientes = session.exec(statement).all()
+            if not pendientes:
+                return 0
+
+            # Si otra instancia registró el mismo recordatorio entre la consulta
+            # y este INSERT, ON CONFLICT lo omite y no se encola dos veces
+            registrados = set(session.exec(
+                insert(Recordatorio_Planificacion)
+                .values([{"planificacion_profesor_id": fila.id, "horas": fila.horas} for fila in pendientes])
+                .on_conflict_do_nothing(constraint="uq_recordatorio_planificacion_horas")
+                .returning(Recordatorio_Planificacion.planificacion_profesor_id, Recordatorio_Planificacion.horas)
+            ).all())
+
+            for fila in pendientes:
+                if (fila.id, fila.horas) not in registrados:
+                    continue
+                fecha_formateada = formatear_fecha(fila.fecha_subida)
+                if fila.horas == ventanas[-1]:
+                    subject = f"Recordatorio: {fila.titulo}"
+                    message = f"Le recordamos que la planificación {fila.titulo} tiene una fecha límite el {fecha_formateada}."
+                else:
+                    subject = f"Último recordatorio: {fila.titulo}"
+                    message = f"La planificación {fila.titulo} tiene una fecha límite en {fila.horas} horas ({fecha_formateada})."
                 email = render_email_template_info(
                     template_name="info_docente.html",
-
-                    subject=f"Último recordatorio: {task.title}",
-                    email_to=task.professor_email,
-                    message=f"La tarea {task.title} tiene una fecha límite en 1 horas ({fecha_formateada})."
-                )
-                send_email(
-                    email_to=task.professor_email,
-                    subject=email.subject,
-                    html_content=email.html_content,
+                    subject=subject,
+                    email_to=fila.email,
+                    message=message,
                 )
+                encolar_email(session, fila.email, email.subject, email.html_content)
+
+            session.commit()
+
+        print(f"{len(registrados)} recordatorios de fecha límite encolados")
+        return len(registrados)
+
+    except Exception as e:
+        print(f"Error al enviar recordatorios: {e}")
+        return 0
 
 
 def check_and_update_states():
     """
     Verifica las planificaciones con fecha_subida pasada y actualiza su estado a 'no_entregado'
     solo si están en estado 'pendiente'.
+
+    Todo se resuelve en un único UPDATE ... FROM ... RETURNING, que además
+    devuelve los datos de cada docente afectado; la cantidad de consultas no
+    depende de cuántas planificaciones haya pendientes. En la misma
+    transacción se actualiza periodo_stats y se encolan los avisos en
+    email_outbox, que envía el worker de core.correo.
     """
     try:
         print("Actualizando estados de planificaciones...")
         with Session(engine) as session:
-            now = datetime.now(tz("America/Guayaquil"))
-
-            # Obtener todas las planificaciones que están en estado "pendiente"
-            statement = select(Planificacion_Profesor).where(
-                Planificacion_Profesor.estado == "pendiente"
+            statement = (
+                update(Planificacion_Profesor)
+                .where(
+                    Planificacion_Profesor.planificacion_id == Planificaciones.id,
+                    Planificaciones.profesor_id == Profesores.id,
+                    Planificacion_Profesor.estado == "pendiente",
+                    Planificaciones.fecha_subida < func.now(),
+                )
+                .values(estado="no_entregado")
+                .returning(
+                    Profesores.email,
+                    Planificaciones.titulo,
+                    Planificaciones.fecha_subida,
+                    Planificaciones.periodo_id,
+                    select(Asignaturas.area_id)
+                    .where(Asignaturas.id == Planificaciones.asignaturas_id)
+                    .scalar_subquery(),
+                    Planificaciones.profesor_id,
+                )
+            )
+            atrasadas = session.exec(statement).all()
+            registrar_cambios(
+                session,
+                *cambios_de_estado((fila[3:] for fila in atrasadas), "pendiente", "no_entregado"),
             )
-            planificaciones = session.exec(statement).all()
-
-            for planificacion in planificaciones:
-                # Obtener los detalles de la planificación
-                planificacion_detalle = session.exec(
-                    select(Planificaciones).where(Planificaciones.id == planificacion.planificacion_id)
-                ).one_or_none()
-
-                # Verificar si la planificación tiene fecha_subida pasada
-                if planificacion_detalle and planificacion_detalle.fecha_subida < now:
-                    # Cambiar el estado a 'no_entregado'
-                    planificacion.estado = "no_entregado"
-                    session.add(planificacion)
-
-                    # Notificar al profesor
-                    profesor = session.exec(
-                        select(Profesores).where(Profesores.id == planificacion_detalle.profesor_id)
-                    ).one_or_none()
-
-                    if profesor:
-                        fecha_formateada = formatear_fecha(planificacion_detalle.fecha_subida)
-
-                        email = render_email_template_info(
-                            template_name='info_docente.html',
-                            subject=f"Notificación: Planificación atrasada - {planificacion_detalle.titulo}",
-                            email_to=profesor.email,
-                            message=(
-                                f"La planificación {planificacion_detalle.titulo} marcada para el "
-                                f"{fecha_formateada} se encuentra atrasada. "
-                                "Por favor, comuníquese con el docente administrador."
-                            )
-                        )
-                        send_email(
-                            email_to=profesor.email,
-                            subject=email.subject,
-                            html_content=email.html_content,
-                        )
+            notificar_atrasadas(session, (fila[:3] for fila in atrasadas))
 
             # Confirmar los cambios en la base de datos
             session.commit()
 
+        print(f"{len(atrasadas)} planificaciones marcadas como no entregadas")
+
     except Exception as e:
         print(f"Error al actualizar estados de planificaciones: {e}")
-        
+
+
+def notificar_atrasadas(session: Session, atrasadas: Iterable[tuple[str, str, datetime]]) -> None:
+    """
+    Encola el aviso a cada docente de sus planificaciones que pasaron a
+    'no_entregado'. Se guardan al confirmar `session`.
+
+    Args:
+        atrasadas: Filas (email, titulo, fecha_subida)
+    """
+    for email_to, titulo, fecha_subida in atrasadas:
+        fecha_formateada = formatear_fecha(fecha_subida)
+        email = render_email_template_info(
+            template_name='info_docente.html',
+            subject=f"Notificación: Planificación atrasada - {titulo}",
+            email_to=email_to,
+            message=(
+                f"La planificación {titulo} marcada para el "
+                f"{fecha_formateada} se encuentra atrasada. "
+                "Por favor, comuníquese con el docente administrador."
+            )
+        )
+        encolar_email(session, email_to, email.subject, email.html_content)
+
 
 def normalize_filename(filename: str) -> str:
     # Normalizamos el texto separando caracteres base y sus diacríticos.